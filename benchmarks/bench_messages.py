@@ -0,0 +1,103 @@
+"""
+Benchmark: memoria y velocidad de construcción de mensajes del WorldBus.
+
+    python -m benchmarks.bench_messages [--counts 1000 10000] [--nearby 8] [--areas 4]
+
+Compara:
+  - dicts  : formato anterior (dataclass con __dict__, nearby/areas como listas de dicts,
+             cadenas nuevas por mensaje como las que llegan deserializadas).
+  - slots  : dataclasses con __slots__, NearbyEntity/AreaRecord (tuplas) y nombres internados.
+Mide bytes retenidos por par (tracemalloc) y, en otra pasada sin trazar, pares/s.
+"""
+from __future__ import annotations
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+from src.game.messaging.messages import AreaRecord, NearbyEntity, WorldEvent, WorldSnapshot, intern
+
+
+@dataclass(frozen=True)
+class _DictSnapshot:
+    version: str
+    t_sim: float
+    seq: int
+    npc_id: str
+    cell: tuple
+    nearby: list
+    areas: list
+    last_events: list = field(default_factory=list)
+    areas_ref: str = ""
+
+
+@dataclass(frozen=True)
+class _DictEvent:
+    version: str
+    t_sim: float
+    seq: int
+    event_id: str
+    kind: str
+    payload: dict
+    priority: int = 0
+
+
+def _fresh(s: str) -> str:
+    # Cadena nueva con el mismo contenido (lo que produce decodificar un mensaje)
+    return "".join(list(s))
+
+
+def _dict_msgs(i: int, nearby: int, areas: int):
+    snap = _DictSnapshot(
+        _fresh("1.1"), i * 0.016, i, _fresh(f"npc_{i % 100}"), (i % 100, 7),
+        [{"kind": _fresh("npc"), "id": _fresh(f"npc_{j}"), "cell": (j, j)} for j in range(nearby)],
+        [{"name": _fresh(f"Area{j}"), "rect": [j, j, j + 4, j + 4]} for j in range(areas)],
+    )
+    ev = _DictEvent(_fresh("1.1"), i * 0.016, i, f"e{i}", _fresh("world_change"), {_fresh("action"): _fresh("say")})
+    return snap, ev
+
+
+def _slot_msgs(i: int, nearby: int, areas: int):
+    # Mismas cadenas "nuevas", pero internadas como hace el codec al decodificar
+    snap = WorldSnapshot(
+        intern(_fresh("1.1")), i * 0.016, i, intern(_fresh(f"npc_{i % 100}")), (i % 100, 7),
+        [NearbyEntity(intern(_fresh("npc")), intern(_fresh(f"npc_{j}")), (j, j)) for j in range(nearby)],
+        [AreaRecord(intern(_fresh(f"Area{j}")), (j, j, j + 4, j + 4)) for j in range(areas)],
+    )
+    ev = WorldEvent(intern(_fresh("1.1")), i * 0.016, i, f"e{i}", intern(_fresh("world_change")),
+                    {intern(_fresh("action")): intern(_fresh("say"))})
+    return snap, ev
+
+
+def _measure(make, n: int, nearby: int, areas: int):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = [make(i, nearby, areas) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    t0 = time.perf_counter()
+    kept = [make(i, nearby, areas) for i in range(n)]
+    elapsed = time.perf_counter() - t0
+    return used / n, n / elapsed
+
+
+def bench(n: int, nearby: int, areas: int) -> None:
+    print(f"== {n} pares snapshot+evento (nearby={nearby}, areas={areas})")
+    for label, make in (("dicts", _dict_msgs), ("slots", _slot_msgs)):
+        per_msg, rate = _measure(make, n, nearby, areas)
+        print(f"   {label:6}: {per_msg:9.0f} B/par   {rate:12,.0f} pares/s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--nearby", type=int, default=8)
+    ap.add_argument("--areas", type=int, default=4)
+    args = ap.parse_args()
+    for n in args.counts:
+        bench(n, args.nearby, args.areas)
+
+
+if __name__ == "__main__":
+    main()
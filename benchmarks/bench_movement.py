@@ -0,0 +1,75 @@
+"""
+Benchmark: coste por tick del movimiento de N caminantes.
+
+    python -m benchmarks.bench_movement [--counts 100 1000 10000] [--ticks 120]
+
+Compara:
+  - per-sprite : SpriteList.on_update -> GridWalker.on_update (una fila cada vez).
+  - lote       : integrate_moves (una operación NumPy) + sync_sprites a los sprites movidos.
+  - solo lote  : integrate_moves sin tocar sprites (p.ej. modo sin render).
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import arcade
+
+from src.game.config import STEP_TIME, TILE
+from src.game.entities import GridWalker
+from src.game.movement import integrate_moves, sync_sprites
+from src.game.world_state import WorldState
+
+DT = 1 / 60
+
+
+def _setup(n: int):
+    world = WorldState(capacity=n)
+    walkers = {}
+    sprites = arcade.SpriteList()
+    for i in range(n):
+        npc_id = f"npc_{i}"
+        w = GridWalker(int(TILE * 0.8), (i % 1000, i // 1000), world=world, entity_id=npc_id)
+        walkers[npc_id] = w
+        sprites.append(w)
+    return world, walkers, sprites
+
+
+def _restart(world: WorldState) -> None:
+    # Todos en movimiento: peor caso (cada tick hay que mover a todos)
+    for npc_id in world.ids:
+        if not world.is_moving(npc_id):
+            world.step(npc_id, 1, 0)
+
+
+def _time(fn, world: WorldState, ticks: int) -> float:
+    total = 0.0
+    for _ in range(ticks):
+        _restart(world)
+        t0 = time.perf_counter()
+        fn()
+        total += time.perf_counter() - t0
+    return total / ticks * 1000
+
+
+def bench(n: int, ticks: int) -> None:
+    world, walkers, sprites = _setup(n)
+    per_sprite = _time(lambda: sprites.on_update(DT), world, ticks)
+    batched = _time(lambda: sync_sprites(world, integrate_moves(world, DT), walkers), world, ticks)
+    only = _time(lambda: integrate_moves(world, DT), world, ticks)
+    print(f"== {n} caminantes ({ticks} ticks, dt={DT:.4f}s, STEP_TIME={STEP_TIME}s)")
+    print(f"   per-sprite : {per_sprite:8.3f} ms/tick")
+    print(f"   lote       : {batched:8.3f} ms/tick")
+    print(f"   solo lote  : {only:8.3f} ms/tick")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--ticks", type=int, default=120)
+    args = ap.parse_args()
+    for n in args.counts:
+        bench(n, args.ticks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: A* plano vs HPA* en mapas de distintos tamaños con obstáculos aleatorios.
+
+    python -m benchmarks.bench_pathfinding [--sizes 200 1000 4000] [--queries 5]
+
+Para HPA* se mide: preprocesado (entradas), precálculo de distancias intra-cluster (lo que
+WorldSim hace en segundo plano), primera consulta abstracta sin precálculo (cálculo perezoso)
+y con él, consultas posteriores y el refinado del primer tramo, que es lo que realmente paga
+el hilo que consume NpcStepAdapter.
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from src.game.pathfinding import WalkGrid, astar
+from src.game.hpa import HierarchicalPathFinder
+
+
+def _make_grid(n: int, density: float, seed: int) -> WalkGrid:
+    rng = np.random.default_rng(seed)
+    return WalkGrid(n, n, rng.random((n, n), dtype=np.float32) > density)
+
+
+def _queries(grid: WalkGrid, count: int, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    out = []
+    while len(out) < count:
+        sx, sy, gx, gy = (int(v) for v in rng.integers(0, grid.width, 4))
+        if grid.is_walkable(sx, sy) and grid.is_walkable(gx, gy):
+            out.append(((sx, sy), (gx, gy)))
+    return out
+
+
+def bench(n: int, queries: int, density: float, cluster_size: int, flat_limit: int, seed: int = 7) -> None:
+    grid = _make_grid(n, density, seed)
+    pairs = _queries(grid, queries, seed)
+
+    t0 = time.perf_counter()
+    hpa = HierarchicalPathFinder(grid, cluster_size=cluster_size)
+    t_build = time.perf_counter() - t0
+
+    t_lazy = 0.0
+    for start, goal in pairs:
+        lazy = HierarchicalPathFinder(grid, cluster_size=cluster_size)
+        t0 = time.perf_counter()
+        lazy.find_abstract_path(start, goal)
+        t_lazy += time.perf_counter() - t0
+        grid.remove_listener(lazy._on_grid_change)
+
+    t0 = time.perf_counter()
+    hpa.precompute()
+    t_pre = time.perf_counter() - t0
+
+    t_first = t_again = t_seg = 0.0
+    for start, goal in pairs:
+        t0 = time.perf_counter()
+        abstract = hpa.find_abstract_path(start, goal)
+        t_first += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        hpa.find_abstract_path(start, goal)
+        t_again += time.perf_counter() - t0
+        if abstract and len(abstract) > 1:
+            t0 = time.perf_counter()
+            hpa.refine(abstract[0], abstract[1])
+            t_seg += time.perf_counter() - t0
+
+    flat_txt = "omitido (--flat-limit)"
+    if n <= flat_limit:
+        t0 = time.perf_counter()
+        for start, goal in pairs:
+            astar(grid, start, goal)
+        flat_txt = f"{(time.perf_counter() - t0) / queries * 1000:9.2f} ms/consulta"
+
+    print(f"== {n}x{n} (obstáculos {density:.0%}, cluster {cluster_size}, {queries} consultas)")
+    print(f"   A* plano               : {flat_txt}")
+    print(f"   HPA* preprocesado      : {t_build * 1000:9.2f} ms")
+    print(f"   HPA* precálculo        : {t_pre * 1000:9.2f} ms (en segundo plano en WorldSim)")
+    print(f"   HPA* 1ª consulta perez.: {t_lazy / queries * 1000:9.2f} ms/consulta")
+    print(f"   HPA* 1ª consulta       : {t_first / queries * 1000:9.2f} ms/consulta")
+    print(f"   HPA* consulta en caché : {t_again / queries * 1000:9.2f} ms/consulta")
+    print(f"   HPA* refinar 1er tramo : {t_seg / queries * 1000:9.2f} ms/consulta")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 4000])
+    ap.add_argument("--queries", type=int, default=5)
+    ap.add_argument("--density", type=float, default=0.2)
+    ap.add_argument("--cluster-size", type=int, default=16)
+    ap.add_argument("--flat-limit", type=int, default=4000, help="tamaño máximo en el que se ejecuta A* plano")
+    args = ap.parse_args()
+    for n in args.sizes:
+        bench(n, args.queries, args.density, args.cluster_size, args.flat_limit)
+
+
+if __name__ == "__main__":
+    main()
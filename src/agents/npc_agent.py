@@ -1,12 +1,27 @@
 # src/agents/npc_agent.py
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Tuple, Optional
+from pathlib import Path
+from typing import Any, Dict, Tuple, Optional
 
 import agentspeak  # SPADE-BDI/AgentSpeak
 
 from .npc_base_agent import NPCBaseAgent
+from src.utils.plan_cache import PromptCache, ResponseMemo
+from src.utils.planning_pool import PlanningPool
+from src.utils.batch_planner import BatchPlanner
+from src.utils.plan_validator import PlanValidator, ValidationResult, Vocabulary
+from src.utils.plan_index import PlanIndex
+from src.utils.utils import read_json
+
+_ENV_SLOT = "\x00ENV\x00"  # hueco de env_description en la plantilla del prompt
+_CUT = "\x00CUT\x00"       # separa bloques propios del NPC (pares) y compartidos (impares)
+
+# Primitivas que registra add_custom_actions (nombre -> aridad): las usa también el validador
+CUSTOM_ACTIONS: Dict[str, int] = {".search": 1, ".move": 1, ".catch": 1, ".drop": 2, ".update_inventory": 3}
+CUSTOM_FUNCTIONS: Dict[str, int] = {".accessible": 1, ".object_at": 0}
 
 
 class NPCAgent(NPCBaseAgent):
@@ -15,6 +30,17 @@ class NPCAgent(NPCBaseAgent):
     - Primitivas: .move, .catch, .drop, .search, .update_inventory, funciones .accessible, .object_at
     - LLM opcional: self.llm (inyectable) con interfaz .generate(prompt)->str
     - El destino de movimiento espera coordenadas (x,y) (tuplas/listas o "x,y")
+    - get_plan reutiliza el prompt estático (PromptCache) y memoriza respuestas por estado
+      normalizado (ResponseMemo: LRU + TTL, en disco si memo_path)
+    - get_plan_async no bloquea: delega en un PlanningPool (creado al primer uso) compartido por
+      los agentes que usan el mismo LLM (concurrencia acotada, timeout y deduplicación de prompts idénticos)
+    - Con batch_window, get_plan_async agrupa a los NPCs que piden plan a la vez en una sola
+      llamada (BatchPlanner): reglas y primitivas una vez, una sección por NPC
+    - Los planes del LLM se validan en local (PlanValidator) antes de devolverse; si fallan,
+      se pide una reparación dirigida con los errores (repair_attempts veces) y si no, ""
+    - Antes de llamar al LLM se busca en la biblioteca de intenciones guardadas (PlanIndex):
+      con plan_reuse_threshold, si alguna se parece lo bastante a la situación y su plan sigue
+      pasando el validador, se reutiliza
     """
 
     def __init__(
@@ -26,11 +52,36 @@ class NPCAgent(NPCBaseAgent):
         data_root: str | None = "data",
         llm: Any | None = None,
         game_io: Any | None = None,  # opcional: puente hacia el mundo (colas)
+        memo_size: int = 256,
+        memo_ttl: float | None = 600.0,
+        memo_path: str | Path | None = None,
+        planner: PlanningPool | None = None,
+        batch_window: float | None = None,
+        repair_attempts: int = 1,
+        plan_reuse_threshold: float | None = None,
     ):
         self.llm = llm
+        self.repair_attempts = repair_attempts
+        self.plan_reuse_threshold = plan_reuse_threshold  # None = no reutilizar de la biblioteca
+        self.planner = planner  # si es None, se toma el pool compartido del LLM al primer uso
+        self.batch_window = batch_window
+        self.batcher: BatchPlanner | None = None
         self.game_io = game_io  # si lo usas, debe exponer move_to_cell(x,y, npc_id=...) y say(...)
         super().__init__(jid, npc_id, password, npc_name, data_root)
 
+        # Biblioteca de intenciones: índice persistente junto al JSON, al día con lo ya guardado
+        # (se vuelve a sincronizar cada vez que se reconstruye el prompt)
+        self.plan_index = PlanIndex(self.paths.intentions_dir / f"{self.npc_name}_index.npz")
+        self.plan_index.sync(read_json(self.paths.intentions_json, self.logger, default={}))
+
+        # Prompt: se reconstruye solo si cambian intenciones, perfil, memoria o relaciones
+        self.prompt_cache = PromptCache(
+            self._rebuild_prompt_parts,
+            sources=(self.paths.intentions_json, self.paths.profile,
+                     self.paths.dynamic_memory, self.paths.relationships),
+        )
+        self.plan_memo = ResponseMemo(memo_size, memo_ttl, memo_path)
+
         # Alias de logger de la base
         self.logger: logging.Logger = self.logger
         self.logger.info("NPCAgent inicializado (LLM=%s, game_io=%s)", bool(llm), bool(game_io))
@@ -60,7 +111,7 @@ class NPCAgent(NPCBaseAgent):
     # ------------------------------------------------------------------
     def add_custom_actions(self, actions):
         # ============= FUNCIONES =============
-        @actions.add_function(".accessible", (object,))
+        @actions.add_function(".accessible", (object,) * CUSTOM_FUNCTIONS[".accessible"])
         def _accessible(location):
             """
             Devuelve True si la ubicación es accesible.
@@ -69,7 +120,7 @@ class NPCAgent(NPCBaseAgent):
             """
             return True
 
-        @actions.add_function(".object_at", ())
+        @actions.add_function(".object_at", (object,) * CUSTOM_FUNCTIONS[".object_at"])
         def _object_at():
             """
             Devuelve lista de pares (objeto, location) visibles.
@@ -79,7 +130,7 @@ class NPCAgent(NPCBaseAgent):
             return []
 
         # ============= ACCIONES =============
-        @actions.add(".search", 1)
+        @actions.add(".search", CUSTOM_ACTIONS[".search"])
         def _search(agent, term, intention):
             """
             Busca la ubicación de un objeto y actualiza la creencia object_at(Object, Location).
@@ -91,7 +142,7 @@ class NPCAgent(NPCBaseAgent):
             self.logger.info("SEARCH → object_at(%s, %s)", obj, (10, 5))
             yield
 
-        @actions.add(".move", 1)
+        @actions.add(".move", CUSTOM_ACTIONS[".move"])
         def _move(agent, term, intention):
             """
             Mueve al NPC a Site, donde Site = (x,y) | 'x,y' | {'x':..,'y':..}
@@ -115,18 +166,20 @@ class NPCAgent(NPCBaseAgent):
                 self.logger.info("MOVE (sin game_io) -> (%d,%d)", x, y)
             yield
 
-        @actions.add(".catch", 1)
+        @actions.add(".catch", CUSTOM_ACTIONS[".catch"])
         def _catch(agent, term, intention):
             obj = agentspeak.grounded(term.args[0], intention.scope)
             # Aquí podrías validar proximidad y actualizar inventario:
             try:
                 self.inventory.add(str(obj), 1)
                 self.logger.info("CATCH → %s (nuevo conteo=%d)", obj, self.inventory.count(str(obj)))
+                if self.game_io is not None and hasattr(self.game_io, "catch"):
+                    self.game_io.catch(str(obj))  # comando al mundo (no bloqueante)
             except Exception as e:
                 self.logger.error("CATCH error: %s", e)
             yield
 
-        @actions.add(".drop", 2)
+        @actions.add(".drop", CUSTOM_ACTIONS[".drop"])
         def _drop(agent, term, intention):
             obj = agentspeak.grounded(term.args[0], intention.scope)
             site = agentspeak.grounded(term.args[1], intention.scope)
@@ -138,11 +191,13 @@ class NPCAgent(NPCBaseAgent):
                 # Lógica mínima: quitar de inventario; en mundo real, crear objeto en celda xy
                 self.inventory.subtract(str(obj), 1)
                 self.logger.info("DROP → %s en %s (conteo=%d)", obj, xy, self.inventory.count(str(obj)))
+                if self.game_io is not None and hasattr(self.game_io, "drop"):
+                    self.game_io.drop(str(obj), xy)  # comando al mundo (no bloqueante)
             except Exception as e:
                 self.logger.error("DROP error: %s", e)
             yield
 
-        @actions.add(".update_inventory", 3)
+        @actions.add(".update_inventory", CUSTOM_ACTIONS[".update_inventory"])
         def _update_inventory(agent, term, intention):
             obj = str(agentspeak.grounded(term.args[0], intention.scope))
             count = int(agentspeak.grounded(term.args[1], intention.scope))
@@ -162,32 +217,173 @@ class NPCAgent(NPCBaseAgent):
     # ------------------------------------------------------------------
     # LLM: generación de plan en AgentSpeak (opcional)
     # ------------------------------------------------------------------
-    def get_plan(self, env_description: str) -> str:
+    def get_plan(self, env_description: str, use_memo: bool = True) -> str:
         """
         Construye el prompt y llama al LLM (si está disponible).
         Devuelve texto AgentSpeak listo para alimentar al BDI.
+        Si ya se generó un plan para el mismo estado (y mismo prompt estático), o hay una
+        intención guardada parecida, la reutiliza (use_memo=False fuerza una llamada al LLM).
         """
         if not self.llm:
             self.logger.warning("get_plan llamado sin LLM configurado.")
             return ""
 
+        prompt, key, cached = self._prepare_plan(env_description, use_memo)
+        if cached is not None:
+            return cached
+        try:
+            # Interfaz esperada: self.llm.generate(prompt) -> str
+            plan_text: str = self.llm.generate(prompt)
+            for _ in range(self.repair_attempts):
+                repair = self._repair_request(plan_text)
+                if repair is None:
+                    break
+                plan_text = self.llm.generate(repair)
+        except Exception as e:
+            self.logger.error("Error generando plan con LLM: %s", e)
+            return ""
+        return self._store_plan(key, plan_text)
+
+    async def get_plan_async(self, env_description: str, use_memo: bool = True,
+                             timeout: float | None = None) -> str:
+        """
+        Como get_plan, pero espera la respuesta en el PlanningPool sin bloquear el bucle.
+        Con BatchPlanner, la petición viaja en el lote de la ventana actual y, si su sección
+        falta o no es válida, se repite sola con el prompt individual.
+        Timeout o error del LLM => ""; la cancelación se propaga al llamador.
+        """
+        if self._ensure_planner() is None:
+            self.logger.warning("get_plan_async llamado sin LLM configurado.")
+            return ""
+        prompt, key, cached = self._prepare_plan(env_description, use_memo)
+        if cached is not None:
+            return cached
+        try:
+            if self.batcher is None:
+                plan_text = await self.planner.generate(prompt, timeout=timeout)
+            else:
+                parts = self.prompt_cache.parts()
+                section = f"{parts[3]}{env_description}{parts[4]}"
+                plan_text = await asyncio.wait_for(self.batcher.submit(
+                    parts[2], section, lambda: self.planner.generate(prompt, timeout=timeout),
+                    validate=lambda text: self.validate_plan(text).ok), timeout)
+            for _ in range(self.repair_attempts):
+                repair = self._repair_request(plan_text)
+                if repair is None:
+                    break
+                plan_text = await self.planner.generate(repair, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.logger.error("Timeout generando plan con LLM")
+            return ""
+        except Exception as e:
+            self.logger.error("Error generando plan con LLM: %s", e)
+            return ""
+        return self._store_plan(key, plan_text)
+
+    def _ensure_planner(self) -> PlanningPool | None:
+        """PlanningPool (y BatchPlanner) del LLM, creados la primera vez que se piden."""
+        if self.planner is None and self.llm is not None:
+            self.planner = PlanningPool.for_llm(self.llm)
+        if self.batcher is None and self.batch_window is not None and self.planner is not None:
+            self.batcher = BatchPlanner.for_pool(self.planner, window=self.batch_window)
+        return self.planner
+
+    def _prepare_plan(self, env_description: str, use_memo: bool) -> Tuple[str, str, Optional[str]]:
+        """(prompt, clave del memo, plan memorizado o de la biblioteca, o None)."""
+        prompt = self.prompt_cache.render(env_description)
+        key = ResponseMemo.make_key(env_description, self.prompt_cache.fingerprint)
+        if not use_memo:
+            return prompt, key, None
+        cached = self.plan_memo.get(key)
+        if cached is not None:
+            self.logger.info("Plan LLM desde memo (%d chars)", len(cached))
+        elif self.plan_reuse_threshold is not None:
+            match = self.plan_index.best(env_description, self.plan_reuse_threshold)
+            if match is not None:
+                result = self.validate_plan(match.plan)
+                if result.ok:
+                    self.logger.info("Plan reutilizado de la biblioteca: %s (similitud %.2f)", match.name, match.score)
+                    cached = match.plan
+                else:
+                    self.logger.warning("Plan de la biblioteca %s descartado: %s",
+                                        match.name, "; ".join(map(str, result.errors)))
+        return prompt, key, cached
+
+    def save_new_intention(self, intention_name: str, trigger: str, description: str, plan: str) -> None:
+        """Guarda la intención (JSON + BDI) y la añade al índice de la biblioteca."""
+        super().save_new_intention(intention_name, trigger, description, plan)
+        self.plan_index.add(intention_name, trigger, description, plan)
+
+    def _store_plan(self, key: str, plan_text: Optional[str]) -> str:
+        plan_text = (plan_text or "").strip()
+        self.logger.info("Plan LLM generado (%d chars)", len(plan_text))
+        if not plan_text:
+            return ""
+        result = self.validate_plan(plan_text)
+        if not result.ok:
+            self.logger.error("Plan LLM descartado: %s", "; ".join(map(str, result.errors)))
+            return ""
+        self.plan_memo.put(key, plan_text)
+        return plan_text
+
+    def validate_plan(self, plan_text: str) -> ValidationResult:
+        """Sintaxis y vocabulario (intenciones JSON + primitivas registradas); cacheado por hash."""
+        self.prompt_cache.parts()  # reconstruye el validador si cambió el JSON de intenciones
+        return self.plan_validator.validate(plan_text)
+
+    def _repair_request(self, plan_text: Optional[str]) -> Optional[str]:
+        """Prompt de reparación con los errores del plan, o None si es válido (o está vacío)."""
+        if not (plan_text or "").strip():
+            return None
+        result = self.validate_plan(plan_text)
+        if result.ok:
+            return None
+        self.logger.warning("Plan LLM inválido, pidiendo reparación: %s", "; ".join(map(str, result.errors)))
+        return self.plan_validator.repair_prompt(plan_text, result)
+
+    def plan_cache_stats(self) -> Dict[str, float]:
+        """Contadores del memo, del prompt, del pool/lotes, del validador y de la biblioteca."""
+        stats = self.plan_memo.stats()
+        stats["prompt_builds"] = self.prompt_cache.builds
+        stats["prompt_hits"] = self.prompt_cache.hits
+        if self.planner is not None:
+            stats.update({f"pool_{k}": v for k, v in self.planner.stats().items()})
+        if self.batcher is not None:
+            stats.update({f"batch_{k}": v for k, v in self.batcher.stats().items()})
+        stats.update({f"validator_{k}": v for k, v in self.plan_validator.stats().items()})
+        stats.update({f"library_{k}": v for k, v in self.plan_index.stats().items()})
+        return stats
+
+    def _rebuild_prompt_parts(self) -> Tuple[str, ...]:
+        """
+        Recarga el material de los JSON y devuelve, alrededor del hueco de env_description:
+        (prefijo, sufijo) del prompt individual, el contexto compartido de los lotes y
+        (prefijo, sufijo) de la sección propia del NPC en un lote.
+        """
+        self._load_prompt_material()
+        self._build_formatted_history()
+        # El vocabulario del validador sale del mismo JSON que el prompt
+        self.plan_validator = PlanValidator(Vocabulary.from_file(
+            self.paths.intentions_json, custom_actions=CUSTOM_ACTIONS, custom_functions=CUSTOM_FUNCTIONS))
+        self.plan_index.sync(read_json(self.paths.intentions_json, self.logger, default={}))
+        env_description = _ENV_SLOT
         prompt_splitter = "# _ _ _ #"
         prompt = f"""
             Eres un **NPC llamado {self.npc_name}** dentro de un **RPG medieval**. 
             Tu personalidad e historia sirven como contexto para tu tono y prioridades (más o menos hostil, obediente, generoso, etc.).
 
-            Tu comportamiento está gobernado por:
+            {_CUT}Tu comportamiento está gobernado por:
             - Un sistema **BDI** donde defines **intenciones** (+!intencion) que se disparan por **creencias** positivas.
             - Un conjunto de **acciones primitivas** que ejecutan efectos en el entorno.
             - **Funciones** auxiliares solo usables dentro del cuerpo del plan (nunca en el trigger).
             - Un **sistema externo (LLM/orquestador)** que prepara las creencias para activar la intención correcta.
 
-            ======================
+            {_CUT}======================
             CONTEXTO DEL PERSONAJE
             ======================
             {self.get_history()}
 
-            ======================
+            {_CUT}======================
             ACCIONES DISPONIBLES
             ======================
             (Usa únicamente estas acciones/intenciones; no inventes nuevas)
@@ -205,12 +401,12 @@ class NPCAgent(NPCBaseAgent):
             (Usa exclusivamente estas; no inventes predicados nuevos)
             {self.str_beliefs}
 
-            ======================
+            {_CUT}======================
             ESTADO ACTUAL DEL NPC
             ======================
             {env_description}
 
-            ===============================
+            {_CUT}===============================
             REGLAS ESTRICTAS PARA EL PLAN
             ===============================
             1) Define **UNA sola intención** (+!nombre_intencion) con **un trigger de creencias positivas** (sin 'not').
@@ -218,7 +414,7 @@ class NPCAgent(NPCBaseAgent):
             - Acciones primitivas listadas (p.ej., .move, .catch, .drop, .search, .update_inventory).
             - Otras intenciones ya existentes si las hubiera (subplanes).
             - Funciones listadas (solo dentro del cuerpo).
-            3) **Coordenadas en grid**: considera que **Site = (X,Y)** (tupla o equivalente). No uses nombres de zonas salvo que vengan como creencia.
+            3) **Coordenadas en grid**: considera que **Site = [X,Y]** (lista: AgentSpeak no admite tuplas como (X,Y)). No uses nombres de zonas salvo que vengan como creencia.
             4) El plan debe ser **ejecutable y sintácticamente válido** en AgentSpeak/SPADE.
             5) **No** repitas la misma intención con múltiples condiciones. **Una única versión** por intención.
             6) **No** declares funciones nuevas ni creencias no listadas. **No** comentes el código ni expliques nada.
@@ -249,13 +445,8 @@ class NPCAgent(NPCBaseAgent):
 
             [intencion_1 : descripción funcional general]
         """.strip()
-
-        try:
-            # Interfaz esperada: self.llm.generate(prompt) -> str
-            plan_text: str = self.llm.generate(prompt)
-            plan_text = (plan_text or "").strip()
-            self.logger.info("Plan LLM generado (%d chars)", len(plan_text))
-            return plan_text
-        except Exception as e:
-            self.logger.error("Error generando plan con LLM: %s", e)
-            return ""
+        blocks = prompt.split(_CUT)
+        prefix, suffix = "".join(blocks).split(_ENV_SLOT, 1)
+        shared = "\n\n".join(b.strip() for b in blocks[1::2])
+        section_prefix, section_suffix = "\n\n".join(b.strip() for b in blocks[0::2]).split(_ENV_SLOT, 1)
+        return prefix, suffix, shared, section_prefix, section_suffix
@@ -1,52 +1,163 @@
 from __future__ import annotations
 import time
-from typing import Callable, Optional, Tuple
+from typing import AsyncIterator, Callable, Optional, Sequence, Tuple, Union
 
 from ..messaging.world_bus import WorldBus
-from ..messaging.messages import WorldSnapshot, WorldEvent, PROTOCOL_VERSION
+from ..messaging.messages import WorldSnapshot, SnapshotDelta, WorldEvent, PROTOCOL_VERSION, SUPPORTED_VERSIONS
+from ..messaging.protocol import apply_delta
+from ..messaging.commands import (
+    Command, CommandRing, MoveCommand, CancelCommand, CatchCommand, DropCommand, SayCommand,
+)
 from ..adapters.npc_step_adapter import NpcStepAdapter
+from ..pathfinding import PathFinder
+from ..hpa import HierarchicalPathFinder
+from ..flow_field import FlowFieldService
+from ..world_state import WorldState
 
 class GameIOBridge:
     """
     Puente usado por NPCAgent (SPADE-BDI) para hablar con el mundo Arcade.
     Cumple con lo que ya usas en tu agente:
       - move_to_cell(x,y, npc_id=...)
+    Planifica con el pathfinder de la rejilla del mundo (obligatorio; WorldSim.make_bridge
+    pasa el de la simulación).
     Añade pull/push de estado/eventos:
-      - request_snapshot(npc_id) -> WorldSnapshot
+      - request_snapshot(since_seq=..., known_areas_ref=...) -> WorldSnapshot | SnapshotDelta
+      - sync_snapshot() -> WorldSnapshot (pide deltas y reconstruye el snapshot local)
       - try_get_event(npc_id, timeout=...) -> WorldEvent|None
+      - await next_event(timeout=...) / async for ev in events()  (agentes en asyncio)
     """
-    def __init__(self, npc_id: str, world_bus: WorldBus, step_adapter: NpcStepAdapter):
+    def __init__(
+        self,
+        npc_id: str,
+        world_bus: WorldBus,
+        step_adapter: NpcStepAdapter,
+        pathfinder: PathFinder | HierarchicalPathFinder,
+        flow_fields: FlowFieldService | None = None,
+        world: WorldState | None = None,
+        commands: CommandRing | None = None,
+        protocol_versions: Sequence[str] = SUPPORTED_VERSIONS,
+        page_route: Callable[[Tuple[int, int], Tuple[int, int]], None] | None = None,
+    ):
         self.npc_id = npc_id
         self.bus = world_bus
         self.steps = step_adapter
+        if pathfinder is None:
+            raise ValueError("GameIOBridge necesita el pathfinder de la rejilla del mundo (p.ej. sim.pathfinder)")
+        self.pathfinder = pathfinder
+        self.flow_fields = flow_fields
+        self.world = world
+        # Anillo SPSC hacia la simulación (se drena una vez por tick); sin él, se escribe
+        # directamente en la cola de pasos (tests, uso sin WorldSim)
+        self.commands = commands
+        # Mundos sobre tilemap: pagina la región de la ruta antes de planificar (WorldSim.page_route)
+        self.page_route = page_route
+        self.route_id: Optional[int] = None  # última ruta encolada por move_to_cell
+        self.protocol = world_bus.negotiate(protocol_versions)
+        self._snapshot: Optional[WorldSnapshot] = None  # último estado completo conocido
 
     # ---- API esperada por NPCAgent (.move) ----
-    def move_to_cell(self, x: int, y: int, npc_id: Optional[str] = None) -> None:
-        # Por simplicidad: descomponemos en pasos 4-dir. Aquí podrías meter A* si quieres.
-        # OJO: Esto genera una ruta rectilínea (primero X, luego Y).
+    def move_to_cell(self, x: int, y: int, npc_id: Optional[str] = None) -> bool:
+        """
+        Planifica (A* o HPA*) en el hilo del agente, no en el de render, y encola la ruta.
+        Con HPA* solo se refina el tramo que la vista va consumiendo; si el destino cae en un
+        área con campo de flujo, se muestrea el campo compartido (O(1) por paso).
+        La ruta se planifica desde la celda actual y sustituye a la pendiente: el replan
+        entra en el siguiente tick en lugar de encolarse detrás de la ruta anterior (si el NPC
+        avanza antes de que se drene, la simulación la engancha a su nueva celda o devuelve un
+        evento "move_replan").
+        Devuelve False si no hay ruta legal hasta (x, y).
+        """
         if npc_id and npc_id != self.npc_id:
-            return
-        # Se encolan muchos pasos; considera rate limit o A* si la distancia es grande.
-        # Aquí asumimos que el sprite empieza en su celda actual; la vista consumirá poco a poco.
-        # Si quieres pathfinding real, lo añadimos en otra iteración.
-        from ..view_state import get_current_cell  # util local para leer celda actual
-        cx, cy = get_current_cell()
-        dx = 1 if x > cx else -1
-        while cx != x:
-            self.steps.push_step(dx, 0)
-            cx += dx
-        dy = 1 if y > cy else -1
-        while cy != y:
-            self.steps.push_step(0, dy)
-            cy += dy
+            return False
+        start = self.current_cell()
+        if self.page_route is not None:
+            self.page_route(start, (x, y))
+        route = None
+        if self.flow_fields is not None:
+            route = self.flow_fields.plan_route(start, (x, y))
+        if route is None:
+            route = self.pathfinder.plan_route(start, (x, y))
+        if route is None:
+            return False
+        route_id = self.steps.new_route_id()
+        if self.commands is None:
+            self.steps.push_route(route, replace=True, route_id=route_id)
+        elif not self.commands.try_push(MoveCommand(self.npc_id, route_id, route, (x, y), start)):
+            return False
+        self.route_id = route_id
+        return True
+
+    def cancel_move(self) -> bool:
+        """Cancela la última ruta encolada por move_to_cell (el paso en curso termina)."""
+        if self.route_id is None:
+            return False
+        route_id, self.route_id = self.route_id, None
+        if self.commands is None:
+            return self.steps.cancel(route_id)
+        return self.commands.try_push(CancelCommand(self.npc_id, route_id))
+
+    # ---- Resto de primitivas (.catch, .drop, .say): solo se encolan ----
+    def catch(self, obj: str) -> bool:
+        return self._send(CatchCommand(self.npc_id, str(obj)))
+
+    def drop(self, obj: str, cell: Tuple[int, int]) -> bool:
+        return self._send(DropCommand(self.npc_id, str(obj), (int(cell[0]), int(cell[1]))))
+
+    def say(self, text: str) -> bool:
+        return self._send(SayCommand(self.npc_id, str(text)))
+
+    def _send(self, cmd: Command) -> bool:
+        """False si no hay anillo (sin mundo que lo ejecute) o si está lleno."""
+        return self.commands is not None and self.commands.try_push(cmd)
+
+    def current_cell(self) -> Tuple[int, int]:
+        """Celda actual del NPC: del WorldState si lo tenemos, si no vía snapshot del bus."""
+        if self.world is not None:
+            return self.world.cell(self.npc_id)
+        return tuple(self.sync_snapshot().cell)
 
     # ---- Estado/Evento (pull/push) ----
-    def request_snapshot(self) -> WorldSnapshot:
-        return self.bus.request_snapshot(self.npc_id)
+    def request_snapshot(self, since_seq: Optional[int] = None,
+                         known_areas_ref: Optional[str] = None) -> Union[WorldSnapshot, SnapshotDelta]:
+        """
+        Sin since_seq, snapshot completo; con él (y protocolo 1.1+), delta si el bus aún tiene ese base.
+        known_areas_ref es el de las áreas de ese mismo base (None = el delta las incluye); solo sin
+        since_seq se toma el del último snapshot sincronizado.
+        """
+        if since_seq is None and known_areas_ref is None and self._snapshot is not None:
+            known_areas_ref = self._snapshot.areas_ref
+        return self.bus.request_snapshot(self.npc_id, since_seq, known_areas_ref=known_areas_ref,
+                                         version=self.protocol)
 
-    def try_get_event(self, timeout: float = 0.0) -> Optional[WorldEvent]:
+    def sync_snapshot(self) -> WorldSnapshot:
+        """Estado completo actual transfiriendo solo deltas desde el último sincronizado."""
+        base = self._snapshot
+        if base is None:
+            got = self.request_snapshot()
+        else:
+            got = self.request_snapshot(base.seq, base.areas_ref)
+        if isinstance(got, SnapshotDelta):
+            got = apply_delta(base, got)
+        self._snapshot = got
+        return got
+
+    def try_get_event(self, timeout: Optional[float] = 0.0) -> Optional[WorldEvent]:
         return self.bus.try_get_event(self.npc_id, timeout=timeout)
 
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[WorldEvent]:
+        return await self.bus.next_event(self.npc_id, timeout=timeout)
+
+    def events(self) -> AsyncIterator[WorldEvent]:
+        return self.bus.events(self.npc_id)
+
+    def subscribe_topic(self, topic: str) -> None:
+        self.bus.subscribe_topic(self.npc_id, topic)
+
+    def subscribe_area(self, name: str) -> None:
+        """Eventos de un área con nombre (topic "area:<nombre>"), esté donde esté el NPC."""
+        self.bus.subscribe_topic(self.npc_id, f"area:{name}")
+
     # ---- Para que el mundo notifique eventos al NPC ----
     def publish_event(self, ev: WorldEvent) -> None:
         self.bus.publish_event(self.npc_id, ev)
@@ -1,24 +1,106 @@
 from __future__ import annotations
+import itertools
+import threading
 from collections import deque
-from typing import Deque, Optional, Tuple
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+Action = Tuple[int, int]          # (dx,dy)
+Segment = Tuple[int, int, int]    # (dx,dy,n): n pasos en la misma dirección
+RouteItem = Union[Action, Segment]
+
+
+class _Route:
+    """Ruta encolada: fuente (perezosa o no) de pasos/tramos y el tramo en curso."""
+    __slots__ = ("route_id", "source", "dx", "dy", "left")
+
+    def __init__(self, route_id: int, source: Iterator[RouteItem]) -> None:
+        self.route_id = route_id
+        self.source = source
+        self.dx = self.dy = self.left = 0
+
+    def next_step(self) -> Optional[Action]:
+        while self.left <= 0:
+            item = next(self.source, None)
+            if item is None:
+                return None
+            dx, dy = item[0], item[1]
+            n = item[2] if len(item) == 3 else 1
+            if abs(dx) + abs(dy) != 1 or n < 0:
+                raise ValueError("Solo pasos cardinales de 1 celda.")
+            self.dx, self.dy, self.left = dx, dy, n
+        self.left -= 1
+        return self.dx, self.dy
 
-Action = Tuple[int, int]  # (dx,dy)
 
 class NpcStepAdapter:
     """
-    Cola de pasos cardinales para el sprite.
-    La vista la consulta en cada tick; el agente (o el bridge) empuja pasos.
+    Cola de rutas del sprite: la simulación saca un paso cardinal por tick; el agente (o el
+    bridge) encola rutas.
+    - Cada ruta es una fuente de tramos (dx, dy, n) o de pasos sueltos (dx, dy), y puede ser
+      perezosa (p.ej. refinado HPA* por tramos): memoria O(giros), no O(distancia).
+    - Cada ruta tiene un id: se puede cancelar o sustituir de forma atómica; el cambio se ve
+      en el siguiente tick (el paso en curso termina en su celda).
+    Thread-safe: push/cancel desde el hilo del agente, try_pop desde el de simulación.
     """
     def __init__(self) -> None:
-        self._q: Deque[Action] = deque()
+        self._q: Deque[_Route] = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # ---- Encolar ----
+    def new_route_id(self) -> int:
+        return next(self._ids)
 
-    def push_step(self, dx: int, dy: int) -> None:
+    def push_route(self, route: Iterable[RouteItem], replace: bool = False, route_id: int | None = None) -> int:
+        """Encola una ruta (o sustituye todas las pendientes si replace=True); devuelve su id."""
+        with self._lock:
+            entry = _Route(route_id if route_id is not None else next(self._ids), iter(route))
+            if replace:
+                self._q.clear()
+            self._q.append(entry)
+            return entry.route_id
+
+    def push_step(self, dx: int, dy: int) -> int:
         if abs(dx) + abs(dy) != 1:
             raise ValueError("Solo pasos cardinales de 1 celda.")
-        self._q.append((dx, dy))
+        return self.push_route(((dx, dy, 1),))
+
+    def push_steps(self, steps: Iterable[RouteItem]) -> int:
+        """Encola una ruta perezosa; se consume en orden tras las ya encoladas."""
+        return self.push_route(steps)
+
+    # ---- Cancelar ----
+    def cancel(self, route_id: Optional[int] = None) -> bool:
+        """Cancela la ruta `route_id` (o todas si es None). Devuelve si había algo que cancelar."""
+        with self._lock:
+            if route_id is None:
+                had = bool(self._q)
+                self._q.clear()
+                return had
+            for entry in self._q:
+                if entry.route_id == route_id:
+                    self._q.remove(entry)
+                    return True
+            return False
+
+    @property
+    def current_route(self) -> Optional[int]:
+        with self._lock:
+            return self._q[0].route_id if self._q else None
+
+    def pending_routes(self) -> List[int]:
+        with self._lock:
+            return [entry.route_id for entry in self._q]
 
+    # ---- Consumo (hilo de simulación) ----
     def has_steps(self) -> bool:
         return bool(self._q)
 
     def try_pop(self) -> Optional[Action]:
-        return self._q.popleft() if self._q else None
\ No newline at end of file
+        with self._lock:
+            while self._q:
+                step = self._q[0].next_step()
+                if step is not None:
+                    return step
+                self._q.popleft()
+            return None
@@ -1,22 +1,50 @@
 from __future__ import annotations
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
 import arcade
-from .config import BAKERY_X1, BAKERY_Y1, BAKERY_X2, BAKERY_Y2, TILE, BAKERY_FILL, BAKERY_OUTLINE
+from .config import TILE, BAKERY_FILL, BAKERY_OUTLINE
 
-class BakeryArea:
-    """Zona rectangular que representa la panadería."""
-    def __init__(self, label: str = "PANADERÍA") -> None:
-        self.label = label
+LABEL_SIZE = 16
+AreaShape = Tuple[float, float, float, float, str]  # (x, y, w, h, etiqueta) en píxeles
 
-        self.x = BAKERY_X1 * TILE
-        self.y = BAKERY_Y1 * TILE
-        self.w = (BAKERY_X2 - BAKERY_X1 + 1) * TILE
-        self.h = (BAKERY_Y2 - BAKERY_Y1 + 1) * TILE
+def area_shapes(rects_labels: Iterable[Tuple[Sequence[int], str]]) -> List[AreaShape]:
+    """Rectángulo en píxeles (esquina inferior izquierda y tamaño) y etiqueta de cada área (sin GL)."""
+    out = []
+    for (x1, y1, x2, y2), label in rects_labels:
+        out.append((x1 * TILE, y1 * TILE, (x2 - x1 + 1) * TILE, (y2 - y1 + 1) * TILE, label))
+    return out
 
-    def rect_cells(self) -> list[int]:
-        return [BAKERY_X1, BAKERY_Y1, BAKERY_X2, BAKERY_Y2]
-    
-    def draw(self) -> None:
-        cx, cy = self.x + self.w / 2, self.y + self.h / 2
-        arcade.draw_rectangle_filled(cx, cy, self.w, self.h, BAKERY_FILL)
-        arcade.draw_rectangle_outline(cx, cy, self.w, self.h, BAKERY_OUTLINE, border_width=3)
-        arcade.draw_text(self.label, self.x + 12, self.y + self.h - 28, BAKERY_OUTLINE, 16, bold=True)
+def _build_batch(areas: Sequence[AreaShape]) -> Tuple[arcade.ShapeElementList, List[arcade.Text]]:
+    """Rellenos y bordes en una ShapeElementList (un draw) y etiquetas pre-rasterizadas (arcade.Text)."""
+    shapes = arcade.ShapeElementList()
+    labels: List[arcade.Text] = []
+    for x, y, w, h, label in areas:
+        cx, cy = x + w / 2, y + h / 2
+        shapes.append(arcade.create_rectangle_filled(cx, cy, w, h, BAKERY_FILL))
+        shapes.append(arcade.create_rectangle_outline(cx, cy, w, h, BAKERY_OUTLINE, border_width=3))
+        if label:
+            labels.append(arcade.Text(label, x + 12, y + h - 28, BAKERY_OUTLINE, LABEL_SIZE, bold=True))
+    return shapes, labels
+
+
+class AreaRenderer:
+    """
+    Dibuja todas las áreas del mundo desde una caché: una ShapeElementList para los rectángulos
+    y un arcade.Text por etiqueta. Solo se reconstruye cuando cambia la versión del conjunto de áreas.
+    `build` convierte la geometría (area_shapes) en (formas, etiquetas), ambas con draw().
+    """
+    def __init__(self, build: Callable[[Sequence[AreaShape]], Tuple[Any, List[Any]]] = _build_batch) -> None:
+        self._build = build
+        self._version: Optional[int] = None
+        self._batch: Optional[Tuple[Any, List[Any]]] = None
+
+    def draw(self, areas: Sequence[dict], version: int) -> None:
+        """`areas` como WorldSim.areas ({name, rect, label}); `version` cambia al añadir/quitar áreas."""
+        if self._batch is None or version != self._version:
+            self._batch = self._build(area_shapes(
+                (a["rect"], a.get("label") or a["name"].upper()) for a in areas
+            ))
+            self._version = version
+        shapes, labels = self._batch
+        shapes.draw()
+        for text in labels:
+            text.draw()
@@ -19,6 +19,12 @@ NPC_COLOR = (40, 120, 255)
 BAKERY_X1, BAKERY_Y1 = 50, 50
 BAKERY_X2, BAKERY_Y2 = 60, 60
 
+# Pathfinding: a partir de este número de celdas WorldSim planifica con HPA* (precalculado en
+# segundo plano) en lugar de A* plano
+HPA_MIN_CELLS: int = 512 * 512
+# Mundos sobre tilemap: los campos de flujo cubren solo el área ampliada en este margen (celdas)
+FLOW_FIELD_MARGIN: int = 256
+
 # Movimiento
 STEP_TIME: float = 0.12  # s por paso de 1 celda
 CAMERA_SMOOTH: float = 1.0  # 1.0 = instantáneo; <1.0 suavizado
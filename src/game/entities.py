@@ -1,41 +1,51 @@
 from __future__ import annotations
 import arcade
+import numpy as np
 from .config import TILE, NPC_COLOR, STEP_TIME
-from .grid import cell_to_center_px
+from .world_state import WorldState
+from .movement import integrate_rows
 
 class GridWalker(arcade.SpriteSolidColor):
-    """Sprite cuadrado que se mueve por rejilla (4 direcciones, 1 celda/paso)."""
+    """
+    Sprite cuadrado que se mueve por rejilla (4 direcciones, 1 celda/paso).
+    Su estado (celda, destino, paso en curso) vive en una fila de WorldState;
+    el sprite solo es la representación visual.
+    """
 
-    def __init__(self, size: int, start_cell: tuple[int, int]) -> None:
+    def __init__(
+        self,
+        size: int,
+        start_cell: tuple[int, int],
+        world: WorldState | None = None,
+        entity_id: str = "npc",
+    ) -> None:
         super().__init__(size, size, NPC_COLOR)
-        self.cell_x, self.cell_y = start_cell
-        self.center_x, self.center_y = cell_to_center_px(self.cell_x, self.cell_y)
-        self._target_px = (self.center_x, self.center_y)
-        self._moving: bool = False
-        self._t: float = 0.0
+        self.world = world if world is not None else WorldState(capacity=1)
+        self.entity_id = entity_id
+        if entity_id not in self.world:
+            self.world.add(entity_id, start_cell)
+        self.center_x, self.center_y = self.world.position(entity_id)
+
+    # ---- Estado (leído de WorldState) ----
+    @property
+    def cell_x(self) -> int:
+        return self.world.cell(self.entity_id)[0]
+
+    @property
+    def cell_y(self) -> int:
+        return self.world.cell(self.entity_id)[1]
 
     # ---- API de alto nivel: mover 1 celda ----
     def step(self, dx: int, dy: int) -> None:
-        if (abs(dx) + abs(dy)) != 1:
-            return
-        self.cell_x += dx
-        self.cell_y += dy
-        self._target_px = cell_to_center_px(self.cell_x, self.cell_y)
-        self._moving = True
-        self._t = 0.0
+        self.world.step(self.entity_id, dx, dy)
 
     def is_moving(self) -> bool:
-        return self._moving
+        return self.world.is_moving(self.entity_id)
 
     # ---- Update ----
     def on_update(self, delta_time: float = 1/60) -> None:
-        if not self._moving:
-            return
-        self._t += delta_time
-        alpha = min(self._t / STEP_TIME, 1.0)
-        # LERP hacia el objetivo
-        self.center_x += (self._target_px[0] - self.center_x) * alpha
-        self.center_y += (self._target_px[1] - self.center_y) * alpha
-        if self._t >= STEP_TIME - 1e-6:
-            self.center_x, self.center_y = self._target_px
-            self._moving = False
+        # Mismo integrador que el lote de MainView, aplicado a una sola fila
+        row = self.world.index_of(self.entity_id)
+        moved = integrate_rows(self.world, np.array([row]), delta_time, STEP_TIME)
+        if moved.size:
+            self.center_x, self.center_y = self.world.position(self.entity_id)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .pathfinding import Cell, Segment, Step, WalkGrid, astar, path_to_segments
+
+Rect = Tuple[int, int, int, int]  # (x1, y1, x2, y2) ambos inclusive
+
+# Orden de vecinos: +x, -x, +y, -y
+_DIRS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.int8)
+
+
+@dataclass(frozen=True)
+class FlowField:
+    """
+    Campo de distancias y direcciones hacia un área (calculado para una versión de la rejilla).
+    Cubre la ventana que empieza en `origin` (toda la rejilla si no se acotó con un margen).
+    """
+    name: str
+    rect: Rect
+    version: int
+    dist: np.ndarray  # int32 [x - ox, y - oy]; -1 = inalcanzable
+    dx: np.ndarray    # int8 [x - ox, y - oy]
+    dy: np.ndarray
+    origin: Cell = (0, 0)
+
+    def contains(self, x: int, y: int) -> bool:
+        x1, y1, x2, y2 = self.rect
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+    def step_at(self, x: int, y: int) -> Optional[Step]:
+        """Paso a dar desde (x, y); None si ya está en el área, no hay camino o cae fuera de la ventana."""
+        x, y = x - self.origin[0], y - self.origin[1]
+        w, h = self.dist.shape
+        if not (0 <= x < w and 0 <= y < h) or self.dist[x, y] <= 0:
+            return None
+        return int(self.dx[x, y]), int(self.dy[x, y])
+
+
+def compute_flow_field(grid: WalkGrid, name: str, rect: Rect, margin: Optional[int] = None) -> FlowField:
+    """
+    BFS vectorizado (frente de onda con NumPy) desde todas las celdas del área a la vez.
+    Con `margin`, solo dentro del área ampliada en `margin` celdas: memoria y tiempo no crecen
+    con el tamaño del mapa.
+    """
+    ox = oy = 0
+    w, h = grid.width, grid.height
+    if margin is not None:
+        ox, oy = max(0, rect[0] - margin), max(0, rect[1] - margin)
+        w, h = min(grid.width, rect[2] + margin + 1) - ox, min(grid.height, rect[3] + margin + 1) - oy
+    walk = grid.cells[ox:ox + w, oy:oy + h]
+    x1, y1, x2, y2 = rect[0] - ox, rect[1] - oy, rect[2] - ox, rect[3] - oy
+    dist = np.full((w, h), -1, dtype=np.int32)
+    frontier = np.zeros((w, h), dtype=bool)
+    frontier[max(0, x1):x2 + 1, max(0, y1):y2 + 1] = True
+    frontier &= walk
+    dist[frontier] = 0
+    visited = frontier.copy()
+
+    # Caja que contiene el frente actual; cada iteración trabaja solo en ella (+1 de margen)
+    fx1, fy1, fx2, fy2 = max(0, x1), max(0, y1), min(w, x2 + 1), min(h, y2 + 1)
+    d = 0
+    while fx1 < fx2 and fy1 < fy2:
+        bx1, bx2 = max(0, fx1 - 1), min(w, fx2 + 1)
+        by1, by2 = max(0, fy1 - 1), min(h, fy2 + 1)
+        f = frontier[bx1:bx2, by1:by2]
+        grown = np.zeros_like(f)
+        grown[1:, :] |= f[:-1, :]
+        grown[:-1, :] |= f[1:, :]
+        grown[:, 1:] |= f[:, :-1]
+        grown[:, :-1] |= f[:, 1:]
+        grown &= walk[bx1:bx2, by1:by2] & ~visited[bx1:bx2, by1:by2]
+
+        d += 1
+        frontier[bx1:bx2, by1:by2] = grown
+        visited[bx1:bx2, by1:by2] |= grown
+        dist[bx1:bx2, by1:by2][grown] = d
+
+        xs = np.flatnonzero(grown.any(axis=1))
+        if xs.size == 0:
+            break
+        ys = np.flatnonzero(grown.any(axis=0))
+        fx1, fx2 = bx1 + int(xs[0]), bx1 + int(xs[-1]) + 1
+        fy1, fy2 = by1 + int(ys[0]), by1 + int(ys[-1]) + 1
+
+    # Dirección = vecino con menor distancia (los inalcanzables cuentan como infinito)
+    big = np.iinfo(np.int32).max
+    dd = np.where(dist >= 0, dist, big)
+    neigh = np.full((4, w, h), big, dtype=np.int32)
+    neigh[0, :-1, :] = dd[1:, :]
+    neigh[1, 1:, :] = dd[:-1, :]
+    neigh[2, :, :-1] = dd[:, 1:]
+    neigh[3, :, 1:] = dd[:, :-1]
+    best = neigh.argmin(axis=0)
+    moves = dist > 0
+    dx = np.where(moves, _DIRS[best, 0], 0).astype(np.int8)
+    dy = np.where(moves, _DIRS[best, 1], 0).astype(np.int8)
+    return FlowField(name, tuple(rect), grid.version, dist, dx, dy, (ox, oy))
+
+
+class FlowFieldService:
+    """
+    Campos de flujo compartidos por destino popular (p.ej. la panadería).
+    N NPCs hacia la misma zona = 1 cálculo de campo + O(1) por paso. Con `margin`, cada campo
+    cubre solo el área ampliada en ese margen (mapas grandes); desde fuera no hay ruta por campo.
+    Cada campo se recalcula solo cuando cambia la versión de la WalkGrid, al pedirlo desde
+    plan_route (hilo del agente).
+    """
+    def __init__(self, grid: WalkGrid, margin: Optional[int] = None) -> None:
+        self.grid = grid
+        self.margin = margin  # None = campos sobre toda la rejilla; si no, área ± margin
+        self._areas: Dict[str, Rect] = {}
+        self._fields: Dict[str, FlowField] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register_area(self, name: str, rect: List[int] | Rect) -> None:
+        with self._lock:
+            self._areas[name] = tuple(rect)
+            self._fields.pop(name, None)
+
+    def unregister_area(self, name: str) -> None:
+        with self._lock:
+            self._areas.pop(name, None)
+            self._fields.pop(name, None)
+
+    def area_at(self, cell: Cell) -> Optional[str]:
+        x, y = cell
+        with self._lock:
+            for name, (x1, y1, x2, y2) in self._areas.items():
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    return name
+        return None
+
+    def field(self, name: str) -> FlowField:
+        with self._lock:
+            rect = self._areas[name]
+            f = self._fields.get(name)
+            if f is not None and f.version == self.grid.version:
+                self.hits += 1
+                return f
+            self.misses += 1
+        f = compute_flow_field(self.grid, name, rect, self.margin)
+        with self._lock:
+            if name in self._areas:
+                self._fields[name] = f
+        return f
+
+    def plan_route(self, start: Cell, goal: Cell) -> Optional[Iterator[Segment]]:
+        """
+        Ruta hacia `goal` si cae en un área registrada y se llega a él; None en otro caso (también
+        si desde la entrada al área no hay camino hasta `goal` dentro del rect): el llamador cae
+        entonces al pathfinder. Se calcula entera aquí (hilo del agente): el descenso por el campo
+        y el tramo final con A*, en tramos rectos (dx, dy, n); la simulación solo los consume.
+        """
+        name = self.area_at(goal)
+        if name is None or not self.grid.is_walkable(*goal):
+            return None
+        f = self.field(name)
+        x, y = start
+        segments: List[Segment] = []
+        while not f.contains(x, y):
+            step = f.step_at(x, y)
+            if step is None:
+                return None
+            _extend(segments, step[0], step[1], 1)
+            x, y = x + step[0], y + step[1]
+        if (x, y) != tuple(goal):
+            path = astar(self.grid, (x, y), tuple(goal), bounds=f.rect)
+            if path is None:
+                return None
+            for dx, dy, n in path_to_segments(path):
+                _extend(segments, dx, dy, n)
+        return iter(segments)
+
+
+def _extend(segments: List[Segment], dx: int, dy: int, n: int) -> None:
+    """Añade n pasos (dx, dy) alargando el último tramo si va en la misma dirección."""
+    if segments and segments[-1][0] == dx and segments[-1][1] == dy:
+        segments[-1] = (dx, dy, segments[-1][2] + n)
+    else:
+        segments.append((dx, dy, n))
@@ -1,28 +1,61 @@
 from __future__ import annotations
+from typing import Any, Callable, List, Tuple
 import arcade
 from .config import TILE, WORLD_W, WORLD_H, GRID_COLOR
 
+
+def grid_lines(x1: int, y1: int, x2: int, y2: int) -> List[Tuple[float, float]]:
+    """Extremos (por pares) de las líneas de la rejilla entre las celdas x1..x2, y1..y2 (sin GL)."""
+    left, right, bottom, top = x1 * TILE, x2 * TILE, y1 * TILE, y2 * TILE
+    points = []
+    for cx in range(x1, x2 + 1):
+        points += [(cx * TILE, bottom), (cx * TILE, top)]
+    for cy in range(y1, y2 + 1):
+        points += [(left, cy * TILE), (right, cy * TILE)]
+    return points
+
+
+def _build_lines(points: List[Tuple[float, float]]) -> arcade.ShapeElementList:
+    shapes = arcade.ShapeElementList()
+    shapes.append(arcade.create_lines(points, GRID_COLOR, 1))
+    return shapes
+
+
 class GridRenderer:
-    """Dibuja la rejilla solo en el viewport visible (barato en mapas grandes)."""
+    """
+    Dibuja la rejilla visible desde una ShapeElementList cacheada (un solo draw por frame).
+    Se construye para el rango visible más un margen y solo se reconstruye cuando la cámara
+    sale de ese rango. `build` convierte los extremos de las líneas en algo con draw().
+    """
 
-    def draw_visible(self, camera: arcade.Camera, screen_w: int, screen_h: int) -> None:
+    def __init__(self, margin_cells: int = 8, build: Callable[[List[Tuple[float, float]]], Any] = _build_lines) -> None:
+        self.margin_cells = margin_cells
+        self._build = build
+        self._shapes: Any = None
+        self._range: tuple[int, int, int, int] | None = None  # celdas (x1, y1, x2, y2) cacheadas
+
+    @staticmethod
+    def visible_range(camera: arcade.Camera, screen_w: int, screen_h: int) -> tuple[int, int, int, int]:
         vx, vy = camera.position
-        vw, vh = screen_w, screen_h
-
-        left = max(0, (vx // TILE) * TILE - TILE)
-        right = min(WORLD_W * TILE, ((vx + vw) // TILE + 2) * TILE)
-        bottom = max(0, (vy // TILE) * TILE - TILE)
-        top = min(WORLD_H * TILE, ((vy + vh) // TILE + 2) * TILE)
-
-        x = left
-        while x <= right:
-            arcade.draw_line(x, bottom, x, top, GRID_COLOR, 1)
-            x += TILE
-
-        y = bottom
-        while y <= top:
-            arcade.draw_line(left, y, right, y, GRID_COLOR, 1)
-            y += TILE
+        x1 = max(0, int(vx // TILE) - 1)
+        y1 = max(0, int(vy // TILE) - 1)
+        x2 = min(WORLD_W, int((vx + screen_w) // TILE) + 2)
+        y2 = min(WORLD_H, int((vy + screen_h) // TILE) + 2)
+        return x1, y1, x2, y2
+
+    def _rebuild(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        m = self.margin_cells
+        x1, y1 = max(0, x1 - m), max(0, y1 - m)
+        x2, y2 = min(WORLD_W, x2 + m), min(WORLD_H, y2 + m)
+        self._shapes = self._build(grid_lines(x1, y1, x2, y2))
+        self._range = (x1, y1, x2, y2)
+
+    def draw_visible(self, camera: arcade.Camera, screen_w: int, screen_h: int) -> None:
+        x1, y1, x2, y2 = self.visible_range(camera, screen_w, screen_h)
+        r = self._range
+        if self._shapes is None or x1 < r[0] or y1 < r[1] or x2 > r[2] or y2 > r[3]:
+            self._rebuild(x1, y1, x2, y2)
+        self._shapes.draw()
 
 def cell_to_center_px(cx: int, cy: int) -> tuple[float, float]:
     return cx * TILE + TILE / 2, cy * TILE + TILE / 2
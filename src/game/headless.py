@@ -0,0 +1,58 @@
+from __future__ import annotations
+import time
+from typing import Callable, Sequence, Tuple
+
+from .adapters.npc_step_adapter import NpcStepAdapter
+from .messaging.world_bus import WorldBus
+from .simulation import WorldSim, default_spawn
+
+
+class HeadlessRunner:
+    """
+    Avanza un WorldSim tick a tick (paso fijo de su SimClock) y sin Arcade
+    (servidores sin pantalla, benchmarks, tests).
+    Por defecto va tan rápido como dé la CPU; con realtime=True duerme para ir a 1x.
+    """
+    def __init__(self, sim: WorldSim, realtime: bool = False) -> None:
+        self.sim = sim
+        self.realtime = realtime
+
+    @property
+    def dt(self) -> float:
+        return self.sim.clock.dt
+
+    def step(self, ticks: int = 1) -> None:
+        t0 = time.perf_counter()
+        for i in range(ticks):
+            self.sim.tick()
+            if self.realtime:
+                ahead = t0 + (i + 1) * self.dt - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def run_for(self, sim_seconds: float) -> int:
+        """Simula `sim_seconds` de tiempo de mundo; devuelve los ticks ejecutados."""
+        ticks = max(0, round(sim_seconds / self.dt))
+        self.step(ticks)
+        return ticks
+
+    def run_until(self, done: Callable[[], bool], max_ticks: int = 1_000_000) -> bool:
+        """Avanza hasta que `done()` sea cierto o se agoten los ticks."""
+        for _ in range(max_ticks):
+            if done():
+                return True
+            self.step()
+        return done()
+
+
+def bootstrap_headless(
+    npc_id: str = "npc_eldric",
+    extra_npc_ids: Sequence[str] = (),
+    tick_rate: float = 60.0,
+) -> Tuple[HeadlessRunner, WorldSim, NpcStepAdapter, WorldBus]:
+    """Equivalente a bootstrap_world pero sin ventana: mismo estado inicial y mismo WorldBus."""
+    sim = WorldSim(tick_rate=tick_rate)
+    step_adapter = sim.add_npc(npc_id, default_spawn(0))
+    for i, other_id in enumerate(extra_npc_ids, start=1):
+        sim.add_npc(other_id, default_spawn(i))
+    return HeadlessRunner(sim), sim, step_adapter, sim.bus
@@ -0,0 +1,387 @@
+from __future__ import annotations
+import heapq
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .pathfinding import Cell, Segment, Step, WalkGrid, astar, path_to_segments, path_to_steps
+
+ClusterId = Tuple[int, int]
+# ("v", k, j): frontera entre clusters (k-1, j) y (k, j); ("h", i, k): entre (i, k-1) y (i, k)
+BorderKey = Tuple[str, int, int]
+# Palabra más pequeña que cubre el lado de un cluster (BFS intra-cluster por bits)
+_WORDS = ((8, np.uint8), (16, np.uint16), (32, np.uint32), (64, np.uint64))
+
+
+class HierarchicalPathFinder:
+    """
+    HPA*: divide el mundo en clusters de `cluster_size`×`cluster_size` celdas.
+    - Entradas: tramos transitables a ambos lados de cada frontera (1 o 2 nodos por tramo).
+    - Distancias intra-cluster: BFS acotado al cluster, cacheado. precompute() las calcula todas
+      de una vez y precompute_async() en un hilo de fondo (es lo que hace WorldSim); las que
+      aún falten se calculan la primera vez que la búsqueda abstracta pasa por el cluster.
+    - Refinado: solo se baja a celdas el tramo abstracto que va a consumir NpcStepAdapter.
+    - Cambios en la WalkGrid: se recalculan solo las fronteras/clusters afectados.
+    """
+    def __init__(self, grid: WalkGrid, cluster_size: int = 16, max_entrance_width: int = 6) -> None:
+        self.grid = grid
+        self.cs = cluster_size
+        self.max_entrance_width = max_entrance_width
+        self.ncx = -(-grid.width // cluster_size)
+        self.ncy = -(-grid.height // cluster_size)
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._borders: Dict[BorderKey, List[Tuple[Cell, Cell]]] = {}
+        self._inter: Dict[Cell, Set[Cell]] = {}
+        self._nodes: Dict[ClusterId, Tuple[Cell, ...]] = {}
+        self._intra: Dict[ClusterId, Dict[Cell, List[Tuple[Cell, int]]]] = {}
+        self.ready = threading.Event()  # se activa cuando precompute() termina con todos los clusters
+
+        for k in range(1, self.ncx):
+            self._scan_border("v", k, 0, self.ncy - 1)
+        for k in range(1, self.ncy):
+            self._scan_border("h", k, 0, self.ncx - 1)
+        grid.add_listener(self._on_grid_change)
+
+    # ---- Geometría de clusters ----
+    def cluster_of(self, cell: Cell) -> ClusterId:
+        return cell[0] // self.cs, cell[1] // self.cs
+
+    def cluster_rect(self, c: ClusterId) -> Tuple[int, int, int, int]:
+        x1, y1 = c[0] * self.cs, c[1] * self.cs
+        return x1, y1, min(x1 + self.cs, self.grid.width) - 1, min(y1 + self.cs, self.grid.height) - 1
+
+    def _border_clusters(self, key: BorderKey) -> Tuple[ClusterId, ClusterId]:
+        kind, a, b = key
+        if kind == "v":
+            return (a - 1, b), (a, b)
+        return (a, b - 1), (a, b)
+
+    # ---- Entradas (vectorizado por línea de frontera) ----
+    def _scan_border(self, kind: str, k: int, j1: int, j2: int) -> None:
+        """Recalcula las entradas de las fronteras (kind, k, j) para j en [j1, j2]."""
+        cs, cells = self.cs, self.grid.cells
+        limit = self.grid.height if kind == "v" else self.grid.width
+        lo, hi = j1 * cs, min((j2 + 1) * cs, limit)
+        edge = k * cs - 1
+        if kind == "v":
+            mask = cells[edge, lo:hi] & cells[edge + 1, lo:hi]
+        else:
+            mask = cells[lo:hi, edge] & cells[lo:hi, edge + 1]
+
+        n = j2 - j1 + 1
+        flat = np.zeros(n * cs, dtype=np.int8)
+        flat[:hi - lo] = mask
+        padded = np.zeros((n, cs + 2), dtype=np.int8)
+        padded[:, 1:-1] = flat.reshape(n, cs)
+        d = np.diff(padded, axis=1)
+        rows, starts = np.nonzero(d == 1)
+        _, ends = np.nonzero(d == -1)  # mismo orden fila a fila que starts
+
+        found: Dict[int, List[Tuple[Cell, Cell]]] = {}
+        for r, s, e in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+            if e - s < self.max_entrance_width:
+                picks = ((s + e - 1) // 2,)
+            else:
+                picks = (s, e - 1)
+            base = lo + r * cs
+            for t in picks:
+                pos = base + t
+                if kind == "v":
+                    found.setdefault(j1 + r, []).append(((edge, pos), (edge + 1, pos)))
+                else:
+                    found.setdefault(j1 + r, []).append(((pos, edge), (pos, edge + 1)))
+
+        # Solo se tocan las fronteras con entradas o que las tenían (mapas casi vacíos: casi nada)
+        borders = self._borders
+        for j in range(j1, j2 + 1):
+            key = (kind, k, j) if kind == "v" else (kind, j, k)
+            pairs = found.get(j)
+            if pairs is not None or key in borders:
+                self._set_border(key, pairs or [])
+
+    def _set_border(self, key: BorderKey, pairs: List[Tuple[Cell, Cell]]) -> None:
+        old = self._borders.get(key, [])
+        if old == pairs:
+            return
+        for a, b in old:
+            self._inter.get(a, set()).discard(b)
+            self._inter.get(b, set()).discard(a)
+        for a, b in pairs:
+            self._inter.setdefault(a, set()).add(b)
+            self._inter.setdefault(b, set()).add(a)
+        if pairs:
+            self._borders[key] = pairs
+        else:
+            self._borders.pop(key, None)
+        for c in self._border_clusters(key):
+            self._nodes.pop(c, None)
+            self._intra.pop(c, None)
+
+    def _cluster_nodes(self, c: ClusterId) -> Tuple[Cell, ...]:
+        nodes = self._nodes.get(c)
+        if nodes is None:
+            ci, cj = c
+            seen: Dict[Cell, None] = {}
+            for key, side in ((("v", ci, cj), 1), (("v", ci + 1, cj), 0),
+                              (("h", ci, cj), 1), (("h", ci, cj + 1), 0)):
+                for pair in self._borders.get(key, ()):
+                    seen[pair[side]] = None
+            nodes = tuple(seen)
+            self._nodes[c] = nodes
+        return nodes
+
+    # ---- Distancias intra-cluster (perezosas) ----
+    def _bfs(self, src: Cell, c: ClusterId, targets: Tuple[Cell, ...],
+             local: bytes | None = None) -> Dict[Cell, int]:
+        """Distancias BFS desde src a `targets` sin salir del cluster c (índices locales al cluster)."""
+        x1, y1, x2, y2 = self.cluster_rect(c)
+        ch = y2 - y1 + 1
+        if local is None:
+            local = self.grid.cells[x1:x2 + 1, y1:y2 + 1].tobytes()
+        size = len(local)
+        wanted = {(t[0] - x1) * ch + (t[1] - y1): t for t in targets}
+        out: Dict[Cell, int] = {}
+        s = (src[0] - x1) * ch + (src[1] - y1)
+        dist = [-1] * size
+        dist[s] = 0
+        if s in wanted:
+            out[wanted[s]] = 0
+        frontier = deque([s])
+        while frontier and len(out) < len(wanted):
+            cur = frontier.popleft()
+            nd = dist[cur] + 1
+            ly = cur % ch
+            for nb, ok in ((cur + ch, cur + ch < size), (cur - ch, cur >= ch),
+                           (cur + 1, ly + 1 < ch), (cur - 1, ly > 0)):
+                if not ok or dist[nb] >= 0 or not local[nb]:
+                    continue
+                dist[nb] = nd
+                frontier.append(nb)
+                if nb in wanted:
+                    out[wanted[nb]] = nd
+        return out
+
+    def _cluster_edges(self, c: ClusterId) -> Dict[Cell, List[Tuple[Cell, int]]]:
+        edges = self._intra.get(c)
+        if edges is None:
+            self._compute_edges([c])
+            edges = self._intra[c]
+        return edges
+
+    def _compute_edges(self, clusters: List[ClusterId]) -> None:
+        """
+        Distancias entre las entradas de cada cluster con un BFS vectorizado sobre bits: una
+        capa por (cluster, entrada origen), cada columna x del cluster es una palabra cuyos bits
+        son las y; todas las capas avanzan a la vez un anillo por iteración, hasta alcanzar
+        todas las entradas o agotar la frontera. Con clusters de más de 64 celdas de lado se
+        usa el BFS por celdas.
+        """
+        cs, cells = self.cs, self.grid.cells
+        word = next((t for bits, t in _WORDS if cs <= bits), None)
+        if word is None:
+            for c in clusters:
+                nodes = self._cluster_nodes(c)
+                self._intra[c] = {n: [(m, d) for m, d in self._bfs(n, c, nodes).items() if m != n]
+                                  for n in nodes}
+            return
+        todo = [(c, self._cluster_nodes(c)) for c in clusters]
+        rows = sum(len(nodes) for _, nodes in todo)
+        weights = word(1) << np.arange(cs, dtype=word)
+        walk = np.zeros((rows, cs), dtype=word)
+        frontier = np.zeros_like(walk)
+        pr: List[int] = []  # pares (capa origen, entrada destino en coordenadas locales)
+        px: List[int] = []
+        py: List[int] = []
+        r = 0
+        for c, nodes in todo:
+            x1, y1, x2, y2 = self.cluster_rect(c)
+            block = cells[x1:x2 + 1, y1:y2 + 1]
+            walk[r:r + len(nodes), :x2 - x1 + 1] = (block * weights[:block.shape[1]]).sum(axis=1, dtype=word)
+            local = [(nx - x1, ny - y1) for nx, ny in nodes]
+            for k, (lx, ly) in enumerate(local):
+                frontier[r + k, lx] = weights[ly]
+                pr.extend([r + k] * len(local))
+                px.extend(m[0] for m in local)
+                py.extend(m[1] for m in local)
+            r += len(nodes)
+        pr_a, px_a = np.array(pr, dtype=np.intp), np.array(px, dtype=np.intp)
+        bit = weights[np.array(py, dtype=np.intp)]
+        dist = np.where(frontier[pr_a, px_a] & bit, 0, -1)
+        unvisited = walk & ~frontier
+        one = word(1)
+        nxt = np.empty_like(walk)
+        d = 0
+        while True:
+            pending = dist < 0
+            if not pending.any() or not frontier.any():
+                break
+            d += 1
+            np.left_shift(frontier, one, out=nxt)
+            nxt |= frontier >> one
+            nxt[:, 1:] |= frontier[:, :-1]
+            nxt[:, :-1] |= frontier[:, 1:]
+            nxt &= unvisited
+            unvisited ^= nxt
+            dist[pending & ((nxt[pr_a, px_a] & bit) != 0)] = d
+            frontier, nxt = nxt, frontier
+        dl, i = dist.tolist(), 0
+        for c, nodes in todo:
+            edges: Dict[Cell, List[Tuple[Cell, int]]] = {}
+            for n in nodes:
+                edges[n] = [(m, dl[i + j]) for j, m in enumerate(nodes) if m != n and dl[i + j] >= 0]
+                i += len(nodes)
+            self._intra[c] = edges
+
+    def precompute(self, clusters: Optional[List[ClusterId]] = None, batch: int = 256) -> None:
+        """
+        Calcula por adelantado las distancias intra-cluster (todas o solo las indicadas), en
+        lotes de `batch` clusters; el lock se toma lote a lote y las consultas se intercalan.
+        """
+        full = clusters is None
+        if full:
+            clusters = [(i, j) for i in range(self.ncx) for j in range(self.ncy)]
+        for i in range(0, len(clusters), batch):
+            with self._lock:
+                missing = [c for c in clusters[i:i + batch] if c not in self._intra]
+                if missing:
+                    self._compute_edges(missing)
+        if full:
+            self.ready.set()
+
+    def precompute_async(self) -> threading.Thread:
+        """precompute() de todos los clusters en un hilo de fondo; `ready` avisa al terminar."""
+        thread = threading.Thread(target=self.precompute, name="hpa-precompute", daemon=True)
+        thread.start()
+        return thread
+
+    # ---- Búsqueda abstracta ----
+    def find_abstract_path(self, start: Cell, goal: Cell) -> Optional[List[Cell]]:
+        """Ruta sobre el grafo de entradas: [start, n1, ..., goal] o None."""
+        start, goal = tuple(start), tuple(goal)
+        with self._lock:
+            if not self.grid.is_walkable(*goal) or not self.grid.in_bounds(*start):
+                return None
+            if start == goal:
+                return [start]
+            c_start, c_goal = self.cluster_of(start), self.cluster_of(goal)
+            start_targets = self._cluster_nodes(c_start)
+            if c_start == c_goal:
+                start_targets = start_targets + (goal,)
+            start_edges = self._bfs(start, c_start, start_targets)
+            if c_start == c_goal and goal in start_edges:
+                # Mismo cluster y conectados por dentro: no hace falta subir de nivel
+                return [start, goal]
+            goal_edges = self._bfs(goal, c_goal, self._cluster_nodes(c_goal))
+
+            gx, gy = goal
+            g_score: Dict[Cell, int] = {start: 0}
+            came_from: Dict[Cell, Cell] = {}
+            open_heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+            closed: Set[Cell] = set()
+            while open_heap:
+                _, neg_g, cur = heapq.heappop(open_heap)
+                if cur == goal:
+                    path = [cur]
+                    while cur in came_from:
+                        cur = came_from[cur]
+                        path.append(cur)
+                    path.reverse()
+                    return path
+                if cur in closed:
+                    continue
+                closed.add(cur)
+                g = -neg_g
+
+                if cur == start:
+                    succ = [(n, d) for n, d in start_edges.items() if n != goal]
+                    succ.extend((m, 1) for m in self._inter.get(start, ()))
+                else:
+                    c = self.cluster_of(cur)
+                    succ = list(self._cluster_edges(c).get(cur, ()))
+                    succ.extend((m, 1) for m in self._inter.get(cur, ()))
+                    if c == c_goal and cur in goal_edges:
+                        succ.append((goal, goal_edges[cur]))
+                for nb, cost in succ:
+                    if nb in closed:
+                        continue
+                    ng = g + cost
+                    if ng < g_score.get(nb, ng + 1):
+                        g_score[nb] = ng
+                        came_from[nb] = cur
+                        heapq.heappush(open_heap, (ng + abs(nb[0] - gx) + abs(nb[1] - gy), -ng, nb))
+            return None
+
+    # ---- Refinado ----
+    def refine(self, a: Cell, b: Cell) -> Optional[List[Cell]]:
+        """Baja a celdas un tramo abstracto (dentro de un cluster o cruzando una frontera)."""
+        with self._lock:
+            ca, cb = self.cluster_of(a), self.cluster_of(b)
+            if ca != cb:
+                ok = abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1 and self.grid.is_walkable(*b)
+                return [a, b] if ok else None
+            return astar(self.grid, a, b, bounds=self.cluster_rect(ca))
+
+    def iter_steps(self, start: Cell, goal: Cell, abstract: Optional[List[Cell]] = None,
+                   max_replans: int = 3) -> Iterator[Step]:
+        for dx, dy, n in self.iter_segments(start, goal, abstract, max_replans):
+            for _ in range(n):
+                yield dx, dy
+
+    def iter_segments(self, start: Cell, goal: Cell, abstract: Optional[List[Cell]] = None,
+                      max_replans: int = 3) -> Iterator[Segment]:
+        """Genera tramos rectos refinando tramo abstracto a tramo; si uno deja de ser válido, replanifica."""
+        if abstract is None:
+            abstract = self.find_abstract_path(start, goal)
+        cur, i = tuple(start), 0
+        while abstract is not None and i + 1 < len(abstract):
+            seg = self.refine(abstract[i], abstract[i + 1])
+            if seg is None:
+                if max_replans <= 0:
+                    return
+                max_replans -= 1
+                abstract, i = self.find_abstract_path(cur, goal), 0
+                continue
+            yield from path_to_segments(seg)
+            cur = abstract[i + 1]
+            i += 1
+
+    def plan_route(self, start: Cell, goal: Cell) -> Optional[Iterator[Segment]]:
+        """Búsqueda abstracta ahora (hilo del llamante); refinado perezoso al consumir."""
+        abstract = self.find_abstract_path(start, goal)
+        if abstract is None:
+            return None
+        return self.iter_segments(start, goal, abstract)
+
+    def find_path(self, start: Cell, goal: Cell) -> Optional[List[Cell]]:
+        abstract = self.find_abstract_path(start, goal)
+        if abstract is None:
+            return None
+        path = [abstract[0]]
+        for a, b in zip(abstract, abstract[1:]):
+            seg = self.refine(a, b)
+            if seg is None:
+                return None
+            path.extend(seg[1:])
+        return path
+
+    def find_steps(self, start: Cell, goal: Cell) -> Optional[List[Step]]:
+        path = self.find_path(start, goal)
+        return path_to_steps(path) if path is not None else None
+
+    # ---- Actualización incremental ----
+    def _on_grid_change(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        with self._lock:
+            cx1, cy1 = x1 // self.cs, y1 // self.cs
+            cx2, cy2 = x2 // self.cs, y2 // self.cs
+            for k in range(max(1, cx1), min(self.ncx - 1, cx2 + 1) + 1):
+                self._scan_border("v", k, cy1, cy2)
+            for k in range(max(1, cy1), min(self.ncy - 1, cy2 + 1) + 1):
+                self._scan_border("h", k, cx1, cx2)
+            for ci in range(cx1, cx2 + 1):
+                for cj in range(cy1, cy2 + 1):
+                    self._intra.pop((ci, cj), None)
+            self.version += 1
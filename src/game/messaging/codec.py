@@ -0,0 +1,350 @@
+from __future__ import annotations
+import struct
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Tuple
+
+from .messages import (
+    WorldSnapshot, SnapshotDelta, WorldEvent, PROTOCOL_VERSION, AreaRecord, NearbyEntity, intern,
+)
+from .commands import Command, MoveCommand, CancelCommand, CatchCommand, DropCommand, SayCommand
+
+MAGIC = b"WB"
+_HEADER = struct.Struct("!2sBBB")  # magic, versión mayor, versión menor, tipo de mensaje
+_U8 = struct.Struct("!B")
+_U32 = struct.Struct("!I")
+_I32 = struct.Struct("!i")
+_I64 = struct.Struct("!q")
+_F64 = struct.Struct("!d")
+_CELL = struct.Struct("!ii")
+_RECT = struct.Struct("!iiii")
+_SEGMENT = struct.Struct("!bbI")
+
+
+class MsgType(IntEnum):
+    HELLO = 1          # cliente -> servidor: versiones soportadas
+    HELLO_OK = 2       # servidor -> cliente: versión negociada
+    SNAPSHOT_REQ = 3
+    SNAPSHOT = 4
+    DELTA = 5
+    EVENT_REQ = 6
+    EVENT = 7
+    COMMAND = 8
+    RESULT = 9         # respuesta genérica (valor)
+    ERROR = 10
+    CALL = 11          # operación de bridge que se resuelve en el servidor (p.ej. move_to: planifica allí)
+
+
+class CodecError(ValueError):
+    pass
+
+
+def version_tuple(version: str) -> Tuple[int, int]:
+    major, minor = version.split(".")[:2]
+    return int(major), int(minor)
+
+
+# ---- Escritura/lectura de primitivas ----
+class _Writer:
+    __slots__ = ("parts",)
+
+    def __init__(self) -> None:
+        self.parts: List[bytes] = []
+
+    def u8(self, v: int) -> None:
+        self.parts.append(_U8.pack(v))
+
+    def u32(self, v: int) -> None:
+        self.parts.append(_U32.pack(v))
+
+    def i64(self, v: int) -> None:
+        self.parts.append(_I64.pack(v))
+
+    def f64(self, v: float) -> None:
+        self.parts.append(_F64.pack(v))
+
+    def cell(self, c) -> None:
+        self.parts.append(_CELL.pack(int(c[0]), int(c[1])))
+
+    def str(self, s: str) -> None:
+        b = s.encode("utf-8")
+        self.parts.append(_U32.pack(len(b)))
+        self.parts.append(b)
+
+    def value(self, v: Any) -> None:
+        """Valor JSON-like con etiqueta de tipo (payloads, meta, campos extra)."""
+        if v is None:
+            self.parts.append(b"N")
+        elif v is True or v is False:
+            self.parts.append(b"T" if v else b"F")
+        elif isinstance(v, int):
+            self.parts.append(b"i")
+            self.i64(v)
+        elif isinstance(v, float):
+            self.parts.append(b"d")
+            self.f64(v)
+        elif isinstance(v, str):
+            self.parts.append(b"s")
+            self.str(v)
+        elif isinstance(v, (list, tuple)):
+            self.parts.append(b"l" if isinstance(v, list) else b"t")
+            self.u32(len(v))
+            for x in v:
+                self.value(x)
+        elif isinstance(v, dict):
+            self.parts.append(b"m")
+            self.u32(len(v))
+            for k, x in v.items():
+                self.str(str(k))
+                self.value(x)
+        else:
+            raise CodecError(f"Tipo no serializable: {type(v).__name__}")
+
+    def bytes(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf: bytes, pos: int = 0) -> None:
+        self.buf = memoryview(buf)
+        self.pos = pos
+
+    def _unpack(self, st: struct.Struct):
+        vals = st.unpack_from(self.buf, self.pos)
+        self.pos += st.size
+        return vals
+
+    def u8(self) -> int:
+        return self._unpack(_U8)[0]
+
+    def u32(self) -> int:
+        return self._unpack(_U32)[0]
+
+    def i64(self) -> int:
+        return self._unpack(_I64)[0]
+
+    def f64(self) -> float:
+        return self._unpack(_F64)[0]
+
+    def cell(self) -> Tuple[int, int]:
+        return self._unpack(_CELL)
+
+    def str(self) -> str:
+        n = self.u32()
+        s = bytes(self.buf[self.pos:self.pos + n]).decode("utf-8")
+        self.pos += n
+        return s
+
+    def name(self) -> str:
+        """Cadena que se repite entre mensajes (kinds, ids, nombres): se interna."""
+        return intern(self.str())
+
+    def value(self) -> Any:
+        tag = bytes(self.buf[self.pos:self.pos + 1])
+        self.pos += 1
+        if tag == b"N":
+            return None
+        if tag == b"T":
+            return True
+        if tag == b"F":
+            return False
+        if tag == b"i":
+            return self.i64()
+        if tag == b"d":
+            return self.f64()
+        if tag == b"s":
+            return self.str()
+        if tag in (b"l", b"t"):
+            items = [self.value() for _ in range(self.u32())]
+            return items if tag == b"l" else tuple(items)
+        if tag == b"m":
+            return {self.name(): self.value() for _ in range(self.u32())}
+        raise CodecError(f"Etiqueta desconocida: {tag!r}")
+
+
+# ---- Mensajes ----
+def _write_nearby(w: _Writer, entries: List[NearbyEntity]) -> None:
+    w.u32(len(entries))
+    for e in entries:
+        w.str(e.get("kind", ""))
+        w.str(e["id"])
+        w.cell(e["cell"])
+        w.value(e.get("meta"))
+
+
+def _read_nearby(r: _Reader) -> List[NearbyEntity]:
+    return [NearbyEntity(r.name(), r.name(), r.cell(), r.value() or None) for _ in range(r.u32())]
+
+
+def _write_areas(w: _Writer, areas: List[AreaRecord]) -> None:
+    w.u32(len(areas))
+    for a in areas:
+        w.str(a["name"])
+        w.parts.append(_RECT.pack(*(int(v) for v in a["rect"])))
+        w.value(a.get("walkable"))
+
+
+def _read_areas(r: _Reader) -> List[AreaRecord]:
+    return [AreaRecord(r.name(), r._unpack(_RECT), r.value()) for _ in range(r.u32())]
+
+
+def _write_snapshot(w: _Writer, s: WorldSnapshot) -> None:
+    w.str(s.version)
+    w.f64(s.t_sim)
+    w.i64(s.seq)
+    w.str(s.npc_id)
+    w.cell(s.cell)
+    _write_nearby(w, s.nearby)
+    _write_areas(w, s.areas)
+    w.value(list(s.last_events))
+    w.str(s.areas_ref)
+
+
+def _read_snapshot(r: _Reader) -> WorldSnapshot:
+    return WorldSnapshot(
+        version=r.name(), t_sim=r.f64(), seq=r.i64(), npc_id=r.name(), cell=r.cell(),
+        nearby=_read_nearby(r), areas=_read_areas(r), last_events=r.value(), areas_ref=r.str(),
+    )
+
+
+def _write_delta(w: _Writer, d: SnapshotDelta) -> None:
+    w.str(d.version)
+    w.f64(d.t_sim)
+    w.i64(d.seq)
+    w.i64(d.base_seq)
+    w.str(d.npc_id)
+    w.u8(d.cell is not None)
+    if d.cell is not None:
+        w.cell(d.cell)
+    w.str(d.areas_ref)
+    w.u8(d.areas is not None)
+    if d.areas is not None:
+        _write_areas(w, d.areas)
+    _write_nearby(w, d.nearby_upsert)
+    w.value(list(d.nearby_removed))
+    w.value(list(d.last_events))
+
+
+def _read_delta(r: _Reader) -> SnapshotDelta:
+    version, t_sim, seq, base_seq, npc_id = r.name(), r.f64(), r.i64(), r.i64(), r.name()
+    cell = r.cell() if r.u8() else None
+    ref = r.str()
+    areas = _read_areas(r) if r.u8() else None
+    return SnapshotDelta(
+        version=version, t_sim=t_sim, seq=seq, base_seq=base_seq, npc_id=npc_id, cell=cell,
+        areas_ref=ref, areas=areas, nearby_upsert=_read_nearby(r), nearby_removed=r.value(),
+        last_events=r.value(),
+    )
+
+
+def _write_event(w: _Writer, ev: WorldEvent) -> None:
+    w.str(ev.version)
+    w.f64(ev.t_sim)
+    w.i64(ev.seq)
+    w.str(ev.event_id)
+    w.str(ev.kind)
+    w.value(ev.payload)
+    w.parts.append(_I32.pack(ev.priority))
+
+
+def _read_event(r: _Reader) -> WorldEvent:
+    return WorldEvent(
+        version=r.name(), t_sim=r.f64(), seq=r.i64(), event_id=r.str(), kind=r.name(),
+        payload=r.value(), priority=r._unpack(_I32)[0],
+    )
+
+
+# Comandos: una etiqueta por tipo. Las rutas de MoveCommand se materializan como tramos (dx,dy,n).
+_CMD_TAGS = {MoveCommand: 1, CancelCommand: 2, CatchCommand: 3, DropCommand: 4, SayCommand: 5}
+
+
+def _write_command(w: _Writer, cmd: Command) -> None:
+    w.u8(_CMD_TAGS[type(cmd)])
+    w.str(cmd.npc_id)
+    if isinstance(cmd, MoveCommand):
+        w.i64(cmd.route_id)
+        w.cell(cmd.goal)
+        w.u8(cmd.start is not None)
+        if cmd.start is not None:
+            w.cell(cmd.start)
+        segments = [(s[0], s[1], s[2] if len(s) == 3 else 1) for s in cmd.route]
+        w.u32(len(segments))
+        for seg in segments:
+            w.parts.append(_SEGMENT.pack(*seg))
+    elif isinstance(cmd, CancelCommand):
+        w.value(cmd.route_id)
+    elif isinstance(cmd, CatchCommand):
+        w.str(cmd.obj)
+    elif isinstance(cmd, DropCommand):
+        w.str(cmd.obj)
+        w.cell(cmd.cell)
+    else:
+        w.str(cmd.text)
+
+
+def _read_command(r: _Reader) -> Command:
+    tag, npc_id = r.u8(), r.str()
+    if tag == 1:
+        route_id, goal = r.i64(), r.cell()
+        start = r.cell() if r.u8() else None
+        route = [r._unpack(_SEGMENT) for _ in range(r.u32())]
+        return MoveCommand(npc_id, route_id, route, goal, start)
+    if tag == 2:
+        return CancelCommand(npc_id, r.value())
+    if tag == 3:
+        return CatchCommand(npc_id, r.str())
+    if tag == 4:
+        return DropCommand(npc_id, r.str(), r.cell())
+    if tag == 5:
+        return SayCommand(npc_id, r.str())
+    raise CodecError(f"Comando desconocido: {tag}")
+
+
+_WRITERS: Dict[type, Tuple[MsgType, Callable[[_Writer, Any], None]]] = {
+    WorldSnapshot: (MsgType.SNAPSHOT, _write_snapshot),
+    SnapshotDelta: (MsgType.DELTA, _write_delta),
+    WorldEvent: (MsgType.EVENT, _write_event),
+}
+_READERS: Dict[MsgType, Callable[[_Reader], Any]] = {
+    MsgType.SNAPSHOT: _read_snapshot,
+    MsgType.DELTA: _read_delta,
+    MsgType.EVENT: _read_event,
+    MsgType.COMMAND: _read_command,
+}
+
+
+def encode(msg: Any, msg_type: MsgType | None = None, version: str = PROTOCOL_VERSION) -> bytes:
+    """
+    Trama binaria: cabecera (magic, versión, tipo) + cuerpo.
+    - WorldSnapshot/SnapshotDelta/WorldEvent/comandos: disposición fija por campos.
+    - Cualquier otro mensaje (peticiones, respuestas): `msg_type` explícito y valor genérico.
+    """
+    major, minor = version_tuple(version)
+    w = _Writer()
+    if type(msg) in _WRITERS:
+        msg_type, write = _WRITERS[type(msg)]
+        write(w, msg)
+    elif type(msg) in _CMD_TAGS:
+        msg_type = MsgType.COMMAND
+        _write_command(w, msg)
+    else:
+        if msg_type is None:
+            raise CodecError(f"Hace falta msg_type para {type(msg).__name__}")
+        w.value(msg)
+    return _HEADER.pack(MAGIC, major, minor, msg_type) + w.bytes()
+
+
+def decode(data: bytes) -> Tuple[MsgType, Any, Tuple[int, int]]:
+    """Devuelve (tipo, mensaje, (versión mayor, menor)); CodecError si la trama no es válida."""
+    if len(data) < _HEADER.size:
+        raise CodecError("Trama demasiado corta")
+    magic, major, minor, raw_type = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise CodecError("Magic inválido")
+    if major != version_tuple(PROTOCOL_VERSION)[0]:
+        raise CodecError(f"Versión mayor no soportada: {major}.{minor}")
+    msg_type = MsgType(raw_type)
+    r = _Reader(data, _HEADER.size)
+    read = _READERS.get(msg_type)
+    return msg_type, (read(r) if read is not None else r.value()), (major, minor)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+
+# ---- Comandos tipados (agente -> mundo) ----
+@dataclass(frozen=True)
+class MoveCommand:
+    """
+    Ruta ya planificada en el hilo del agente; sustituye a la pendiente del NPC.
+    Los pasos son relativos a `start`: si al drenarse el NPC ya no está ahí, la simulación
+    engancha la ruta a su celda actual o, si no puede, le pide al agente que replanifique hasta
+    `goal` (None = aplicar tal cual).
+    """
+    npc_id: str
+    route_id: int
+    route: Iterable[Any]  # tramos (dx,dy,n) o pasos (dx,dy), posiblemente perezosos
+    goal: Tuple[int, int]
+    start: Optional[Tuple[int, int]] = None
+
+
+@dataclass(frozen=True)
+class CancelCommand:
+    npc_id: str
+    route_id: Optional[int] = None  # None = todas las rutas pendientes
+
+
+@dataclass(frozen=True)
+class CatchCommand:
+    npc_id: str
+    obj: str
+
+
+@dataclass(frozen=True)
+class DropCommand:
+    npc_id: str
+    obj: str
+    cell: Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class SayCommand:
+    npc_id: str
+    text: str
+
+
+Command = Union[MoveCommand, CancelCommand, CatchCommand, DropCommand, SayCommand]
+
+
+class CommandRing:
+    """
+    Anillo acotado single-producer/single-consumer (un anillo por NPC).
+    - Productor: el hilo del agente (try_push). Consumidor: la simulación (drain, una vez por tick).
+    - Sin locks: cada índice lo escribe un solo lado y las asignaciones de enteros/slots son
+      atómicas en CPython; el productor publica el slot antes de avanzar `_tail`.
+    - Si está lleno, try_push devuelve False (el agente decide reintentar o descartar).
+    """
+    def __init__(self, capacity: int = 64) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity debe ser > 0")
+        self.capacity = capacity
+        self._buf: List[Optional[Command]] = [None] * capacity
+        self._head = 0  # siguiente a leer (solo lo escribe el consumidor)
+        self._tail = 0  # siguiente a escribir (solo lo escribe el productor)
+        self.pushed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    def try_push(self, cmd: Command) -> bool:
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            self.rejected += 1
+            return False
+        self._buf[tail % self.capacity] = cmd
+        self._tail = tail + 1
+        self.pushed += 1
+        return True
+
+    def drain(self, max_items: int | None = None) -> List[Command]:
+        """Saca de golpe todo lo publicado hasta ahora (o como mucho max_items)."""
+        head, tail = self._head, self._tail
+        if max_items is not None:
+            tail = min(tail, head + max_items)
+        buf, cap = self._buf, self.capacity
+        out = []
+        for i in range(head, tail):
+            out.append(buf[i % cap])
+            buf[i % cap] = None  # no retener rutas ya consumidas
+        self._head = tail
+        return out
@@ -0,0 +1,187 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Callable, Dict, Hashable, List, Literal, Mapping, Optional, Tuple
+
+from .messages import WorldEvent
+
+# kind -> función que da la clave de fusión: dos eventos del mismo kind y misma clave se
+# fusionan en la cola (queda el más reciente, con la mayor de las dos prioridades)
+CoalesceKey = Callable[[WorldEvent], Hashable]
+DEFAULT_COALESCE: Dict[str, CoalesceKey] = {
+    "time_tick": lambda ev: None,                                            # solo el último
+    "zone_alert": lambda ev: ev.payload.get("zone", ev.payload.get("area")),  # uno por zona
+}
+
+DropPolicy = Literal["drop_oldest", "drop_lowest"]
+
+
+class _Entry:
+    __slots__ = ("key", "seq", "ev", "alive", "ckey")
+
+    def __init__(self, seq: int, ev: WorldEvent, ckey: Hashable) -> None:
+        self.key = (-ev.priority, seq)
+        self.seq = seq
+        self.ev = ev
+        self.alive = True
+        self.ckey = ckey
+
+    def __lt__(self, other: "_Entry") -> bool:
+        return self.key < other.key
+
+
+class EventQueue:
+    """
+    Cola prioritaria de eventos de un NPC, usable desde hilos y desde asyncio.
+    - Orden: mayor prioridad primero y, a igual prioridad, por orden de llegada (seq).
+    - Fusión por kind (`coalesce`): p.ej. solo el último time_tick y un zone_alert por zona.
+    - Acotada (`maxsize`): al llenarse descarta el más antiguo (drop_oldest) o el de menor
+      prioridad (drop_lowest, el más antiguo entre iguales; puede ser el que llega).
+      Contadores: `dropped`, `coalesced`.
+    - get(timeout): bloqueante (hilos). get_async(timeout): await sin bloquear el event loop.
+    - put() puede venir de cualquier hilo (el de Arcade/simulación): despierta a los que
+      esperan con loop.call_soon_threadsafe, sin sondeo.
+    - close(): despierta a todos; las esperas devuelven None cuando ya no queda nada.
+    """
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        drop_policy: DropPolicy = "drop_oldest",
+        coalesce: Optional[Mapping[str, CoalesceKey]] = None,
+    ) -> None:
+        if drop_policy not in ("drop_oldest", "drop_lowest"):
+            raise ValueError(f"drop_policy desconocida: {drop_policy!r}")
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+        self.coalesce = dict(DEFAULT_COALESCE if coalesce is None else coalesce)
+        self._heap: List[_Entry] = []                    # con entradas muertas (borrado perezoso)
+        self._live: "OrderedDict[int, _Entry]" = OrderedDict()  # seq -> entrada, por llegada
+        self._by_ckey: Dict[Hashable, _Entry] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.closed = False
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def put(self, seq: int, ev: WorldEvent) -> bool:
+        """Encola ev; devuelve False si se ha descartado (cola cerrada o llena y ev es el que sobra)."""
+        with self._cond:
+            if self.closed:
+                return False
+            key_fn = self.coalesce.get(ev.kind)
+            ckey = (ev.kind, key_fn(ev)) if key_fn is not None else None
+            if ckey is not None:
+                prev = self._by_ckey.get(ckey)
+                if prev is not None:
+                    self._kill(prev)
+                    self.coalesced += 1
+                    if prev.ev.priority > ev.priority:
+                        ev = replace(ev, priority=prev.ev.priority)
+            entry = _Entry(seq, ev, ckey)
+            if self.maxsize is not None and len(self._live) >= self.maxsize:
+                victim = self._victim(entry)
+                self.dropped += 1
+                if victim is entry:
+                    return False
+                self._kill(victim)
+            heapq.heappush(self._heap, entry)
+            self._live[seq] = entry
+            if len(self._heap) > 2 * len(self._live) + 16:  # demasiadas entradas muertas: compactar
+                self._heap = list(self._live.values())
+                heapq.heapify(self._heap)
+            if ckey is not None:
+                self._by_ckey[ckey] = entry
+            self._cond.notify()
+            self._wake_async()
+            return True
+
+    def _victim(self, incoming: _Entry) -> _Entry:
+        if self.drop_policy == "drop_oldest":
+            return next(iter(self._live.values()))
+        # drop_lowest: menor prioridad; entre iguales el más antiguo (el nuevo solo si es estrictamente menor)
+        lowest = min(self._live.values(), key=lambda e: (e.ev.priority, e.seq))
+        return incoming if incoming.ev.priority < lowest.ev.priority else lowest
+
+    def _kill(self, entry: _Entry) -> None:
+        entry.alive = False
+        self._live.pop(entry.seq, None)
+        if entry.ckey is not None and self._by_ckey.get(entry.ckey) is entry:
+            del self._by_ckey[entry.ckey]
+
+    def _pop(self) -> Optional[WorldEvent]:
+        heap = self._heap
+        while heap:
+            entry = heapq.heappop(heap)
+            if entry.alive:
+                self._kill(entry)
+                return entry.ev
+        return None
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            self._wake_async()
+
+    def _wake_async(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:  # loop ya cerrado
+                pass
+
+    # ---- Consumo síncrono ----
+    def get_nowait(self) -> Optional[WorldEvent]:
+        with self._cond:
+            return self._pop()
+
+    def get(self, timeout: Optional[float] = 0.0) -> Optional[WorldEvent]:
+        """Siguiente evento; espera hasta `timeout` segundos (None = hasta que llegue uno o se cierre)."""
+        with self._cond:
+            if not self._live and (timeout is None or timeout > 0):
+                self._cond.wait_for(lambda: self._live or self.closed, timeout)
+            return self._pop()
+
+    # ---- Consumo asyncio ----
+    async def get_async(self, timeout: Optional[float] = None) -> Optional[WorldEvent]:
+        """Siguiente evento; None si vence `timeout` o la cola se cierra vacía."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._cond:
+                if self._live:
+                    return self._pop()
+                if self.closed:
+                    return None
+                fut = loop.create_future()
+                self._waiters.append((loop, fut))
+            try:
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                return self.get_nowait()
+            finally:
+                with self._cond:
+                    if (loop, fut) in self._waiters:
+                        self._waiters.remove((loop, fut))
+
+    def __aiter__(self) -> "EventQueue":
+        return self
+
+    async def __anext__(self) -> WorldEvent:
+        ev = await self.get_async()
+        if ev is None:
+            raise StopAsyncIteration
+        return ev
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
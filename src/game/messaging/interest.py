@@ -0,0 +1,94 @@
+from __future__ import annotations
+from typing import Dict, Hashable, Iterable, Set, Tuple
+
+Rect = Tuple[int, int, int, int]     # (x1, y1, x2, y2) ambos inclusive
+Bucket = Tuple[int, int]
+# ("rect", x1, y1, x2, y2) o ("circle", cx, cy, r)
+Shape = Tuple
+
+
+def _bounds(shape: Shape) -> Rect:
+    if shape[0] == "circle":
+        _, cx, cy, r = shape
+        return cx - r, cy - r, cx + r, cy + r
+    return shape[1], shape[2], shape[3], shape[4]
+
+
+def _intersects(shape: Shape, rect: Rect) -> bool:
+    x1, y1, x2, y2 = rect
+    if shape[0] == "circle":
+        _, cx, cy, r = shape
+        nx, ny = min(max(cx, x1), x2), min(max(cy, y1), y2)  # punto del rect más cercano
+        return (nx - cx) ** 2 + (ny - cy) ** 2 <= r * r
+    _, sx1, sy1, sx2, sy2 = shape
+    return sx1 <= x2 and x1 <= sx2 and sy1 <= y2 and y1 <= sy2
+
+
+class InterestIndex:
+    """
+    Índice de regiones de interés (rects o círculos en celdas) por buckets uniformes.
+    Una publicación en un rect solo mira los buckets que solapa y comprueba la forma exacta.
+    No es thread-safe por sí mismo: lo protege el lock de WorldBus.
+    """
+    def __init__(self, bucket_size: int = 16) -> None:
+        self.bucket_size = bucket_size
+        self._shapes: Dict[Hashable, Shape] = {}
+        self._buckets: Dict[Bucket, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shapes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shapes
+
+    def _bucket_range(self, rect: Rect) -> Iterable[Bucket]:
+        bs = self.bucket_size
+        x1, y1, x2, y2 = rect
+        for bx in range(x1 // bs, x2 // bs + 1):
+            for by in range(y1 // bs, y2 // bs + 1):
+                yield bx, by
+
+    def set_rect(self, key: Hashable, rect: Rect) -> None:
+        x1, y1, x2, y2 = (int(v) for v in rect)
+        self._set(key, ("rect", min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+    def set_circle(self, key: Hashable, center: Tuple[int, int], radius: int) -> None:
+        self._set(key, ("circle", int(center[0]), int(center[1]), int(radius)))
+
+    def _set(self, key: Hashable, shape: Shape) -> None:
+        old = self._shapes.get(key)
+        if old is not None:
+            old_buckets = set(self._bucket_range(_bounds(old)))
+            new_buckets = set(self._bucket_range(_bounds(shape)))
+            if old_buckets == new_buckets:  # caso típico al seguir a un NPC: solo cambia la forma
+                self._shapes[key] = shape
+                return
+            self.remove(key)
+        self._shapes[key] = shape
+        for b in self._bucket_range(_bounds(shape)):
+            self._buckets.setdefault(b, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        shape = self._shapes.pop(key, None)
+        if shape is None:
+            return
+        for b in self._bucket_range(_bounds(shape)):
+            keys = self._buckets.get(b)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[b]
+
+    def query(self, rect: Rect) -> Set[Hashable]:
+        """Claves cuya región toca el rect (ambos extremos inclusive)."""
+        x1, y1, x2, y2 = rect
+        rect = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        out: Set[Hashable] = set()
+        seen: Set[Hashable] = set()
+        for b in self._bucket_range(rect):
+            for key in self._buckets.get(b, ()):
+                if key not in seen:
+                    seen.add(key)
+                    if _intersects(self._shapes[key], rect):
+                        out.add(key)
+        return out
@@ -1,24 +1,102 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import Literal, Any
+import json
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Literal, Any, NamedTuple, Optional
 
-PROTOCOL_VERSION = "1.0"
+PROTOCOL_VERSION = "1.1"
+# 1.0: solo snapshots completos. 1.1: snapshots delta (since_seq) y áreas por referencia.
+SUPPORTED_VERSIONS: tuple[str, ...] = ("1.0", "1.1")
 
 EventKind = Literal["time_tick", "zone_alert", "npc_interaction", "world_change"]
 
-@dataclass(frozen=True)
+intern = sys.intern  # kinds, ids y nombres de área se repiten en cada mensaje: una sola copia
+
+
+class _Record:
+    """
+    Acceso de solo lectura estilo dict (e["id"], e.get("meta")) para los registros tupla.
+    Solo por los campos declarados: los atributos de la tupla (count, index, _fields...) no son claves.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._fields:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
+class _NearbyFields(NamedTuple):
+    kind: str
+    id: str
+    cell: tuple[int, int]
+    meta: Optional[dict] = None
+
+
+class _AreaFields(NamedTuple):
+    name: str
+    rect: tuple[int, int, int, int]
+    walkable: Optional[bool] = None
+
+
+class NearbyEntity(_Record, _NearbyFields):
+    """Entrada de WorldSnapshot.nearby (tupla: sin __dict__ por entrada)."""
+    __slots__ = ()
+
+
+class AreaRecord(_Record, _AreaFields):
+    """Entrada de WorldSnapshot.areas; rect (x1, y1, x2, y2) ambos inclusive."""
+    __slots__ = ()
+
+
+def nearby_entity(kind: str, entity_id: str, cell, meta: Optional[dict] = None) -> NearbyEntity:
+    return NearbyEntity(intern(kind), intern(entity_id), (int(cell[0]), int(cell[1])), meta or None)
+
+
+def area_record(name: str, rect, walkable: Optional[bool] = None) -> AreaRecord:
+    return AreaRecord(intern(name), tuple(int(v) for v in rect), walkable)
+
+
+@dataclass(frozen=True, slots=True)
 class WorldSnapshot:
-    """Estado del mundo para el NPC (JSON-friendly y versionado)."""
+    """Estado del mundo para el NPC (versionado; to_json/from_json para depurar)."""
+    version: str
+    t_sim: float             # instante de simulación en que se construyó
+    seq: int                 # versión monótona del contenido (igual seq => mismo snapshot)
+    npc_id: str
+    cell: tuple[int, int]
+    nearby: list[NearbyEntity]
+    areas: list[AreaRecord]
+    last_events: list[str] = field(default_factory=list)
+    areas_ref: str = ""      # hash del contenido de `areas` (1.1+)
+
+@dataclass(frozen=True, slots=True)
+class SnapshotDelta:
+    """Cambios desde el snapshot `base_seq` que ya tiene el NPC (protocolo 1.1+)."""
     version: str
     t_sim: float
     seq: int
+    base_seq: int
     npc_id: str
-    cell: tuple[int, int]
-    nearby: list[dict]       # [{kind, id, cell, meta?}]
-    areas: list[dict]        # [{name, rect:[x1,y1,x2,y2], walkable:bool?}]
+    cell: Optional[tuple[int, int]]   # None = no ha cambiado
+    areas_ref: str
+    areas: Optional[list[AreaRecord]]  # solo si el NPC no tiene ya `areas_ref`
+    nearby_upsert: list[NearbyEntity]  # entradas nuevas o modificadas
+    nearby_removed: list[str]         # ids que han salido del FOV
     last_events: list[str] = field(default_factory=list)
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class WorldEvent:
     """Evento push importante (interrupt)."""
     version: str
@@ -28,3 +106,46 @@ class WorldEvent:
     kind: EventKind
     payload: dict[str, Any]
     priority: int = 0  # 0 normal, 1 alto, 2 crítico
+
+
+# ---- Conversión JSON (depuración, logs, herramientas externas) ----
+def _nearby_from(r: dict) -> NearbyEntity:
+    return nearby_entity(r["kind"], r["id"], r["cell"], r.get("meta"))
+
+
+def _area_from(r: dict) -> AreaRecord:
+    return area_record(r["name"], r["rect"], r.get("walkable"))
+
+
+_RECORD_LISTS = {"nearby": _nearby_from, "nearby_upsert": _nearby_from, "areas": _area_from}
+_MESSAGES = {cls.__name__: cls for cls in (WorldSnapshot, SnapshotDelta, WorldEvent)}
+
+
+def to_dict(msg) -> dict:
+    """Mensaje -> dict JSON-friendly (los registros vuelven al formato {kind, id, cell, meta?})."""
+    out = {"type": type(msg).__name__}
+    for f in fields(msg):
+        value = getattr(msg, f.name)
+        if f.name in _RECORD_LISTS and value is not None:
+            value = [r.to_dict() for r in value]
+        out[f.name] = value
+    return out
+
+
+def from_dict(data: dict):
+    data = dict(data)
+    cls = _MESSAGES[data.pop("type")]
+    for name, make in _RECORD_LISTS.items():
+        if data.get(name) is not None:
+            data[name] = [make(r) for r in data[name]]
+    if data.get("cell") is not None:
+        data["cell"] = tuple(data["cell"])
+    return cls(**data)
+
+
+def to_json(msg, **kwargs) -> str:
+    return json.dumps(to_dict(msg), ensure_ascii=False, **kwargs)
+
+
+def from_json(text: str):
+    return from_dict(json.loads(text))
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import hashlib
+import json
+from dataclasses import replace
+from typing import Iterable, Optional
+
+from .messages import WorldSnapshot, SnapshotDelta, SUPPORTED_VERSIONS
+
+DELTA_MIN_VERSION = "1.1"
+
+
+def _vkey(version: str) -> tuple[int, ...]:
+    return tuple(int(p) for p in version.split("."))
+
+
+def negotiate_version(client_versions: Iterable[str], server_versions: Iterable[str] = SUPPORTED_VERSIONS) -> str:
+    """Mayor versión común a cliente y servidor; ValueError si no hay ninguna."""
+    common = set(client_versions) & set(server_versions)
+    if not common:
+        raise ValueError(f"Sin versión de protocolo común: cliente={sorted(client_versions)}")
+    return max(common, key=_vkey)
+
+
+def supports_deltas(version: str) -> bool:
+    return _vkey(version) >= _vkey(DELTA_MIN_VERSION)
+
+
+def areas_ref(areas: list[dict]) -> str:
+    """Hash estable del contenido de las áreas (lo que se envía en lugar de la lista)."""
+    blob = json.dumps(areas, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def diff_snapshots(base: WorldSnapshot, cur: WorldSnapshot, known_areas_ref: Optional[str] = None) -> SnapshotDelta:
+    """Delta de `base` a `cur`; las áreas solo viajan si el receptor no conoce cur.areas_ref."""
+    old = {e["id"]: e for e in base.nearby}
+    new = {e["id"]: e for e in cur.nearby}
+    return SnapshotDelta(
+        version=cur.version,
+        t_sim=cur.t_sim,
+        seq=cur.seq,
+        base_seq=base.seq,
+        npc_id=cur.npc_id,
+        cell=None if cur.cell == base.cell else cur.cell,
+        areas_ref=cur.areas_ref,
+        areas=None if known_areas_ref == cur.areas_ref else cur.areas,
+        nearby_upsert=[e for eid, e in new.items() if old.get(eid) != e],
+        nearby_removed=[eid for eid in old if eid not in new],
+        last_events=cur.last_events,
+    )
+
+
+def apply_delta(base: WorldSnapshot, delta: SnapshotDelta) -> WorldSnapshot:
+    """Reconstruye el snapshot completo a partir del anterior y un delta."""
+    if delta.base_seq != base.seq:
+        raise ValueError(f"Delta sobre seq {delta.base_seq}, pero el snapshot local es {base.seq}")
+    removed = set(delta.nearby_removed)
+    upsert = {e["id"]: e for e in delta.nearby_upsert}
+    nearby = [upsert.pop(e["id"], e) for e in base.nearby if e["id"] not in removed]
+    nearby.extend(upsert.values())
+    return replace(
+        base,
+        version=delta.version,
+        t_sim=delta.t_sim,
+        seq=delta.seq,
+        cell=base.cell if delta.cell is None else delta.cell,
+        nearby=nearby,
+        areas=base.areas if delta.areas is None else delta.areas,
+        areas_ref=delta.areas_ref,
+        last_events=delta.last_events,
+    )
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import asyncio
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from .codec import MsgType, decode, encode
+from .commands import Command, CatchCommand, DropCommand, SayCommand
+from .messages import WorldSnapshot, SnapshotDelta, WorldEvent, PROTOCOL_VERSION, SUPPORTED_VERSIONS
+from .protocol import apply_delta, negotiate_version
+
+Address = Union[str, Tuple[str, int]]
+
+
+class RemoteError(RuntimeError):
+    """Error devuelto por el servidor al procesar una petición."""
+
+
+class WorldBusServer:
+    """
+    Expone un WorldSim (su WorldBus y sus anillos de comandos) a procesos de agentes por un
+    socket/pipe local (multiprocessing.connection), con tramas binarias de codec.py.
+    - Un hilo por conexión; cada cliente negocia la versión de protocolo con HELLO.
+    - move_to se planifica en el hilo de la conexión (no en el de render) y se encola en el
+      anillo del NPC como haría un GameIOBridge local.
+    - Los anillos son SPSC: las escrituras de todas las conexiones a un mismo NPC se
+      serializan con un lock por NPC. Un NPC servido en remoto no debe tener además un
+      bridge local produciendo en su anillo.
+    """
+    def __init__(self, sim, address: Optional[Address] = None, authkey: Optional[bytes] = None,
+                 family: Optional[str] = None) -> None:
+        self.sim = sim
+        self.bus = sim.bus
+        self._listener = Listener(address, family=family, authkey=authkey)
+        self.address = self._listener.address
+        self._bridges: Dict[str, Any] = {}
+        self._npc_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._conns: list = []
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WorldBusServer":
+        self._thread = threading.Thread(target=self._accept_loop, name="WorldBusServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._closed = True
+        self._listener.close()
+        for conn in list(self._conns):
+            conn.close()
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            self._conns.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: Connection) -> None:
+        version = PROTOCOL_VERSION
+        try:
+            while True:
+                try:
+                    data = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                try:
+                    msg_type, msg, _ = decode(data)
+                    if msg_type == MsgType.HELLO:
+                        version = negotiate_version(msg)
+                        reply = encode(version, MsgType.HELLO_OK, version)
+                    else:
+                        reply = self._handle(msg_type, msg, version)
+                except Exception as e:  # el error viaja al cliente, la conexión sigue viva
+                    reply = encode(f"{type(e).__name__}: {e}", MsgType.ERROR, version)
+                conn.send_bytes(reply)
+        finally:
+            conn.close()
+            if conn in self._conns:
+                self._conns.remove(conn)
+
+    def _handle(self, msg_type: MsgType, msg: Any, version: str) -> bytes:
+        if msg_type == MsgType.SNAPSHOT_REQ:
+            snap = self.bus.request_snapshot(msg["npc_id"], msg.get("since_seq"), msg.get("areas_ref"), version)
+            return encode(snap, version=version)
+        if msg_type == MsgType.EVENT_REQ:
+            ev = self.bus.try_get_event(msg["npc_id"], timeout=msg.get("timeout", 0.0))
+            return encode(ev, version=version) if ev is not None else encode(None, MsgType.RESULT, version)
+        if msg_type == MsgType.COMMAND:
+            with self._npc_lock(msg.npc_id):
+                ok = self.sim.commands[msg.npc_id].try_push(msg)
+            return encode(ok, MsgType.RESULT, version)
+        if msg_type == MsgType.CALL:
+            return encode(self._call(msg), MsgType.RESULT, version)
+        raise ValueError(f"Mensaje no esperado: {msg_type.name}")
+
+    def _call(self, msg: dict) -> Any:
+        npc_id, op = msg["npc_id"], msg["op"]
+        with self._npc_lock(npc_id):
+            bridge = self._bridges.get(npc_id)
+            if bridge is None:
+                bridge = self._bridges[npc_id] = self.sim.make_bridge(npc_id)
+            if op == "move_to":
+                ok = bridge.move_to_cell(msg["x"], msg["y"])
+                return bridge.route_id if ok else None
+            if op == "cancel_move":
+                return bridge.cancel_move()
+        raise ValueError(f"Operación desconocida: {op}")
+
+    def _npc_lock(self, npc_id: str) -> threading.Lock:
+        with self._lock:
+            lock = self._npc_locks.get(npc_id)
+            if lock is None:
+                lock = self._npc_locks[npc_id] = threading.Lock()
+            return lock
+
+
+class RemoteWorldBus:
+    """
+    Cliente de WorldBusServer para un proceso de agentes. Una conexión por instancia; las
+    peticiones son request/response y se serializan con un lock (una espera de eventos con
+    timeout bloquea al resto de NPCs que compartan esta instancia).
+    """
+    def __init__(self, address: Address, authkey: Optional[bytes] = None,
+                 versions: Sequence[str] = SUPPORTED_VERSIONS) -> None:
+        self._conn = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self.protocol = PROTOCOL_VERSION
+        self.protocol = self._request(list(versions), MsgType.HELLO)
+
+    def _request(self, msg: Any, msg_type: Optional[MsgType] = None) -> Any:
+        data = encode(msg, msg_type, self.protocol)
+        with self._lock:
+            self._conn.send_bytes(data)
+            reply_type, reply, _ = decode(self._conn.recv_bytes())
+        if reply_type == MsgType.ERROR:
+            raise RemoteError(reply)
+        return reply
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def negotiate(self, client_versions: Sequence[str] = SUPPORTED_VERSIONS) -> str:
+        return self.protocol
+
+    def request_snapshot(self, npc_id: str, since_seq: Optional[int] = None,
+                         known_areas_ref: Optional[str] = None) -> Union[WorldSnapshot, SnapshotDelta]:
+        req = {"npc_id": npc_id, "since_seq": since_seq, "areas_ref": known_areas_ref}
+        return self._request(req, MsgType.SNAPSHOT_REQ)
+
+    def try_get_event(self, npc_id: str, timeout: Optional[float] = 0.0) -> Optional[WorldEvent]:
+        """Con timeout=None espera por tramos cortos, para no acaparar la conexión compartida."""
+        while timeout is None:
+            ev = self._request({"npc_id": npc_id, "timeout": 0.25}, MsgType.EVENT_REQ)
+            if ev is not None:
+                return ev
+        return self._request({"npc_id": npc_id, "timeout": float(timeout)}, MsgType.EVENT_REQ)
+
+    def send_command(self, cmd: Command) -> bool:
+        return bool(self._request(cmd))
+
+    def call(self, npc_id: str, op: str, **kwargs: Any) -> Any:
+        return self._request(dict(kwargs, npc_id=npc_id, op=op), MsgType.CALL)
+
+
+class RemoteGameIO:
+    """Misma interfaz que GameIOBridge (la que usa NPCAgent), pero contra un mundo en otro proceso."""
+    def __init__(self, npc_id: str, remote: RemoteWorldBus) -> None:
+        self.npc_id = npc_id
+        self.remote = remote
+        self.protocol = remote.protocol
+        self.route_id: Optional[int] = None
+        self._snapshot: Optional[WorldSnapshot] = None
+
+    def move_to_cell(self, x: int, y: int, npc_id: Optional[str] = None) -> bool:
+        if npc_id and npc_id != self.npc_id:
+            return False
+        route_id = self.remote.call(self.npc_id, "move_to", x=int(x), y=int(y))
+        if route_id is None:
+            return False
+        self.route_id = route_id
+        return True
+
+    def cancel_move(self) -> bool:
+        self.route_id = None
+        return bool(self.remote.call(self.npc_id, "cancel_move"))
+
+    def catch(self, obj: str) -> bool:
+        return self.remote.send_command(CatchCommand(self.npc_id, str(obj)))
+
+    def drop(self, obj: str, cell: Tuple[int, int]) -> bool:
+        return self.remote.send_command(DropCommand(self.npc_id, str(obj), (int(cell[0]), int(cell[1]))))
+
+    def say(self, text: str) -> bool:
+        return self.remote.send_command(SayCommand(self.npc_id, str(text)))
+
+    def current_cell(self) -> Tuple[int, int]:
+        return tuple(self.sync_snapshot().cell)
+
+    def request_snapshot(self, since_seq: Optional[int] = None,
+                         known_areas_ref: Optional[str] = None) -> Union[WorldSnapshot, SnapshotDelta]:
+        """Como GameIOBridge.request_snapshot: known_areas_ref es el del base since_seq."""
+        if since_seq is None and known_areas_ref is None and self._snapshot is not None:
+            known_areas_ref = self._snapshot.areas_ref
+        return self.remote.request_snapshot(self.npc_id, since_seq, known_areas_ref)
+
+    def sync_snapshot(self) -> WorldSnapshot:
+        base = self._snapshot
+        if base is None:
+            got = self.request_snapshot()
+        else:
+            got = self.request_snapshot(base.seq, base.areas_ref)
+        if isinstance(got, SnapshotDelta):
+            got = apply_delta(base, got)
+        self._snapshot = got
+        return got
+
+    def try_get_event(self, timeout: Optional[float] = 0.0) -> Optional[WorldEvent]:
+        return self.remote.try_get_event(self.npc_id, timeout=timeout)
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[WorldEvent]:
+        """
+        La espera bloqueante se hace en un hilo del executor (el loop del agente sigue libre)
+        y por tramos cortos si no hay timeout, para no acaparar la conexión compartida.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            ev = await loop.run_in_executor(None, self.try_get_event, 0.25 if timeout is None else timeout)
+            if ev is not None or timeout is not None:
+                return ev
@@ -1,54 +1,223 @@
 from __future__ import annotations
 import threading
-from queue import PriorityQueue, Empty
-from typing import Callable, Optional, Dict, Tuple
-from .messages import WorldSnapshot, WorldEvent
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Iterable, Mapping, Optional, Dict, Set, Tuple, Union
+from .messages import WorldSnapshot, SnapshotDelta, WorldEvent, PROTOCOL_VERSION, SUPPORTED_VERSIONS
+from .protocol import diff_snapshots, negotiate_version, supports_deltas
+from .interest import InterestIndex, Rect
+from .event_queue import CoalesceKey, DropPolicy, EventQueue
 
 class WorldBus:
     """
     Mediador in-process y thread-safe:
-      - Pull: el NPC pide snapshots (builder por NPC).
-      - Push: el mundo publica eventos por NPC (cola prioritaria).
+      - Pull: el NPC pide snapshots (builder por NPC). Si el mundo da además una función de
+        versión, el snapshot (inmutable) se cachea y solo se reconstruye cuando cambia.
+        Con protocolo 1.1+ y since_seq se devuelve solo el delta respecto a ese snapshot
+        (se guardan los `history_size` últimos por NPC; si el base ya no está, va completo).
+      - Push: el mundo publica eventos por NPC (cola prioritaria), o a todos los suscritos a
+        un topic o cuya región de interés (rect/radio) toca la zona del evento. En el reparto
+        el mismo objeto WorldEvent se comparte entre todas las colas (no se copia).
+      - Consumo: try_get_event (hilos) o `await next_event` / `async for ev in events(...)`
+        (agentes SPADE en asyncio); publicar desde otro hilo despierta al loop sin sondeo.
+      - Colas acotadas (`max_events`, política `drop_policy`) y con fusión por kind
+        (`coalesce`): un agente lento no acumula atraso. Ver event_stats().
     """
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        history_size: int = 8,
+        max_events: Optional[int] = 256,
+        drop_policy: DropPolicy = "drop_oldest",
+        coalesce: Optional[Mapping[str, CoalesceKey]] = None,
+    ) -> None:
         self._snapshot_builders: Dict[str, Callable[[], WorldSnapshot]] = {}
-        self._event_queues: Dict[str, "PriorityQueue[Tuple[int, int, WorldEvent]]"] = {}
+        self._snapshot_versions: Dict[str, Callable[[], int]] = {}
+        self._snapshot_cache: Dict[str, Tuple[int, WorldSnapshot]] = {}
+        self._snapshot_history: Dict[str, "OrderedDict[int, WorldSnapshot]"] = {}
+        self.history_size = history_size
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self._event_queues: Dict[str, EventQueue] = {}
+        self._queue_config = dict(maxsize=max_events, drop_policy=drop_policy, coalesce=coalesce)
+        self._topics: Dict[str, Set[str]] = {}
+        self._interest = InterestIndex()  # claves (npc_id, nombre de la suscripción)
+        self._regions: Dict[str, Set[str]] = {}  # npc_id -> nombres de sus regiones
         self._lock = threading.RLock()
         self._seq = 0
 
-    def register_npc(self, npc_id: str, snapshot_builder: Callable[[], WorldSnapshot]) -> None:
+    def register_npc(
+        self,
+        npc_id: str,
+        snapshot_builder: Callable[[], WorldSnapshot],
+        snapshot_version: Optional[Callable[[], int]] = None,
+    ) -> None:
         with self._lock:
             self._snapshot_builders[npc_id] = snapshot_builder
-            self._event_queues[npc_id] = PriorityQueue()
+            self._snapshot_cache.pop(npc_id, None)
+            self._snapshot_history[npc_id] = OrderedDict()
+            if snapshot_version is not None:
+                self._snapshot_versions[npc_id] = snapshot_version
+            else:
+                self._snapshot_versions.pop(npc_id, None)
+            old = self._event_queues.get(npc_id)
+            if old is not None:
+                old.close()
+            self._event_queues[npc_id] = EventQueue(**self._queue_config)
 
     def unregister_npc(self, npc_id: str) -> None:
         with self._lock:
             self._snapshot_builders.pop(npc_id, None)
-            self._event_queues.pop(npc_id, None)
+            self._snapshot_versions.pop(npc_id, None)
+            self._snapshot_cache.pop(npc_id, None)
+            self._snapshot_history.pop(npc_id, None)
+            q = self._event_queues.pop(npc_id, None)
+            if q is not None:
+                q.close()  # despierta a quien esté esperando eventos de este NPC
+            for subs in self._topics.values():
+                subs.discard(npc_id)
+            for name in self._regions.pop(npc_id, ()):
+                self._interest.remove((npc_id, name))
 
     # Pull
-    def request_snapshot(self, npc_id: str) -> WorldSnapshot:
+    def negotiate(self, client_versions: Iterable[str] = SUPPORTED_VERSIONS) -> str:
+        return negotiate_version(client_versions)
+
+    def request_snapshot(
+        self,
+        npc_id: str,
+        since_seq: Optional[int] = None,
+        known_areas_ref: Optional[str] = None,
+        version: str = PROTOCOL_VERSION,
+    ) -> Union[WorldSnapshot, SnapshotDelta]:
+        """
+        Snapshot completo, o SnapshotDelta si el cliente (protocolo `version`) ya tiene since_seq.
+        Las áreas solo viajan en el delta si known_areas_ref no coincide con las actuales.
+        """
+        snap = self._current_snapshot(npc_id)
+        if since_seq is None or not supports_deltas(version):
+            return snap
+        with self._lock:
+            base = self._snapshot_history.get(npc_id, {}).get(since_seq)
+        if base is None:
+            return snap  # base desconocido o ya descartado: resincronización completa
+        return diff_snapshots(base, snap, known_areas_ref)
+
+    def _current_snapshot(self, npc_id: str) -> WorldSnapshot:
         with self._lock:
             builder = self._snapshot_builders.get(npc_id)
             if not builder:
                 raise KeyError(f"NPC '{npc_id}' no registrado")
-        return builder()
+            version_fn = self._snapshot_versions.get(npc_id)
+            cached = self._snapshot_cache.get(npc_id)
+        if version_fn is None:
+            return builder()
+        # La versión se lee antes de construir: si cambia durante la construcción, la
+        # siguiente petición verá otra versión y reconstruirá
+        version = version_fn()
+        if cached is not None and cached[0] == version:
+            with self._lock:  # los contadores se tocan desde los hilos de todos los agentes
+                self.snapshot_hits += 1
+            return cached[1]
+        snap = builder()
+        with self._lock:
+            self.snapshot_misses += 1
+            if npc_id in self._snapshot_builders:
+                self._snapshot_cache[npc_id] = (version, snap)
+                history = self._snapshot_history[npc_id]
+                history[snap.seq] = snap
+                while len(history) > self.history_size:
+                    history.popitem(last=False)
+        return snap
+
+    # Suscripciones
+    def subscribe_topic(self, npc_id: str, topic: str) -> None:
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(npc_id)
+
+    def unsubscribe_topic(self, npc_id: str, topic: str) -> None:
+        with self._lock:
+            subs = self._topics.get(topic)
+            if subs is not None:
+                subs.discard(npc_id)
+                if not subs:
+                    del self._topics[topic]
+
+    def subscribe_region(self, npc_id: str, rect: Rect, name: str = "region") -> None:
+        """Interés en un rect de celdas (p.ej. un área); `name` permite varias por NPC."""
+        with self._lock:
+            self._interest.set_rect((npc_id, name), rect)
+            self._regions.setdefault(npc_id, set()).add(name)
+
+    def subscribe_radius(self, npc_id: str, center: Tuple[int, int], radius: int, name: str = "radius") -> None:
+        """Interés en un círculo; volver a llamar con otro centro lo mueve (seguir a un NPC)."""
+        with self._lock:
+            self._interest.set_circle((npc_id, name), center, radius)
+            self._regions.setdefault(npc_id, set()).add(name)
+
+    def unsubscribe_region(self, npc_id: str, name: str = "region") -> None:
+        with self._lock:
+            self._interest.remove((npc_id, name))
+            names = self._regions.get(npc_id)
+            if names is not None:
+                names.discard(name)
 
     # Push
     def publish_event(self, npc_id: str, ev: WorldEvent) -> None:
         with self._lock:
-            q = self._event_queues.get(npc_id)
-            if not q:
-                return
-            self._seq += 1
-            q.put((-ev.priority, self._seq, ev))
+            self._deliver(npc_id, ev)
+
+    def publish(self, ev: WorldEvent, topics: Iterable[str] = (), rect: Optional[Rect] = None) -> int:
+        """
+        Reparte `ev` (una vez por NPC) a los suscritos a alguno de `topics` y a aquellos cuya
+        región de interés toca `rect`. Devuelve a cuántos NPCs ha llegado.
+        """
+        with self._lock:
+            targets: Set[str] = set()
+            for topic in topics:
+                targets.update(self._topics.get(topic, ()))
+            if rect is not None:
+                targets.update(npc_id for npc_id, _ in self._interest.query(rect))
+            return sum(self._deliver(npc_id, ev) for npc_id in targets)
+
+    def publish_topic(self, topic: str, ev: WorldEvent) -> int:
+        return self.publish(ev, topics=(topic,))
 
-    def try_get_event(self, npc_id: str, timeout: float = 0.0) -> Optional[WorldEvent]:
+    def publish_region(self, rect: Rect, ev: WorldEvent) -> int:
+        return self.publish(ev, rect=rect)
+
+    def _deliver(self, npc_id: str, ev: WorldEvent) -> bool:
         q = self._event_queues.get(npc_id)
-        if not q:
+        if q is None:
+            return False
+        self._seq += 1
+        q.put(self._seq, ev)
+        return True
+
+    def event_stats(self, npc_id: Optional[str] = None) -> Dict[str, int]:
+        """Eventos pendientes, descartados y fusionados (de un NPC o el total de los registrados)."""
+        with self._lock:
+            queues = [self._event_queues[npc_id]] if npc_id is not None else list(self._event_queues.values())
+        return {
+            "queued": sum(len(q) for q in queues),
+            "dropped": sum(q.dropped for q in queues),
+            "coalesced": sum(q.coalesced for q in queues),
+        }
+
+    def try_get_event(self, npc_id: str, timeout: Optional[float] = 0.0) -> Optional[WorldEvent]:
+        q = self._event_queues.get(npc_id)
+        if q is None:
             return None
-        try:
-            _, _, ev = q.get(timeout=timeout)
-            return ev
-        except Empty:
+        return q.get(timeout=timeout)
+
+    async def next_event(self, npc_id: str, timeout: Optional[float] = None) -> Optional[WorldEvent]:
+        """Espera (sin bloquear el loop) el siguiente evento; None si vence timeout o se da de baja."""
+        q = self._event_queues.get(npc_id)
+        if q is None:
             return None
+        return await q.get_async(timeout)
+
+    def events(self, npc_id: str) -> AsyncIterator[WorldEvent]:
+        """`async for ev in bus.events(npc_id)`: termina cuando el NPC se da de baja."""
+        q = self._event_queues.get(npc_id)
+        if q is None:
+            raise KeyError(f"NPC '{npc_id}' no registrado")
+        return q
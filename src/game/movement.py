@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import Any, Mapping
+
+import numpy as np
+
+from .config import STEP_TIME
+from .world_state import WorldState
+
+
+def integrate_rows(world: WorldState, rows: np.ndarray, dt: float, step_time: float = STEP_TIME) -> np.ndarray:
+    """
+    Avanza las filas `rows` (que estén en movimiento) en una sola operación NumPy.
+    Interpolación lineal desde el inicio del paso: la posición depende solo del tiempo
+    acumulado, no de cómo se reparta en frames. Devuelve las filas que se han movido.
+    """
+    rows = rows[world.moving[rows]]
+    if rows.size == 0:
+        return rows
+    t = world.step_t[rows] + dt
+    world.step_t[rows] = t
+    alpha = np.minimum(t / step_time, 1.0)[:, None]
+    start = world.start_px[rows]
+    world.pos_px[rows] = start + (world.target_px[rows] - start) * alpha
+    done = t >= step_time - 1e-6
+    if done.any():
+        finished = rows[done]
+        world.pos_px[finished] = world.target_px[finished]
+        world.moving[finished] = False
+    return rows
+
+
+def integrate_moves(world: WorldState, dt: float, step_time: float = STEP_TIME) -> np.ndarray:
+    """Avanza todos los NPCs en movimiento de una vez (un tick)."""
+    return integrate_rows(world, np.flatnonzero(world.moving[:world.count]), dt, step_time)
+
+
+def sync_sprites(world: WorldState, rows: np.ndarray, sprites: Mapping[str, Any], alpha: float | None = None) -> None:
+    """
+    Vuelca las posiciones de `rows` a sus sprites. Solo se tocan las filas que han cambiado y
+    la conversión a floats de Python se hace en bloque; el sprite no hace ninguna cuenta.
+    Con `alpha` se dibuja interpolando entre el tick anterior (prev_px) y el actual.
+    """
+    if rows.size == 0:
+        return
+    pos = world.pos_px[rows]
+    if alpha is not None:
+        prev = world.prev_px[rows]
+        pos = prev + (pos - prev) * alpha
+    ids = world.ids
+    for row, pos in zip(rows.tolist(), pos.tolist()):
+        sprite = sprites.get(ids[row])
+        if sprite is not None:
+            sprite.position = pos
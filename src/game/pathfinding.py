@@ -0,0 +1,243 @@
+from __future__ import annotations
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .config import WORLD_W, WORLD_H
+
+Cell = Tuple[int, int]
+Step = Tuple[int, int]  # (dx, dy) con |dx|+|dy| = 1
+Segment = Tuple[int, int, int]  # (dx, dy, n): n pasos seguidos en la misma dirección
+
+# (x1, y1, x2, y2) ambos inclusive, como los rects de las áreas
+GridListener = Callable[[int, int, int, int], None]
+
+
+class WalkGrid:
+    """
+    Rejilla de transitabilidad respaldada por NumPy (True = se puede pisar).
+    Indexada como cells[x, y]. Cada cambio incrementa `version` y avisa a los listeners,
+    así las cachés de rutas saben cuándo invalidarse.
+    Con flat_copy=False, flat_bytes() es una vista sin copia de `cells` (mapas grandes que
+    cambian a menudo, p.ej. paginados desde un tilemap): algo más lenta de indexar, pero no
+    copia todo el mapa en cada versión.
+    """
+    def __init__(self, width: int = WORLD_W, height: int = WORLD_H, cells: np.ndarray | None = None,
+                 flat_copy: bool = True) -> None:
+        if cells is None:
+            cells = np.ones((width, height), dtype=bool)
+        if cells.shape != (width, height):
+            raise ValueError(f"cells debe tener forma {(width, height)}, no {cells.shape}")
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self.flat_copy = flat_copy or not cells.flags.c_contiguous
+        self.version = 0
+        self._listeners: List[GridListener] = []
+        self._flat: bytes | None = None
+        self._flat_version = -1
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.cells[x, y])
+
+    def set_walkable(self, x: int, y: int, walkable: bool = True) -> None:
+        self.set_rect(x, y, x, y, walkable)
+
+    def set_rect(self, x1: int, y1: int, x2: int, y2: int, walkable: bool) -> None:
+        """Marca un rectángulo de celdas (ambos extremos inclusive)."""
+        x1, x2 = max(0, min(x1, x2)), min(self.width - 1, max(x1, x2))
+        y1, y2 = max(0, min(y1, y2)), min(self.height - 1, max(y1, y2))
+        if x1 > x2 or y1 > y2:
+            return
+        self.cells[x1:x2 + 1, y1:y2 + 1] = walkable
+        self.version += 1
+        for cb in list(self._listeners):
+            cb(x1, y1, x2, y2)
+
+    def set_cells(self, x1: int, y1: int, block: np.ndarray) -> None:
+        """Copia un bloque de transitabilidad [x, y] con esquina en (x1, y1) (p.ej. desde un tilemap)."""
+        x2, y2 = x1 + block.shape[0] - 1, y1 + block.shape[1] - 1
+        self.cells[x1:x2 + 1, y1:y2 + 1] = block
+        self.version += 1
+        for cb in list(self._listeners):
+            cb(x1, y1, x2, y2)
+
+    def add_listener(self, cb: GridListener) -> None:
+        self._listeners.append(cb)
+
+    def remove_listener(self, cb: GridListener) -> None:
+        if cb in self._listeners:
+            self._listeners.remove(cb)
+
+    def flat_bytes(self) -> bytes | memoryview:
+        """Copia plana (índice x*height + y) cacheada por versión; indexar bytes es mucho más rápido que NumPy escalar."""
+        if not self.flat_copy:
+            return memoryview(self.cells.reshape(-1).view(np.uint8))
+        if self._flat_version != self.version or self._flat is None:
+            self._flat = np.ascontiguousarray(self.cells, dtype=np.uint8).tobytes()
+            self._flat_version = self.version
+        return self._flat
+
+
+# ---- Heurísticas (sobre deltas absolutos) ----
+_SQRT2_M2 = 2 ** 0.5 - 2
+
+def manhattan(dx: int, dy: int) -> float:
+    return dx + dy
+
+def octile(dx: int, dy: int) -> float:
+    return dx + dy + _SQRT2_M2 * min(dx, dy)
+
+HEURISTICS = {"manhattan": manhattan, "octile": octile}
+
+
+def astar(
+    grid: WalkGrid,
+    start: Cell,
+    goal: Cell,
+    heuristic: str = "manhattan",
+    max_expansions: int | None = None,
+    bounds: Tuple[int, int, int, int] | None = None,
+) -> Optional[List[Cell]]:
+    """
+    A* 4-direccional con montículo binario (heapq).
+    Devuelve la lista de celdas desde start hasta goal (ambas incluidas) o None si no hay ruta.
+    `bounds` (x1, y1, x2, y2 inclusive) restringe la búsqueda a un rectángulo (p.ej. un cluster HPA*).
+    """
+    if not grid.is_walkable(*goal) or not grid.in_bounds(*start):
+        return None
+    if start == goal:
+        return [start]
+
+    h_fn = HEURISTICS[heuristic]
+    w, h = grid.width, grid.height
+    bx1, by1, bx2, by2 = bounds if bounds is not None else (0, 0, w - 1, h - 1)
+    walk = grid.flat_bytes()
+    gx, gy = goal
+    s = start[0] * h + start[1]
+    g_idx = gx * h + gy
+
+    g_score = {s: 0}
+    came_from: dict[int, int] = {}
+    # Desempate por mayor g: en empates de f avanza en profundidad en vez de abrir un frente enorme
+    open_heap = [(h_fn(abs(start[0] - gx), abs(start[1] - gy)), 0, s)]
+    closed = set()
+    expansions = 0
+
+    while open_heap:
+        _, neg_g, cur = heapq.heappop(open_heap)
+        if cur == g_idx:
+            path = [cur]
+            while cur in came_from:
+                cur = came_from[cur]
+                path.append(cur)
+            path.reverse()
+            return [divmod(i, h) for i in path]
+        if cur in closed:
+            continue
+        closed.add(cur)
+        expansions += 1
+        if max_expansions is not None and expansions > max_expansions:
+            return None
+
+        cx, cy = divmod(cur, h)
+        ng = 1 - neg_g
+        for nb, nx, ny in (
+            (cur + h, cx + 1, cy), (cur - h, cx - 1, cy),
+            (cur + 1, cx, cy + 1), (cur - 1, cx, cy - 1),
+        ):
+            if nx < bx1 or nx > bx2 or ny < by1 or ny > by2 or not walk[nb] or nb in closed:
+                continue
+            if ng < g_score.get(nb, ng + 1):
+                g_score[nb] = ng
+                came_from[nb] = cur
+                heapq.heappush(open_heap, (ng + h_fn(abs(nx - gx), abs(ny - gy)), -ng, nb))
+    return None
+
+
+def path_to_steps(path: List[Cell]) -> List[Step]:
+    """Convierte una lista de celdas consecutivas en pasos cardinales (dx, dy)."""
+    return [(x1 - x0, y1 - y0) for (x0, y0), (x1, y1) in zip(path, path[1:])]
+
+
+def path_to_segments(path: List[Cell]) -> List[Segment]:
+    """Igual que path_to_steps pero comprimido por tramos rectos: O(giros) en vez de O(distancia)."""
+    segments: List[Segment] = []
+    for step in path_to_steps(path):
+        if segments and segments[-1][:2] == step:
+            dx, dy, n = segments[-1]
+            segments[-1] = (dx, dy, n + 1)
+        else:
+            segments.append((step[0], step[1], 1))
+    return segments
+
+
+class PathFinder:
+    """
+    Planificador A* con caché LRU de rutas recientes (start, goal).
+    La caché se vacía en cuanto cambia la versión de la WalkGrid.
+    Thread-safe: el agente (hilo SPADE) planifica fuera del hilo de render.
+    """
+    def __init__(
+        self,
+        grid: WalkGrid,
+        cache_size: int = 256,
+        heuristic: str = "manhattan",
+        max_expansions: int | None = None,
+    ) -> None:
+        self.grid = grid
+        self.cache_size = cache_size
+        self.heuristic = heuristic
+        self.max_expansions = max_expansions
+        self._cache: "OrderedDict[Tuple[Cell, Cell], Optional[Tuple[Cell, ...]]]" = OrderedDict()
+        self._cache_version = grid.version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def find_path(self, start: Cell, goal: Cell) -> Optional[List[Cell]]:
+        key = (tuple(start), tuple(goal))
+        with self._lock:
+            if self._cache_version != self.grid.version:
+                self._cache.clear()
+                self._cache_version = self.grid.version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                cached = self._cache[key]
+                return list(cached) if cached is not None else None
+            self.misses += 1
+            version = self.grid.version
+
+        path = astar(self.grid, key[0], key[1], self.heuristic, self.max_expansions)
+
+        with self._lock:
+            # Si la rejilla cambió mientras buscábamos, no cacheamos una ruta obsoleta
+            if version == self.grid.version == self._cache_version:
+                self._cache[key] = tuple(path) if path is not None else None
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return path
+
+    def find_steps(self, start: Cell, goal: Cell) -> Optional[List[Step]]:
+        path = self.find_path(start, goal)
+        return path_to_steps(path) if path is not None else None
+
+    def find_segments(self, start: Cell, goal: Cell) -> Optional[List[Segment]]:
+        path = self.find_path(start, goal)
+        return path_to_segments(path) if path is not None else None
+
+    def plan_route(self, start: Cell, goal: Cell) -> Optional[Iterator[Segment]]:
+        """Misma interfaz que HierarchicalPathFinder.plan_route (aquí la ruta ya está completa)."""
+        segments = self.find_segments(start, goal)
+        return iter(segments) if segments is not None else None
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
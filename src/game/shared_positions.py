@@ -0,0 +1,138 @@
+from __future__ import annotations
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = 0x54464D50  # "TFMP"
+ID_BYTES = 32       # npc_id en UTF-8, relleno a ancho fijo (más largo: ValueError)
+
+# Cabecera: magic, capacidad, nº de NPCs, (relleno), seq (seqlock), tick, versión de la tabla de ids
+_HEADER = np.dtype([
+    ("magic", "<u4"), ("capacity", "<u4"), ("count", "<u4"), ("_pad", "<u4"),
+    ("seq", "<u8"), ("tick", "<u8"), ("ids_version", "<u8"),
+])
+
+
+def _layout(capacity: int) -> List[Tuple[str, np.dtype, tuple, int]]:
+    """(nombre, dtype, forma, offset) de cada bloque tras la cabecera, alineados a 8 bytes."""
+    blocks = [("cell_x", np.dtype("<i4"), (capacity,)),
+              ("cell_y", np.dtype("<i4"), (capacity,)),
+              ("moving", np.dtype("u1"), (capacity,)),
+              ("ids", np.dtype(f"S{ID_BYTES}"), (capacity,))]
+    out, off = [], _HEADER.itemsize
+    for name, dt, shape in blocks:
+        out.append((name, dt, shape, off))
+        off += -(-(dt.itemsize * int(np.prod(shape))) // 8) * 8
+    return out
+
+
+def _size(capacity: int) -> int:
+    name, dt, shape, off = _layout(capacity)[-1]
+    return off + dt.itemsize * int(np.prod(shape))
+
+
+class SharedPositionTable:
+    """
+    Tabla de posiciones de NPCs (celda, moving, tick) en un bloque multiprocessing.shared_memory.
+    - Un único escritor (la simulación) publica al final de cada tick; cualquier proceso puede
+      abrirla por nombre (attach) y leerla sin mensajes ni copias por NPC.
+    - Seqlock: el escritor pone `seq` impar antes de escribir y par al terminar; read() copia y
+      reintenta si la versión cambió o era impar, así nunca ve una tabla a medio escribir.
+    - Los ids solo se reescriben cuando cambian las altas/bajas (ids_version).
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self.owner = owner
+        self._header = np.ndarray((), dtype=_HEADER, buffer=shm.buf)
+        if not owner and int(self._header["magic"]) != MAGIC:
+            raise ValueError(f"'{shm.name}' no es una tabla de posiciones")
+        self.capacity = int(self._header["capacity"])
+        for name, dt, shape, off in _layout(self.capacity):
+            setattr(self, f"_{name}", np.ndarray(shape, dtype=dt, buffer=shm.buf, offset=off))
+        self._ids_cache: Tuple[str, ...] = ()
+        self._ids_read: Tuple[int, List[str]] = (-1, [])
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # ---- Creación/apertura ----
+    @classmethod
+    def create(cls, capacity: int = 1024, name: Optional[str] = None) -> "SharedPositionTable":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_size(capacity))
+        np.ndarray((), dtype=_HEADER, buffer=shm.buf)[()] = (MAGIC, capacity, 0, 0, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedPositionTable":
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    def close(self) -> None:
+        # Soltar las vistas antes de cerrar: SharedMemory no se puede cerrar con buffers exportados
+        for attr in ("_header", "_cell_x", "_cell_y", "_moving", "_ids"):
+            self.__dict__.pop(attr, None)
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+    # ---- Escritor ----
+    def publish(self, world, tick: int) -> None:
+        """Vuelca cell_x/cell_y/moving de un WorldState (filas [0, count))."""
+        n = world.count
+        if n > self.capacity:
+            raise ValueError(f"{n} NPCs no caben en una tabla de capacidad {self.capacity}")
+        ids = tuple(world.ids)
+        encoded = None
+        if ids != self._ids_cache:  # se valida antes de abrir el seqlock
+            encoded = [i.encode("utf-8") for i in ids]
+            for npc_id, raw in zip(ids, encoded):
+                if len(raw) > ID_BYTES:
+                    raise ValueError(f"npc_id {npc_id!r} ocupa {len(raw)} bytes en UTF-8 (máximo {ID_BYTES})")
+        h = self._header
+        h["seq"] += 1  # impar: escribiendo
+        self._cell_x[:n] = world.cell_x[:n]
+        self._cell_y[:n] = world.cell_y[:n]
+        self._moving[:n] = world.moving[:n]
+        if encoded is not None:
+            self._ids[:n] = encoded
+            self._ids_cache = ids
+            h["ids_version"] += 1
+        h["count"] = n
+        h["tick"] = tick
+        h["seq"] += 1  # par: consistente
+
+    # ---- Lectores ----
+    def read(self, max_retries: int = 1000) -> Tuple[int, List[str], np.ndarray, np.ndarray]:
+        """Copia consistente: (tick, ids, cells (N,2) int32, moving (N,) bool)."""
+        h = self._header
+        for _ in range(max_retries):
+            s1 = int(h["seq"])
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            n, tick, ids_version = int(h["count"]), int(h["tick"]), int(h["ids_version"])
+            cells = np.empty((n, 2), dtype=np.int32)
+            cells[:, 0] = self._cell_x[:n]
+            cells[:, 1] = self._cell_y[:n]
+            moving = self._moving[:n].astype(bool)
+            if ids_version != self._ids_read[0]:
+                raw = self._ids[:n].copy()
+            else:
+                raw = None
+            if int(h["seq"]) == s1:
+                if raw is not None:
+                    self._ids_read = (ids_version, [b.decode("utf-8") for b in raw])
+                return tick, list(self._ids_read[1]), cells, moving
+        raise TimeoutError("La tabla de posiciones no se estabilizó (¿escritor atascado?)")
+
+    def views(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vistas sin copia (cell_x, cell_y, moving) de las filas activas; sin garantía de consistencia."""
+        n = int(self._header["count"])
+        return self._cell_x[:n], self._cell_y[:n], self._moving[:n]
+
+    @property
+    def seq(self) -> int:
+        return int(self._header["seq"])
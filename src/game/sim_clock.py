@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+
+class SimClock:
+    """
+    Reloj de simulación a tasa fija con acumulador: el render aporta su dt real y el reloj
+    decide cuántos ticks fijos tocan. El tiempo simulado es tick * dt (reproducible).
+    `alpha` es la fracción de tick pendiente, para interpolar el dibujo entre ticks.
+    """
+    def __init__(self, tick_rate: float = 60.0, max_ticks_per_frame: int = 8) -> None:
+        if tick_rate <= 0:
+            raise ValueError("tick_rate debe ser > 0")
+        self.dt = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.tick = 0
+        self._acc = 0.0
+
+    @property
+    def t_sim(self) -> float:
+        return self.tick * self.dt
+
+    @property
+    def alpha(self) -> float:
+        return self._acc / self.dt
+
+    def advance(self, frame_dt: float) -> int:
+        """Acumula frame_dt y devuelve cuántos ticks fijos hay que ejecutar ahora."""
+        # Tope para no entrar en espiral si un frame tarda mucho (se pierde tiempo, no estabilidad)
+        self._acc += min(max(frame_dt, 0.0), self.dt * self.max_ticks_per_frame)
+        n = int(self._acc / self.dt + 1e-9)
+        self._acc = max(0.0, self._acc - n * self.dt)
+        return n
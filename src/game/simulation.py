@@ -0,0 +1,424 @@
+from __future__ import annotations
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import (
+    WORLD_W, WORLD_H, BAKERY_X1, BAKERY_Y1, BAKERY_X2, BAKERY_Y2, HPA_MIN_CELLS, FLOW_FIELD_MARGIN,
+)
+from .adapters.npc_step_adapter import NpcStepAdapter
+from .adapters.game_io_bridge import GameIOBridge
+from .messaging.world_bus import WorldBus
+from .messaging.messages import AreaRecord, WorldSnapshot, WorldEvent, PROTOCOL_VERSION, area_record, intern
+from .messaging.protocol import areas_ref
+from .messaging.commands import (
+    Command, CommandRing, MoveCommand, CancelCommand, CatchCommand, DropCommand, SayCommand,
+)
+from .pathfinding import PathFinder, Segment, WalkGrid, astar, path_to_segments
+from .hpa import HierarchicalPathFinder
+from .flow_field import FlowFieldService
+from .spatial_index import SpatialHash
+from .world_state import WorldState
+from .movement import integrate_moves
+from .tilemap import ChunkedTileMap
+from .sim_clock import SimClock
+from .shared_positions import SharedPositionTable
+from ..utils.constants import FOV_RADIUS
+
+Rect = Sequence[int]
+Cell = Tuple[int, int]
+
+# Rebase de un MoveCommand cuyo NPC ya avanzó (ver WorldSim._on_move): celdas de la ruta en
+# las que se busca su celda actual y radio del A* que lo devuelve al origen de la ruta
+REBASE_LOOKAHEAD = 32
+REJOIN_RADIUS = 8
+
+# (nombre, rect[, etiqueta]); sin etiqueta se dibuja el nombre en mayúsculas
+DEFAULT_AREAS: Tuple[Tuple, ...] = (
+    ("Bakery", (BAKERY_X1, BAKERY_Y1, BAKERY_X2, BAKERY_Y2), "PANADERÍA"),
+)
+
+
+def default_spawn(i: int) -> Tuple[int, int]:
+    """Celda inicial del NPC i-ésimo: el principal en el centro y el resto en fila a su derecha."""
+    return (WORLD_W // 2 + 2 * i) % WORLD_W, WORLD_H // 2
+
+
+class WorldSim:
+    """
+    Núcleo de simulación sin Arcade: estado de NPCs, comandos de los agentes, colas de pasos,
+    movimiento y WorldBus.
+    Siempre avanza en ticks fijos de SimClock: MainView acumula el dt de render (advance) e
+    interpola el dibujo; HeadlessRunner encadena ticks sin ventana.
+    """
+    def __init__(
+        self,
+        bus: WorldBus | None = None,
+        walk_grid: WalkGrid | None = None,
+        world: WorldState | None = None,
+        areas: Iterable[Tuple[str, Rect]] | None = None,
+        tilemap: ChunkedTileMap | None = None,
+        tile_page_radius: int = 32,
+        tick_rate: float = 60.0,
+        command_capacity: int = 64,
+        positions: SharedPositionTable | None = None,
+        hpa_min_cells: int = HPA_MIN_CELLS,
+    ) -> None:
+        self.bus = bus or WorldBus()
+        # Tilemap opcional: se paginan los chunks alrededor de los NPCs en cada tick (y los de la
+        # región de cada ruta antes de planificarla); la capa 'blocked' de cada chunk paginado
+        # (o editado) se copia a la WalkGrid
+        self.tilemap = tilemap
+        self.tile_page_radius = tile_page_radius
+        if walk_grid is None and tilemap is not None:
+            # Lo que aún no se ha paginado no es transitable: no se planifica a ciegas. np.zeros
+            # solo reserva memoria virtual (el SO la asigna al escribir los chunks paginados) y la
+            # vista plana evita copiar el mapa entero a cada chunk que llega
+            walk_grid = WalkGrid(tilemap.width, tilemap.height,
+                                 cells=np.zeros((tilemap.width, tilemap.height), dtype=bool), flat_copy=False)
+        self.walk_grid = walk_grid if walk_grid is not None else WalkGrid(WORLD_W, WORLD_H)
+        self.world = world if world is not None else WorldState(index=SpatialHash())
+        if self.world.index is None:
+            self.world.index = SpatialHash()
+        self.entities = self.world.index
+        # Versionado de snapshots: contador global monótono; cada NPC guarda el valor del último
+        # cambio que le afecta (su celda o algo dentro de su FOV), y las áreas el suyo propio
+        self._snap_seq = 0
+        self._snap_versions: Dict[str, int] = {}
+        self._areas_seq = 0
+        self._areas_payload: Tuple[int, List[AreaRecord], str] | None = None  # (areas_version, lista, hash)
+        self.entities.add_listener(self._on_entity_change)
+        self.flow_fields = FlowFieldService(self.walk_grid, FLOW_FIELD_MARGIN if tilemap is not None else None)
+        self.pathfinder = self._make_pathfinder(hpa_min_cells)
+        self.step_adapters: Dict[str, NpcStepAdapter] = {}
+        # Un anillo SPSC por NPC: su agente produce, tick() drena todos de una vez
+        self.command_capacity = command_capacity
+        self.commands: Dict[str, CommandRing] = {}
+        self.move_rebases = 0   # MoveCommand planificados desde una celda que el NPC ya dejó
+        self.moves_dropped = 0  # ...que no se pudieron enganchar (el agente recibe "move_replan")
+        self._handlers: Dict[type, Callable[[Command], None]] = {
+            MoveCommand: self._on_move,
+            CancelCommand: self._on_cancel,
+            CatchCommand: self._on_catch,
+            DropCommand: self._on_drop,
+            SayCommand: self._on_say,
+        }
+        self._event_n = 0
+        self.areas: List[dict] = []
+        self.areas_version = 0  # cambia al añadir/quitar áreas (caché de render, snapshots)
+        self.blocked_steps = 0  # pasos descartados por pisar una celda no transitable
+        if tilemap is not None:
+            tilemap.add_listener(self._on_tiles)
+        self.clock = SimClock(tick_rate)
+        # Tabla de posiciones en memoria compartida (opcional), publicada al final de cada tick
+        self.positions = positions
+        for name, rect, *label in (DEFAULT_AREAS if areas is None else areas):
+            self.add_area(name, rect, *label)
+
+    def _make_pathfinder(self, hpa_min_cells: int) -> PathFinder | HierarchicalPathFinder:
+        """
+        A* plano en mundos pequeños; HPA* en los grandes, con las distancias intra-cluster en
+        segundo plano o, sobre tilemap, por cluster según se paginan y se consultan.
+        """
+        grid = self.walk_grid
+        if grid.width * grid.height < hpa_min_cells:
+            return PathFinder(grid)
+        hpa = HierarchicalPathFinder(grid)
+        if self.tilemap is None:
+            hpa.precompute_async()
+        return hpa
+
+    # ---- Áreas y NPCs ----
+    def add_area(self, name: str, rect: Rect, label: str | None = None) -> None:
+        self.areas.append({"name": name, "rect": list(rect), "label": label or name.upper()})
+        self.areas_version += 1
+        self._areas_seq = self._next_snap_seq()
+        self.flow_fields.register_area(name, rect)
+
+    def remove_area(self, name: str) -> None:
+        self.areas = [a for a in self.areas if a["name"] != name]
+        self.areas_version += 1
+        self._areas_seq = self._next_snap_seq()
+        self.flow_fields.unregister_area(name)
+
+    def add_npc(self, npc_id: str, cell: Tuple[int, int], step_adapter: NpcStepAdapter | None = None) -> NpcStepAdapter:
+        self.world.add(npc_id, cell)
+        steps = step_adapter or NpcStepAdapter()
+        self.step_adapters[npc_id] = steps
+        self.commands[npc_id] = CommandRing(self.command_capacity)
+        self.bus.register_npc(npc_id, lambda: self.build_snapshot(npc_id), lambda: self.snapshot_version(npc_id))
+        return steps
+
+    def remove_npc(self, npc_id: str) -> None:
+        self.bus.unregister_npc(npc_id)
+        self.step_adapters.pop(npc_id, None)
+        self.commands.pop(npc_id, None)
+        self.world.remove(npc_id)
+        self._snap_versions.pop(npc_id, None)
+
+    def make_bridge(self, npc_id: str, pathfinder=None) -> GameIOBridge:
+        """Bridge ya cableado a la rejilla, los campos de flujo y el WorldState de esta simulación."""
+        return GameIOBridge(
+            npc_id=npc_id,
+            world_bus=self.bus,
+            step_adapter=self.step_adapters[npc_id],
+            pathfinder=pathfinder or self.pathfinder,
+            flow_fields=self.flow_fields,
+            page_route=self.page_route if self.tilemap is not None else None,
+            world=self.world,
+            commands=self.commands[npc_id],
+        )
+
+    # ---- Snapshots ----
+    def _next_snap_seq(self) -> int:
+        self._snap_seq += 1
+        return self._snap_seq
+
+    def _on_entity_change(self, entity_id: str, old: Cell | None, new: Cell | None) -> None:
+        """Marca sucios a la entidad (si es NPC) y a los NPCs que la tenían o la tienen en su FOV."""
+        seq = self._next_snap_seq()
+        versions, world = self._snap_versions, self.world
+        if entity_id in world:
+            versions[entity_id] = seq
+            if new is not None:
+                # La región de interés "fov" sigue al NPC (eventos locales vía publish_region)
+                self.bus.subscribe_radius(entity_id, new, FOV_RADIUS, name="fov")
+        for c in (old, new):
+            if c is not None:
+                for eid in self.entities.query_radius(c, FOV_RADIUS):
+                    if eid in world:
+                        versions[eid] = seq
+
+    def snapshot_version(self, npc_id: str) -> int:
+        """Versión monótona del snapshot de npc_id: solo cambia si cambia su contenido."""
+        return max(self._snap_versions.get(npc_id, 0), self._areas_seq)
+
+    def areas_payload(self) -> Tuple[List[AreaRecord], str]:
+        """Lista de áreas para snapshots y su hash; se comparte entre snapshots hasta que cambie."""
+        payload = self._areas_payload
+        if payload is None or payload[0] != self.areas_version:
+            areas = [area_record(a["name"], a["rect"], a.get("walkable")) for a in self.areas]
+            payload = self._areas_payload = (self.areas_version, areas, areas_ref(areas))
+        return payload[1], payload[2]
+
+    def build_snapshot(self, npc_id: str) -> WorldSnapshot:
+        cell = self.world.cell(npc_id)
+        areas, ref = self.areas_payload()
+        return WorldSnapshot(
+            version=PROTOCOL_VERSION,
+            t_sim=self.clock.t_sim,
+            seq=self.snapshot_version(npc_id),
+            npc_id=npc_id,
+            cell=cell,
+            nearby=self.entities.nearby(cell, FOV_RADIUS, exclude=(npc_id,)),
+            areas=areas,
+            last_events=[],
+            areas_ref=ref,
+        )
+
+    # ---- Comandos de los agentes ----
+    def drain_commands(self) -> int:
+        """Aplica en lote los comandos publicados por los agentes desde el último tick."""
+        n = 0
+        for ring in list(self.commands.values()):
+            for cmd in ring.drain():
+                if cmd.npc_id in self.world:
+                    self._handlers[type(cmd)](cmd)
+                    n += 1
+        return n
+
+    def plan_route(self, start: Cell, goal: Cell):
+        """Ruta de start a goal: campo de flujo si el destino cae en un área, si no el pathfinder."""
+        self.page_route(start, goal)
+        route = self.flow_fields.plan_route(start, goal)
+        return route if route is not None else self.pathfinder.plan_route(start, goal)
+
+    def _on_move(self, cmd: MoveCommand) -> None:
+        """
+        Los pasos de la ruta son relativos a la celda desde la que se planificó: si el NPC ha
+        avanzado entre el encolado y el drenado, la ruta se engancha a su celda actual sin
+        replanificar en el tick (_rebase_route). Si no se puede, el NPC se detiene (se descartan
+        también las pendientes) y su agente recibe "move_replan" para planificar en su hilo.
+        """
+        steps = self.step_adapters[cmd.npc_id]
+        route = cmd.route
+        cell = self.world.cell(cmd.npc_id)
+        if cmd.start is not None and tuple(cmd.start) != cell:
+            self.move_rebases += 1
+            route = self._rebase_route(route, tuple(cmd.start), cell)
+            if route is None:
+                self.moves_dropped += 1
+                steps.cancel()
+                self.bus.publish_event(cmd.npc_id, self.make_event(
+                    "move_replan", {"npc_id": cmd.npc_id, "cell": list(cell), "goal": list(cmd.goal)}))
+                return
+        steps.push_route(route, replace=True, route_id=cmd.route_id)
+
+    def _rebase_route(self, route: Iterable, start: Cell, cell: Cell) -> Optional[Iterator]:
+        """
+        Ruta planificada desde `start` para un NPC que ya está en `cell`, con coste acotado: si
+        `cell` está en las primeras REBASE_LOOKAHEAD celdas de la ruta se salta ese prefijo; si
+        no, se vuelve a `start` con un A* limitado a REJOIN_RADIUS celdas alrededor. None si
+        tampoco así.
+        """
+        it = iter(route)
+        head: List[Segment] = []
+        x, y = start
+        walked = 0
+        while walked < REBASE_LOOKAHEAD:
+            item = next(it, None)
+            if item is None:
+                break
+            dx, dy = item[0], item[1]
+            n = item[2] if len(item) == 3 else 1
+            k = (cell[0] - x) * dx if dx else (cell[1] - y) * dy
+            if 0 < k <= n and (x + dx * k, y + dy * k) == cell:
+                return itertools.chain([(dx, dy, n - k)] if k < n else [], it)
+            head.append((dx, dy, n))
+            x, y = x + dx * n, y + dy * n
+            walked += n
+        grid, r = self.walk_grid, REJOIN_RADIUS
+        bounds = (max(0, min(cell[0], start[0]) - r), max(0, min(cell[1], start[1]) - r),
+                  min(grid.width - 1, max(cell[0], start[0]) + r), min(grid.height - 1, max(cell[1], start[1]) + r))
+        join = astar(grid, cell, start, bounds=bounds)
+        if join is None:
+            return None
+        return itertools.chain(path_to_segments(join), head, it)
+
+    def _on_cancel(self, cmd: CancelCommand) -> None:
+        self.step_adapters[cmd.npc_id].cancel(cmd.route_id)
+
+    def _on_catch(self, cmd: CatchCommand) -> None:
+        self._emit_near(cmd.npc_id, "world_change", {"action": "catch", "npc_id": cmd.npc_id, "obj": cmd.obj})
+
+    def _on_drop(self, cmd: DropCommand) -> None:
+        self._emit_near(cmd.npc_id, "world_change",
+                        {"action": "drop", "npc_id": cmd.npc_id, "obj": cmd.obj, "cell": list(cmd.cell)})
+
+    def _on_say(self, cmd: SayCommand) -> None:
+        self._emit_near(cmd.npc_id, "npc_interaction", {"action": "say", "npc_id": cmd.npc_id, "text": cmd.text})
+
+    def _emit_near(self, npc_id: str, kind: str, payload: dict) -> None:
+        """Publica el evento al propio NPC y a los NPCs dentro de su FOV."""
+        x, y = self.world.cell(npc_id)
+        self.bus.publish_region((x, y, x, y), self.make_event(kind, payload))
+
+    # ---- Eventos ----
+    def make_event(self, kind: str, payload: dict, priority: int = 0) -> WorldEvent:
+        self._event_n += 1
+        return WorldEvent(
+            version=PROTOCOL_VERSION,
+            t_sim=self.clock.t_sim,
+            seq=self.clock.tick,
+            event_id=f"{kind}-{self._event_n}",
+            kind=intern(kind),
+            payload=payload,
+            priority=priority,
+        )
+
+    def publish_area_event(self, area: str, kind: str, payload: dict, priority: int = 0) -> int:
+        """
+        Un evento de área (p.ej. zone_alert) a los NPCs cuya región de interés la toca o que
+        están suscritos al topic "area:<nombre>". Devuelve a cuántos ha llegado.
+        """
+        rect = next((a["rect"] for a in self.areas if a["name"] == area), None)
+        if rect is None:
+            raise KeyError(f"Área '{area}' no registrada")
+        ev = self.make_event(kind, dict(payload, area=area), priority)
+        return self.bus.publish(ev, topics=(f"area:{area}",), rect=tuple(rect))
+
+    # ---- Tick ----
+    def consume_steps(self) -> None:
+        """
+        Cada NPC libre toma el siguiente paso de su cola. Si la celda destino no es transitable
+        (p.ej. un tile bloqueado después de planificar la ruta), el NPC se detiene, se descarta
+        su ruta y recibe un evento "move_blocked" para replanificar.
+        """
+        world, grid = self.world, self.walk_grid
+        for row in np.flatnonzero(~world.moving[:world.count]).tolist():
+            npc_id = world.ids[row]
+            steps = self.step_adapters.get(npc_id)
+            if steps is not None and steps.has_steps():
+                step = steps.try_pop()
+                if not step:
+                    continue
+                tx, ty = int(world.cell_x[row]) + step[0], int(world.cell_y[row]) + step[1]
+                if grid.is_walkable(tx, ty):
+                    world.step(npc_id, *step)
+                    continue
+                steps.cancel()
+                self.blocked_steps += 1
+                self.bus.publish_event(npc_id, self.make_event("move_blocked", {"npc_id": npc_id, "cell": [tx, ty]}))
+
+    def _on_tiles(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Copia a la WalkGrid la transitabilidad de un rect del tilemap (solo si cambia algo)."""
+        grid = self.walk_grid
+        x2, y2 = min(x2, grid.width - 1), min(y2, grid.height - 1)
+        if x1 > x2 or y1 > y2:
+            return
+        block = self.tilemap.walkable_window(x1, y1, x2, y2)
+        if not np.array_equal(grid.cells[x1:x2 + 1, y1:y2 + 1], block):
+            grid.set_cells(x1, y1, block)  # nueva versión: rutas y campos de flujo se recalculan
+
+    def page_tiles(self) -> None:
+        """
+        Mantiene residentes los chunks del tilemap cerca de los NPCs (uno por chunk ocupado);
+        cada chunk que se carga vuelca su transitabilidad a la WalkGrid (_on_tiles).
+        """
+        tm, world = self.tilemap, self.world
+        if tm is None or world.count == 0:
+            return
+        n, cs = world.count, tm.chunk_size
+        occupied = np.unique(np.stack([world.cell_x[:n], world.cell_y[:n]], axis=1) // cs, axis=0)
+        centres = (occupied * cs + cs // 2).tolist()
+        tm.touch_around(centres, self.tile_page_radius + cs // 2)
+
+    def page_route(self, start: Cell, goal: Cell) -> None:
+        """
+        Con tilemap, pagina los chunks del rectángulo que une start y goal (más el radio de
+        paginación) antes de planificar: la rejilla conoce la región de la ruta y solo esa.
+        """
+        tm = self.tilemap
+        if tm is None:
+            return
+        r = self.tile_page_radius
+        tm.touch_rect(min(start[0], goal[0]) - r, min(start[1], goal[1]) - r,
+                      max(start[0], goal[0]) + r, max(start[1], goal[1]) + r)
+
+    @property
+    def t_sim(self) -> float:
+        return self.clock.t_sim
+
+    @property
+    def ticks(self) -> int:
+        return self.clock.tick
+
+    def tick(self) -> np.ndarray:
+        """Avanza un tick fijo (clock.dt); devuelve las filas que se han movido."""
+        world = self.world
+        world.prev_px[:world.count] = world.pos_px[:world.count]
+        self.drain_commands()
+        self.consume_steps()
+        self.page_tiles()
+        moved = integrate_moves(world, self.clock.dt)
+        self.clock.tick += 1
+        if self.positions is not None:
+            self.positions.publish(world, self.clock.tick)
+        return moved
+
+    def share_positions(self, capacity: int = 1024, name: str | None = None) -> SharedPositionTable:
+        """Crea (y publica ya) la tabla compartida; otros procesos la abren con attach(table.name)."""
+        self.positions = SharedPositionTable.create(capacity, name)
+        self.positions.publish(self.world, self.clock.tick)
+        return self.positions
+
+    def advance(self, frame_dt: float) -> np.ndarray:
+        """
+        Para el bucle de render: ejecuta los ticks fijos que tocan según frame_dt.
+        Devuelve las filas movidas en cualquiera de ellos (para volcar a sprites).
+        """
+        moved = [self.tick() for _ in range(self.clock.advance(frame_dt))]
+        if not moved:
+            return np.empty(0, dtype=np.intp)
+        return np.unique(np.concatenate(moved))
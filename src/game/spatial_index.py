@@ -0,0 +1,135 @@
+from __future__ import annotations
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .messaging.messages import NearbyEntity, intern
+
+Cell = Tuple[int, int]
+Bucket = Tuple[int, int]
+# (entity_id, celda_anterior|None, celda_nueva|None): alta, movimiento o baja
+EntityListener = Callable[[str, Optional[Cell], Optional[Cell]], None]
+
+
+class SpatialHash:
+    """
+    Índice espacial uniforme de entidades (NPCs/objetos) por celda.
+    Cada bucket agrupa `bucket_size`×`bucket_size` celdas; mover una entidad es O(1) y
+    las consultas por radio/rect solo visitan los buckets que solapan la zona pedida.
+    """
+    def __init__(self, bucket_size: int = 8) -> None:
+        self.bucket_size = bucket_size
+        self._buckets: Dict[Bucket, Set[str]] = {}
+        self._cells: Dict[str, Cell] = {}
+        self._kinds: Dict[str, str] = {}
+        self._meta: Dict[str, dict] = {}
+        self._listeners: List[EntityListener] = []
+        self._lock = threading.Lock()
+
+    def _bucket(self, x: int, y: int) -> Bucket:
+        return x // self.bucket_size, y // self.bucket_size
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._cells
+
+    # ---- Listeners ----
+    def add_listener(self, fn: EntityListener) -> None:
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn: EntityListener) -> None:
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, entity_id: str, old: Optional[Cell], new: Optional[Cell]) -> None:
+        for fn in list(self._listeners):
+            fn(entity_id, old, new)
+
+    # ---- Altas/bajas/movimientos ----
+    def insert(self, entity_id: str, cell: Cell, kind: str = "npc", meta: Optional[dict] = None) -> None:
+        with self._lock:
+            old = self._cells.get(entity_id)
+            if old is not None:
+                self._discard(entity_id)
+            cell = (int(cell[0]), int(cell[1]))
+            entity_id, kind = intern(entity_id), intern(kind)
+            self._cells[entity_id] = cell
+            self._kinds[entity_id] = kind
+            if meta:
+                self._meta[entity_id] = meta
+            self._buckets.setdefault(self._bucket(*cell), set()).add(entity_id)
+        self._notify(entity_id, old, cell)
+
+    def move(self, entity_id: str, cell: Cell) -> None:
+        with self._lock:
+            old = self._cells.get(entity_id)
+            if old is None:
+                raise KeyError(f"Entidad '{entity_id}' no indexada")
+            cell = (int(cell[0]), int(cell[1]))
+            self._cells[entity_id] = cell
+            ob, nb = self._bucket(*old), self._bucket(*cell)
+            if ob != nb:
+                self._remove_from_bucket(ob, entity_id)
+                self._buckets.setdefault(nb, set()).add(entity_id)
+        self._notify(entity_id, old, cell)
+
+    def remove(self, entity_id: str) -> None:
+        with self._lock:
+            old = self._cells.get(entity_id)
+            if old is not None:
+                self._discard(entity_id)
+        if old is not None:
+            self._notify(entity_id, old, None)
+
+    def _discard(self, entity_id: str) -> None:
+        cell = self._cells.pop(entity_id)
+        self._kinds.pop(entity_id, None)
+        self._meta.pop(entity_id, None)
+        self._remove_from_bucket(self._bucket(*cell), entity_id)
+
+    def _remove_from_bucket(self, b: Bucket, entity_id: str) -> None:
+        ids = self._buckets.get(b)
+        if ids is not None:
+            ids.discard(entity_id)
+            if not ids:
+                del self._buckets[b]
+
+    def cell_of(self, entity_id: str) -> Optional[Cell]:
+        return self._cells.get(entity_id)
+
+    # ---- Consultas ----
+    def query_rect(self, x1: int, y1: int, x2: int, y2: int) -> List[str]:
+        """Entidades en el rectángulo de celdas (ambos extremos inclusive)."""
+        bx1, by1 = self._bucket(min(x1, x2), min(y1, y2))
+        bx2, by2 = self._bucket(max(x1, x2), max(y1, y2))
+        out: List[str] = []
+        with self._lock:
+            for bx in range(bx1, bx2 + 1):
+                for by in range(by1, by2 + 1):
+                    for eid in self._buckets.get((bx, by), ()):
+                        x, y = self._cells[eid]
+                        if x1 <= x <= x2 and y1 <= y <= y2:
+                            out.append(eid)
+        return out
+
+    def query_radius(self, cell: Cell, radius: int, exclude: Iterable[str] = ()) -> List[str]:
+        """Entidades a distancia euclídea <= radius (en celdas) de `cell`."""
+        cx, cy = cell
+        r2 = radius * radius
+        skip = set(exclude)
+        out = []
+        for eid in self.query_rect(cx - radius, cy - radius, cx + radius, cy + radius):
+            c = self._cells.get(eid)
+            if c is None or eid in skip:
+                continue
+            x, y = c
+            if (x - cx) ** 2 + (y - cy) ** 2 <= r2:
+                out.append(eid)
+        return out
+
+    def nearby(self, cell: Cell, radius: int, exclude: Iterable[str] = ()) -> List[NearbyEntity]:
+        """Formato de WorldSnapshot.nearby: [NearbyEntity(kind, id, cell, meta)]."""
+        kinds, cells, metas = self._kinds, self._cells, self._meta
+        return [NearbyEntity(kinds.get(eid, ""), eid, cells[eid], metas.get(eid))
+                for eid in self.query_radius(cell, radius, exclude) if eid in cells]
@@ -0,0 +1,209 @@
+from __future__ import annotations
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+Cell = Tuple[int, int]
+ChunkId = Tuple[int, int]
+# (x1, y1, x2, y2) ambos inclusive: la capa 'blocked' de ese rect se ha paginado o ha cambiado
+TileListener = Callable[[int, int, int, int], None]
+
+FORMAT_VERSION = 1
+HEADER_NAME = "tilemap.json"
+# Capas por defecto. 'blocked' (0 = transitable) para que un fichero disperso recién creado
+# (todo ceros) sea un mapa de hierba transitable sin escribir nada.
+DEFAULT_LAYERS: Dict[str, str] = {"terrain": "uint8", "blocked": "uint8"}
+
+
+class ChunkedTileMap:
+    """
+    Mapa de tiles por chunks de `chunk_size`×`chunk_size` en disco (un fichero memory-mapped por capa).
+    - Disposición chunk-major: cada chunk es un bloque contiguo del fichero.
+    - Crear/abrir es O(1): el fichero es disperso y np.memmap no lee nada hasta que se usa.
+    - En RAM solo viven los chunks "calientes" (cerca de la cámara/NPCs activos), en una LRU
+      con presupuesto de memoria; los fríos se escriben (si están sucios) y se descartan.
+    - Los listeners (p.ej. WorldSim -> WalkGrid) reciben el rect de cada chunk que se pagina y
+      de cada cambio en la capa 'blocked', para copiar su transitabilidad donde haga falta.
+    """
+    def __init__(self, root: Path | str, memory_budget: int = 64 * 1024 * 1024) -> None:
+        self.root = Path(root)
+        header = json.loads((self.root / HEADER_NAME).read_text(encoding="utf-8"))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Versión de tilemap no soportada: {header.get('version')!r}")
+        self.width: int = header["width"]
+        self.height: int = header["height"]
+        self.chunk_size: int = header["chunk_size"]
+        self.layers: Dict[str, np.dtype] = {k: np.dtype(v) for k, v in header["layers"].items()}
+        self.ncx = -(-self.width // self.chunk_size)
+        self.ncy = -(-self.height // self.chunk_size)
+        self.memory_budget = memory_budget
+
+        cs = self.chunk_size
+        self._mm: Dict[str, np.memmap] = {
+            name: np.memmap(self.root / f"{name}.bin", dtype=dt, mode="r+", shape=(self.ncx, self.ncy, cs, cs))
+            for name, dt in self.layers.items()
+        }
+        self._chunk_bytes = sum(dt.itemsize for dt in self.layers.values()) * cs * cs
+        self._resident: "OrderedDict[ChunkId, Dict[str, np.ndarray]]" = OrderedDict()
+        self._dirty: set = set()
+        self._lock = threading.RLock()
+        self._listeners: List[TileListener] = []
+        self.loads = 0
+        self.evictions = 0
+
+    # ---- Creación ----
+    @classmethod
+    def create(
+        cls,
+        root: Path | str,
+        width: int,
+        height: int,
+        chunk_size: int = 64,
+        layers: Dict[str, str] | None = None,
+        memory_budget: int = 64 * 1024 * 1024,
+    ) -> "ChunkedTileMap":
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        layers = dict(layers or DEFAULT_LAYERS)
+        ncx, ncy = -(-width // chunk_size), -(-height // chunk_size)
+        for name, dt in layers.items():
+            size = ncx * ncy * chunk_size * chunk_size * np.dtype(dt).itemsize
+            with open(root / f"{name}.bin", "wb") as f:
+                f.truncate(size)  # fichero disperso: no ocupa disco hasta que se escribe
+        header = {"version": FORMAT_VERSION, "width": width, "height": height,
+                  "chunk_size": chunk_size, "layers": layers}
+        (root / HEADER_NAME).write_text(json.dumps(header, indent=2), encoding="utf-8")
+        return cls(root, memory_budget=memory_budget)
+
+    # ---- Paginación ----
+    @property
+    def resident_bytes(self) -> int:
+        return len(self._resident) * self._chunk_bytes
+
+    def chunk_of(self, x: int, y: int) -> ChunkId:
+        return x // self.chunk_size, y // self.chunk_size
+
+    def _chunk(self, c: ChunkId) -> Dict[str, np.ndarray]:
+        data = self._resident.get(c)
+        if data is not None:
+            self._resident.move_to_end(c)
+            return data
+        ci, cj = c
+        if not (0 <= ci < self.ncx and 0 <= cj < self.ncy):
+            raise IndexError(f"Chunk fuera del mapa: {c}")
+        data = {name: np.array(mm[ci, cj]) for name, mm in self._mm.items()}
+        self._resident[c] = data
+        self.loads += 1
+        self._evict()
+        cs = self.chunk_size
+        self._notify(ci * cs, cj * cs, min(self.width, (ci + 1) * cs) - 1, min(self.height, (cj + 1) * cs) - 1)
+        return data
+
+    def add_listener(self, cb: TileListener) -> None:
+        self._listeners.append(cb)
+
+    def remove_listener(self, cb: TileListener) -> None:
+        if cb in self._listeners:
+            self._listeners.remove(cb)
+
+    def _notify(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        for cb in list(self._listeners):
+            cb(x1, y1, x2, y2)
+
+    def _evict(self) -> None:
+        # Siempre queda al menos el chunk recién cargado
+        while len(self._resident) > 1 and self.resident_bytes > self.memory_budget:
+            c, data = self._resident.popitem(last=False)
+            if c in self._dirty:
+                self._write_back(c, data)
+            self.evictions += 1
+
+    def _write_back(self, c: ChunkId, data: Dict[str, np.ndarray]) -> None:
+        ci, cj = c
+        for name, arr in data.items():
+            self._mm[name][ci, cj] = arr
+        self._dirty.discard(c)
+
+    def is_resident(self, c: ChunkId) -> bool:
+        return c in self._resident
+
+    def touch_around(self, cells: Iterable[Cell], radius: int) -> int:
+        """Carga los chunks a `radius` celdas de cada celda (cámara, NPCs activos). Devuelve cuántos cargó."""
+        cs = self.chunk_size
+        wanted = set()
+        for x, y in cells:
+            for ci in range(max(0, (x - radius) // cs), min(self.ncx - 1, (x + radius) // cs) + 1):
+                for cj in range(max(0, (y - radius) // cs), min(self.ncy - 1, (y + radius) // cs) + 1):
+                    wanted.add((ci, cj))
+        with self._lock:
+            before = self.loads
+            for c in wanted:
+                self._chunk(c)
+            return self.loads - before
+
+    def touch_rect(self, x1: int, y1: int, x2: int, y2: int) -> int:
+        """Carga los chunks que cubren el rect (ambos extremos inclusive). Devuelve cuántos cargó."""
+        cs = self.chunk_size
+        with self._lock:
+            before = self.loads
+            for ci in range(max(0, x1 // cs), min(self.ncx - 1, x2 // cs) + 1):
+                for cj in range(max(0, y1 // cs), min(self.ncy - 1, y2 // cs) + 1):
+                    self._chunk((ci, cj))
+            return self.loads - before
+
+    def flush(self) -> None:
+        with self._lock:
+            for c in list(self._dirty):
+                self._write_back(c, self._resident[c])
+            for mm in self._mm.values():
+                mm.flush()
+
+    # ---- Acceso a celdas ----
+    def get(self, layer: str, x: int, y: int) -> int:
+        cs = self.chunk_size
+        with self._lock:
+            return int(self._chunk((x // cs, y // cs))[layer][x % cs, y % cs])
+
+    def set(self, layer: str, x: int, y: int, value: int) -> None:
+        self.set_rect(layer, x, y, x, y, value)
+
+    def set_rect(self, layer: str, x1: int, y1: int, x2: int, y2: int, value: int) -> None:
+        """Escribe un rectángulo de celdas (ambos extremos inclusive) chunk a chunk."""
+        cs = self.chunk_size
+        x1, x2 = max(0, x1), min(self.width - 1, x2)
+        y1, y2 = max(0, y1), min(self.height - 1, y2)
+        with self._lock:
+            for ci in range(x1 // cs, x2 // cs + 1):
+                for cj in range(y1 // cs, y2 // cs + 1):
+                    ox, oy = ci * cs, cj * cs
+                    arr = self._chunk((ci, cj))[layer]
+                    arr[max(x1, ox) - ox:min(x2, ox + cs - 1) - ox + 1,
+                        max(y1, oy) - oy:min(y2, oy + cs - 1) - oy + 1] = value
+                    self._dirty.add((ci, cj))
+            if layer == "blocked" and x1 <= x2 and y1 <= y2:
+                self._notify(x1, y1, x2, y2)
+
+    def window(self, layer: str, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """Copia densa [x, y] del rectángulo pedido (ambos extremos inclusive)."""
+        cs = self.chunk_size
+        out = np.empty((x2 - x1 + 1, y2 - y1 + 1), dtype=self.layers[layer])
+        with self._lock:
+            for ci in range(x1 // cs, x2 // cs + 1):
+                for cj in range(y1 // cs, y2 // cs + 1):
+                    ox, oy = ci * cs, cj * cs
+                    ax1, ax2 = max(x1, ox), min(x2, ox + cs - 1)
+                    ay1, ay2 = max(y1, oy), min(y2, oy + cs - 1)
+                    out[ax1 - x1:ax2 - x1 + 1, ay1 - y1:ay2 - y1 + 1] = \
+                        self._chunk((ci, cj))[layer][ax1 - ox:ax2 - ox + 1, ay1 - oy:ay2 - oy + 1]
+        return out
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height and self.get("blocked", x, y) == 0
+
+    def walkable_window(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """Transitabilidad (bool) del rectángulo, lista para WalkGrid.set_cells."""
+        return self.window("blocked", x1, y1, x2, y2) == 0
@@ -1,40 +1,70 @@
 from __future__ import annotations
 import arcade
-from .config import SCREEN_W, SCREEN_H, GRASS_COLOR, CAMERA_SMOOTH, TILE, WORLD_W, WORLD_H
+import numpy as np
+from .config import SCREEN_W, SCREEN_H, GRASS_COLOR, CAMERA_SMOOTH, TILE
 from .grid import GridRenderer
-from .areas import BakeryArea
+from .areas import AreaRenderer
 from .entities import GridWalker
 from .adapters.npc_step_adapter import NpcStepAdapter
-from .view_state import set_current_cell
+from .pathfinding import WalkGrid
+from .simulation import WorldSim, default_spawn
+from .movement import sync_sprites
 
 class MainView(arcade.View):
-    def __init__(self, step_adapter: NpcStepAdapter | None = None):
+    def __init__(
+        self,
+        step_adapter: NpcStepAdapter | None = None,
+        walk_grid: WalkGrid | None = None,
+        npc_id: str = "npc",
+        sim: WorldSim | None = None,
+    ):
         super().__init__()
         arcade.set_background_color(GRASS_COLOR)
         self.camera = arcade.Camera(SCREEN_W, SCREEN_H)
         self.ui_camera = arcade.Camera(SCREEN_W, SCREEN_H)
 
-        start_cell = (WORLD_W // 2, WORLD_H // 2)
-        self.npc = GridWalker(int(TILE * 0.8), start_cell)
-        set_current_cell(*start_cell)
-
+        # La lógica del mundo vive en WorldSim (sin Arcade); la vista solo dibuja
+        self.sim = sim or WorldSim(walk_grid=walk_grid)
+        self.world = self.sim.world
+        self.entities = self.sim.entities
+        self.walk_grid = self.sim.walk_grid
+        self.flow_fields = self.sim.flow_fields
+        self.step_adapters = self.sim.step_adapters
+        self.walkers: dict[str, GridWalker] = {}
         self.actors = arcade.SpriteList()
-        self.actors.append(self.npc)
+        self._interp_rows = np.empty(0, dtype=np.intp)  # filas dibujadas interpoladas el último frame
+
+        # NPC principal: la cámara lo sigue
+        self.npc = self.add_npc(npc_id, default_spawn(0), step_adapter)
+        self.steps = self.step_adapters[npc_id]
 
         self.grid = GridRenderer()
-        self.bakery = BakeryArea()
-        self.steps = step_adapter or NpcStepAdapter()
+        self.area_renderer = AreaRenderer()
+
+    def add_npc(self, npc_id: str, cell: tuple[int, int], step_adapter: NpcStepAdapter | None = None) -> GridWalker:
+        if npc_id not in self.world:
+            self.sim.add_npc(npc_id, cell, step_adapter)
+        walker = GridWalker(int(TILE * 0.8), cell, world=self.world, entity_id=npc_id)
+        self.walkers[npc_id] = walker
+        self.actors.append(walker)
+        return walker
 
     def on_update(self, dt: float):
-        # Consumir paso si el NPC está libre
-        if not self.npc.is_moving() and self.steps.has_steps():
-            step = self.steps.try_pop()
-            if step:
-                self.npc.step(*step)
+        # La simulación avanza en ticks fijos; el dt de render solo alimenta el acumulador
+        moved = self.sim.advance(dt)
+
+        # Dibujo interpolado entre el tick anterior y el actual (alpha = fracción de tick pendiente)
+        world = self.world
+        n = world.count
+        pending = np.flatnonzero((world.prev_px[:n] != world.pos_px[:n]).any(axis=1))
+        rows = np.union1d(np.union1d(moved, pending), self._interp_rows[self._interp_rows < n])
+        sync_sprites(world, rows, self.walkers, alpha=self.sim.clock.alpha)
+        self._interp_rows = pending
 
-        # Actualizar sprites
-        self.actors.on_update(dt)
-        set_current_cell(self.npc.cell_x, self.npc.cell_y)
+        # Tiles alrededor de la cámara (si el mundo usa tilemap)
+        if self.sim.tilemap is not None:
+            cam_cell = (int(self.npc.center_x // TILE), int(self.npc.center_y // TILE))
+            self.sim.tilemap.touch_around([cam_cell], max(SCREEN_W, SCREEN_H) // TILE)
 
         # Cámara centrada
         self.camera.move_to((self.npc.center_x - self.width/2, self.npc.center_y - self.height/2),
@@ -43,7 +73,7 @@ class MainView(arcade.View):
     def on_draw(self):
         self.clear()
         self.camera.use()
-        self.bakery.draw()
+        self.area_renderer.draw(self.sim.areas, self.sim.areas_version)
         self.grid.draw_visible(self.camera, self.window.width, self.window.height)
         self.actors.draw()
         self.ui_camera.use()
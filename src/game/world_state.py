@@ -0,0 +1,125 @@
+from __future__ import annotations
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .config import TILE
+from .spatial_index import SpatialHash
+
+Cell = Tuple[int, int]
+
+
+class WorldState:
+    """
+    Estado de todos los NPCs en arrays contiguos (struct-of-arrays) indexados por fila.
+    - npc_id -> fila vía `index_of`; las filas activas son [0, count).
+    - Al borrar se mueve la última fila al hueco: los arrays siguen compactos.
+    - Sin dependencia de Arcade: lo usan la vista, el bridge y los builders de snapshots.
+    Ojo: al crecer se realocan los arrays; no guardes referencias a ellos entre altas.
+    """
+    _ARRAYS = ("cell_x", "cell_y", "pos_px", "prev_px", "start_px", "target_px", "moving", "step_t")
+
+    def __init__(self, capacity: int = 64, index: SpatialHash | None = None) -> None:
+        capacity = max(1, capacity)
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.index = index
+        self._lock = threading.RLock()
+
+        self.cell_x = np.zeros(capacity, dtype=np.int32)
+        self.cell_y = np.zeros(capacity, dtype=np.int32)
+        self.pos_px = np.zeros((capacity, 2), dtype=np.float64)     # centro actual del sprite
+        self.prev_px = np.zeros((capacity, 2), dtype=np.float64)    # posición al empezar el último tick
+        self.start_px = np.zeros((capacity, 2), dtype=np.float64)   # centro al empezar el paso
+        self.target_px = np.zeros((capacity, 2), dtype=np.float64)  # centro de la celda destino
+        self.moving = np.zeros(capacity, dtype=bool)
+        self.step_t = np.zeros(capacity, dtype=np.float64)          # tiempo transcurrido del paso
+
+    # ---- Altas/bajas ----
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def capacity(self) -> int:
+        return self.cell_x.shape[0]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, npc_id: str) -> bool:
+        return npc_id in self._rows
+
+    def add(self, npc_id: str, cell: Cell) -> int:
+        with self._lock:
+            if npc_id in self._rows:
+                raise ValueError(f"NPC '{npc_id}' ya registrado")
+            if self.count == self.capacity:
+                self._grow(self.capacity * 2)
+            row = self.count
+            self.ids.append(npc_id)
+            self._rows[npc_id] = row
+            cx, cy = int(cell[0]), int(cell[1])
+            self.cell_x[row], self.cell_y[row] = cx, cy
+            center = (cx * TILE + TILE / 2, cy * TILE + TILE / 2)
+            self.pos_px[row] = self.prev_px[row] = self.start_px[row] = self.target_px[row] = center
+            self.moving[row] = False
+            self.step_t[row] = 0.0
+            if self.index is not None:
+                self.index.insert(npc_id, (cx, cy), kind="npc")
+            return row
+
+    def remove(self, npc_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(npc_id)
+            last = self.count - 1
+            if row != last:
+                moved = self.ids[last]
+                for name in self._ARRAYS:
+                    arr = getattr(self, name)
+                    arr[row] = arr[last]
+                self.ids[row] = moved
+                self._rows[moved] = row
+            self.ids.pop()
+            if self.index is not None:
+                self.index.remove(npc_id)
+
+    def _grow(self, capacity: int) -> None:
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    # ---- Acceso por npc_id ----
+    def index_of(self, npc_id: str) -> int:
+        return self._rows[npc_id]
+
+    def cell(self, npc_id: str) -> Cell:
+        row = self._rows[npc_id]
+        return int(self.cell_x[row]), int(self.cell_y[row])
+
+    def is_moving(self, npc_id: str) -> bool:
+        return bool(self.moving[self._rows[npc_id]])
+
+    def position(self, npc_id: str) -> Tuple[float, float]:
+        row = self._rows[npc_id]
+        return float(self.pos_px[row, 0]), float(self.pos_px[row, 1])
+
+    # ---- Movimiento ----
+    def step(self, npc_id: str, dx: int, dy: int) -> bool:
+        """Inicia un paso cardinal de 1 celda; devuelve False si el paso no es válido."""
+        if (abs(dx) + abs(dy)) != 1:
+            return False
+        with self._lock:
+            row = self._rows[npc_id]
+            cx, cy = int(self.cell_x[row]) + dx, int(self.cell_y[row]) + dy
+            self.cell_x[row], self.cell_y[row] = cx, cy
+            self.start_px[row] = self.pos_px[row]
+            self.target_px[row] = (cx * TILE + TILE / 2, cy * TILE + TILE / 2)
+            self.moving[row] = True
+            self.step_t[row] = 0.0
+            if self.index is not None:
+                self.index.move(npc_id, (cx, cy))
+        return True
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import asyncio
+import re
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .planning_pool import PlanningPool
+
+BATCH_HEADER = """======================
+PLANES POR LOTES
+======================
+Genera un plan independiente para CADA uno de los NPCs siguientes, cada uno con su propio
+contexto y estado. Responde con un bloque por NPC que empiece por su cabecera exacta
+("### NPC <n>") seguida de la respuesta en el FORMATO DE RESPUESTA indicado. No mezcles NPCs."""
+
+_SECTION = re.compile(r"^[ \t]*#{3}\s*NPC\s+(\d+)\b[^\n]*$", re.MULTILINE)
+
+
+def split_batch_response(text: str, n: int) -> List[Optional[str]]:
+    """Trocea la respuesta por cabeceras "### NPC <n>"; None donde falte (o esté vacía)."""
+    out: List[Optional[str]] = [None] * n
+    marks = list(_SECTION.finditer(text or ""))
+    for i, m in enumerate(marks):
+        idx = int(m.group(1)) - 1
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        if 0 <= idx < n and out[idx] is None:
+            out[idx] = text[m.end():end].strip() or None
+    return out
+
+
+def looks_like_plan(text: str) -> bool:
+    """Comprobación mínima de que la sección trae un plan AgentSpeak (+!trigger ... <- ...)."""
+    return "+!" in text and "<-" in text
+
+
+def build_batch_prompt(shared: str, sections: Sequence[str]) -> str:
+    body = "\n\n".join(f"### NPC {i}\n{section}" for i, section in enumerate(sections, start=1))
+    return f"{shared}\n\n{BATCH_HEADER}\n\n{body}"
+
+
+@dataclass
+class _Pending:
+    section: str
+    fallback: Callable[[], Awaitable[str]]
+    future: asyncio.Future
+    validate: Callable[[str], bool]
+
+
+class BatchPlanner:
+    """
+    Agrupa peticiones de plan de varios NPCs en una sola llamada al LLM.
+    - Las peticiones con el mismo contexto compartido (reglas, primitivas...) que llegan dentro
+      de `window` segundos van juntas (como mucho `max_batch`); el contexto se envía una vez.
+    - La respuesta se trocea por "### NPC <n>"; si falta una sección o la rechaza el `validate`
+      de la petición (o el del agrupador), esa petición cae a su `fallback` (p.ej. el prompt
+      individual por el PlanningPool).
+    - Si la llamada por lotes falla o vence su timeout, todas caen a su fallback; si se cancela
+      (p.ej. pool.close()), se cancelan también las peticiones que queden sin resolver.
+    """
+    _shared: "weakref.WeakKeyDictionary[PlanningPool, Dict[Tuple[Tuple[str, Any], ...], BatchPlanner]]" = \
+        weakref.WeakKeyDictionary()
+
+    def __init__(
+        self,
+        pool: PlanningPool,
+        window: float = 0.05,
+        max_batch: int = 8,
+        timeout: Optional[float] = None,
+        validate: Callable[[str], bool] = looks_like_plan,
+    ) -> None:
+        if max_batch <= 0:
+            raise ValueError("max_batch debe ser > 0")
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.validate = validate
+        self._buckets: Dict[str, List[_Pending]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self.requests = self.batches = self.batched = self.singles = 0
+        self.fallbacks = self.missing = self.malformed = self.batch_errors = 0
+
+    @classmethod
+    def for_pool(cls, pool: PlanningPool, **kwargs) -> "BatchPlanner":
+        """
+        Un agrupador por PlanningPool y configuración: así se juntan todos los agentes del mismo
+        LLM que piden la misma ventana (los que piden otra tienen su propio agrupador).
+        """
+        planners = cls._shared.setdefault(pool, {})
+        key = tuple(sorted(kwargs.items()))
+        planner = planners.get(key)
+        if planner is None:
+            planner = planners[key] = cls(pool, **kwargs)
+        return planner
+
+    async def submit(self, shared: str, section: str, fallback: Callable[[], Awaitable[str]],
+                     validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Encola la sección de un NPC y espera su parte de la respuesta (o la del fallback).
+        `validate` comprueba su sección (p.ej. el PlanValidator del agente); por defecto, el
+        del agrupador.
+        """
+        loop = asyncio.get_running_loop()
+        pending = _Pending(section, fallback, loop.create_future(), validate or self.validate)
+        bucket = self._buckets.setdefault(shared, [])
+        bucket.append(pending)
+        self.requests += 1
+        if len(bucket) >= self.max_batch:
+            self._flush(shared)
+        elif len(bucket) == 1:
+            self._timers[shared] = loop.call_later(self.window, self._flush, shared)
+        return await pending.future
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests, "batches": self.batches, "batched": self.batched,
+            "singles": self.singles, "fallbacks": self.fallbacks, "missing": self.missing,
+            "malformed": self.malformed, "batch_errors": self.batch_errors,
+        }
+
+    # ---- Internos ----
+    def _flush(self, shared: str) -> None:
+        timer = self._timers.pop(shared, None)
+        if timer is not None:
+            timer.cancel()
+        batch = [p for p in self._buckets.pop(shared, ()) if not p.future.done()]
+        if batch:
+            asyncio.ensure_future(self._run(shared, batch))
+
+    async def _run(self, shared: str, batch: List[_Pending]) -> None:
+        try:
+            await self._run_batch(shared, batch)
+        finally:  # cancelado o error inesperado: nadie se queda esperando
+            for p in batch:
+                if not p.future.done():
+                    p.future.cancel()
+
+    async def _run_batch(self, shared: str, batch: List[_Pending]) -> None:
+        if len(batch) == 1:  # sin nadie con quien agrupar: prompt individual
+            self.singles += 1
+            await self._resolve(batch[0])
+            return
+        self.batches += 1
+        self.batched += len(batch)
+        try:
+            text = await self.pool.generate(build_batch_prompt(shared, [p.section for p in batch]),
+                                            timeout=self.timeout)
+            sections = split_batch_response(text, len(batch))
+        except Exception:
+            self.batch_errors += 1
+            text, sections = None, [None] * len(batch)
+        retry = []
+        for p, section in zip(batch, sections):
+            if p.future.done():
+                continue
+            if section is None:
+                if text is not None:  # si la llamada falló ya cuenta como batch_error
+                    self.missing += 1
+            elif not p.validate(section):
+                self.malformed += 1
+                section = None
+            if section is None:
+                retry.append(p)
+            else:
+                p.future.set_result(section)
+        self.fallbacks += len(retry)
+        await asyncio.gather(*(self._resolve(p) for p in retry))
+
+    @staticmethod
+    async def _resolve(p: _Pending) -> None:
+        if p.future.done():  # el NPC ya dejó de esperar
+            return
+        try:
+            result = await p.fallback()
+        except asyncio.CancelledError:
+            p.future.cancel()
+            return
+        except Exception as e:
+            if not p.future.done():
+                p.future.set_exception(e)
+            return
+        if not p.future.done():
+            p.future.set_result(result)
@@ -1,7 +1,7 @@
 from pathlib import Path
 
-NPC_PATH =  Path(".\data")
-UTILS_PATH =  Path(".\utils")
+NPC_PATH =  Path("./data")
+UTILS_PATH =  Path("./utils")
 LOG_DIR =  Path("./logs")
 
 NPC_LOG_DIR = LOG_DIR / "npc_logs"
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# ------------------------------------------------------------------------------
+# Caché de ensamblado del prompt (prefijo/sufijo estáticos por NPC)
+# ------------------------------------------------------------------------------
+PromptParts = Tuple[str, ...]  # (prefijo, sufijo, *extra): prefijo + env_description + sufijo
+
+
+def _file_stamp(path: Path) -> Tuple[str, int, int]:
+    try:
+        st = path.stat()
+        return str(path), st.st_mtime_ns, st.st_size
+    except OSError:
+        return str(path), -1, -1
+
+
+class PromptCache:
+    """
+    Guarda el prompt ya montado salvo el hueco del estado del NPC.
+    - `build()` devuelve (prefijo, sufijo, *extra); solo se llama si cambia alguno de `sources`
+      (intenciones JSON, perfil...) o tras `invalidate()`.
+    - `fingerprint` identifica el contenido actual: sirve de parte de la clave del memo.
+    """
+    def __init__(self, build: Callable[[], PromptParts], sources: Sequence[Path] = ()) -> None:
+        self._build = build
+        self.sources = [Path(p) for p in sources]
+        self._stamp: Optional[tuple] = None
+        self._parts: Optional[PromptParts] = None
+        self.fingerprint = ""
+        self.hits = 0
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._parts = None
+
+    def parts(self) -> PromptParts:
+        stamp = tuple(_file_stamp(p) for p in self.sources)
+        with self._lock:
+            if self._parts is not None and stamp == self._stamp:
+                self.hits += 1
+                return self._parts
+            parts = tuple(self._build())
+            self._parts, self._stamp = parts, stamp
+            self.fingerprint = hashlib.blake2b(
+                "\x00".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+            self.builds += 1
+            return self._parts
+
+    def render(self, env_description: str) -> str:
+        parts = self.parts()
+        return f"{parts[0]}{env_description}{parts[1]}"
+
+
+# ------------------------------------------------------------------------------
+# Memo de respuestas del LLM (LRU + TTL, persistencia opcional)
+# ------------------------------------------------------------------------------
+_WS = re.compile(r"\s+")
+
+
+def normalize_env(env_description: str) -> str:
+    """Misma situación => misma clave: ignora espacios, saltos de línea y mayúsculas."""
+    return _WS.sub(" ", env_description).strip().lower()
+
+
+class ResponseMemo:
+    """
+    Respuestas ya generadas por estado normalizado del entorno.
+    - LRU con `maxsize` entradas; `ttl` en segundos (None = sin caducidad).
+    - Con `path`, se carga al crear y se reescribe (atómico) en cada alta: sobrevive a reinicios.
+    - Contadores hits/misses/expired/evictions para ajustar tamaño y TTL.
+    """
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 600.0, path: str | Path | None = None) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize debe ser > 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # clave -> (instante, texto)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = self.evictions = 0
+        if self.path is not None:
+            self._load()
+
+    @staticmethod
+    def make_key(env_description: str, context: str = "") -> str:
+        raw = f"{context}\x00{normalize_env(env_description)}".encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if self.ttl is not None and time.time() - item[0] > self.ttl:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            if self.path is not None:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            if self.path is not None:
+                self._save()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data), "hits": self.hits, "misses": self.misses,
+            "expired": self.expired, "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    # ---- Persistencia ----
+    def _load(self) -> None:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = time.time()
+        for key, ts, value in entries[-self.maxsize:]:
+            if self.ttl is None or now - ts <= self.ttl:
+                self._data[key] = (ts, value)
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump([[k, ts, v] for k, (ts, v) in self._data.items()], f, ensure_ascii=False)
+        os.replace(tmp, self.path)
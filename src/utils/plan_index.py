@@ -0,0 +1,176 @@
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"[^\W\d_]+")
+_BELIEF = re.compile(r"([a-z_][A-Za-z0-9_]*)\s*\(")
+
+
+def _features(text: str, ngram: int) -> List[str]:
+    """Palabras (sin tildes, minúsculas) y sus n-gramas de caracteres; los números no cuentan."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    out = []
+    for w in _WORD.findall(text):
+        out.append(w)
+        padded = f"#{w}#"
+        out.extend(padded[i:i + ngram] for i in range(len(padded) - ngram + 1))
+    return out
+
+
+@dataclass(frozen=True)
+class PlanMatch:
+    name: str
+    score: float       # similitud coseno (0..1)
+    plan: str
+    description: str
+    trigger: str
+
+
+class PlanIndex:
+    """
+    Índice local de la biblioteca de intenciones guardadas (save_new_intention).
+    - Cada intención se indexa por su nombre, descripción y creencias del trigger como vector
+      de features hasheadas (palabras + n-gramas de caracteres) en una matriz NumPy; la búsqueda
+      es TF-IDF + coseno top-k sobre toda la matriz.
+    - add() actualiza una fila (alta o sustitución por nombre) y, con `path`, guarda el índice
+      (.npz, escritura atómica); al crearlo se carga si existe.
+    - best() devuelve la mejor intención si supera el umbral y lleva las métricas de acierto.
+    """
+    def __init__(self, path: str | Path | None = None, dim: int = 1 << 12, ngram: int = 3) -> None:
+        self.path = Path(path) if path is not None else None
+        self.dim = dim
+        self.ngram = ngram
+        self._tf = np.zeros((0, dim), dtype=np.float32)
+        self._entries: List[Dict[str, str]] = []  # name, trigger, description, plan (por fila)
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.lookups = self.hits = self.misses = 0
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    # ---- Vectorización ----
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in _features(text, self.ngram):
+            vec[zlib.crc32(feat.encode("utf-8")) % self.dim] += 1.0  # hash estable entre procesos
+        return np.log1p(vec, out=vec)
+
+    @staticmethod
+    def document(name: str, trigger: str, description: str) -> str:
+        """Texto indexado: nombre y creencias del trigger (con '_' como espacio) y la descripción."""
+        beliefs = " ".join(_BELIEF.findall(trigger))
+        return f"{name} {beliefs} {description}".replace("_", " ")
+
+    # ---- Altas ----
+    def add(self, name: str, trigger: str, description: str, plan: str, save: bool = True) -> None:
+        vec = self._vector(self.document(name, trigger, description))
+        entry = {"name": name, "trigger": trigger, "description": description, "plan": plan}
+        with self._lock:
+            row = self._rows.get(name)
+            if row is None:
+                self._rows[name] = len(self._entries)
+                self._entries.append(entry)
+                self._tf = np.vstack([self._tf, vec[None, :]])
+            else:
+                self._entries[row] = entry
+                self._tf[row] = vec
+            if save and self.path is not None:
+                self._save()
+
+    def sync(self, intentions: Mapping[str, object]) -> int:
+        """
+        Deja el índice igual que el JSON de intenciones ({nombre: {trigger, description, plan}}):
+        indexa las que falten o hayan cambiado y quita las que ya no están. Devuelve cuántas
+        filas cambiaron.
+        """
+        wanted = {name: meta for name, meta in intentions.items()
+                  if isinstance(meta, dict) and isinstance(meta.get("plan"), str)}
+        changed = 0
+        for name, meta in wanted.items():
+            entry = {"name": name, "trigger": meta.get("trigger", ""),
+                     "description": meta.get("description", ""), "plan": meta["plan"]}
+            row = self._rows.get(name)
+            if row is None or self._entries[row] != entry:
+                self.add(name, entry["trigger"], entry["description"], entry["plan"], save=False)
+                changed += 1
+        with self._lock:
+            keep = [i for i, e in enumerate(self._entries) if e["name"] in wanted]
+            if len(keep) < len(self._entries):
+                changed += len(self._entries) - len(keep)
+                self._entries = [self._entries[i] for i in keep]
+                self._tf = self._tf[keep]
+                self._rows = {e["name"]: i for i, e in enumerate(self._entries)}
+            if changed and self.path is not None:
+                self._save()
+        return changed
+
+    # ---- Consultas ----
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Top-k (nombre, similitud) por TF-IDF + coseno."""
+        with self._lock:
+            if not self._entries:
+                return []
+            tf = self._tf
+            n = tf.shape[0]
+            df = np.count_nonzero(tf, axis=0)
+            idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+            docs = tf * idf
+            q = self._vector(query) * idf
+            norms = np.linalg.norm(docs, axis=1) * (np.linalg.norm(q) or 1.0)
+            scores = docs @ q / np.where(norms > 0, norms, 1.0)
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._entries[i]["name"], float(scores[i])) for i in top]
+
+    def best(self, query: str, threshold: float) -> Optional[PlanMatch]:
+        """Mejor intención si su similitud >= threshold (cuenta como acierto), si no None."""
+        self.lookups += 1
+        found = self.search(query, k=1)
+        if not found or found[0][1] < threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        name, score = found[0]
+        e = self._entries[self._rows[name]]
+        return PlanMatch(name, score, e["plan"], e["description"], e["trigger"])
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries), "lookups": self.lookups, "hits": self.hits,
+            "misses": self.misses, "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+        }
+
+    # ---- Persistencia ----
+    def _load(self) -> None:
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["dim"] != self.dim or meta["ngram"] != self.ngram:
+                return  # otro esquema de features: se reindexa desde el JSON con sync()
+            self._tf = data["tf"].astype(np.float32)
+        self._entries = meta["entries"]
+        self._rows = {e["name"]: i for i, e in enumerate(self._entries)}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({"dim": self.dim, "ngram": self.ngram, "entries": self._entries}, ensure_ascii=False)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez_compressed(f, tf=self._tf, meta=np.array(meta))
+        os.replace(tmp, self.path)
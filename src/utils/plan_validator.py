@@ -0,0 +1,378 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Gramática de referencia: la misma librería con la que spade_bdi carga los planes
+import agentspeak
+import agentspeak.lexer
+import agentspeak.parser
+
+PROMPT_SPLITTER = "# _ _ _ #"
+
+# Acciones internas de python-agentspeak / SPADE-BDI que siempre están disponibles (aridad libre)
+BUILTIN_ACTIONS: Tuple[str, ...] = (".print", ".fail", ".my_name", ".concat", ".range", ".count",
+                                    ".findall", ".random", ".send", ".wait")
+
+
+# ------------------------------------------------------------------------------
+# Resultado
+# ------------------------------------------------------------------------------
+@dataclass(frozen=True)
+class PlanError:
+    """Error localizado en el texto AgentSpeak (line/col desde 1) para el prompt de reparación."""
+    code: str        # syntax | unknown_action | unknown_function | unknown_belief | unknown_intention
+                     # | arity | negation | function_in_context | empty
+    message: str
+    line: int = 0
+    col: int = 0
+    symbol: str = ""
+
+    def __str__(self) -> str:
+        where = f"línea {self.line}, col {self.col}: " if self.line else ""
+        return f"[{self.code}] {where}{self.message}"
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    ok: bool
+    errors: Tuple[PlanError, ...] = ()
+    intentions: Tuple[str, ...] = ()  # intenciones definidas por el texto (+!nombre)
+    source: str = ""                  # bloque AgentSpeak extraído de la respuesta
+
+
+# ------------------------------------------------------------------------------
+# Vocabulario declarado
+# ------------------------------------------------------------------------------
+_SIGNATURE = re.compile(r"^\s*(\.?[a-z_][A-Za-z0-9_]*)\s*(?:\((.*)\))?\s*$")
+_TRIGGER = re.compile(r"\+!\s*([a-z_][A-Za-z0-9_]*)\s*(\(([^()]*)\))?")
+
+Arities = Dict[str, Set[int]]
+
+
+def _signature(text: str) -> Optional[Tuple[str, int]]:
+    """'has(Object, Count)' -> ('has', 2); '.object_at()' -> ('.object_at', 0)."""
+    m = _SIGNATURE.match(text)
+    if m is None:
+        return None
+    args = (m.group(2) or "").strip()
+    return m.group(1), len(args.split(",")) if args else 0
+
+
+def _add(table: Arities, name: str, arity: int) -> None:
+    table.setdefault(name, set()).add(arity)
+
+
+@dataclass
+class Vocabulary:
+    """Creencias, funciones, acciones (.primitivas) e intenciones que un plan puede usar."""
+    beliefs: Arities = field(default_factory=dict)
+    functions: Arities = field(default_factory=dict)
+    actions: Dict[str, Optional[int]] = field(default_factory=dict)  # None = cualquier aridad
+    intentions: Arities = field(default_factory=dict)
+
+    @classmethod
+    def from_json(
+        cls,
+        data: Mapping,
+        custom_actions: Mapping[str, int] = (),
+        custom_functions: Mapping[str, int] = (),
+        builtins: Iterable[str] = BUILTIN_ACTIONS,
+    ) -> "Vocabulary":
+        """
+        `data` con el formato de primitivas.json / npc_intentions/<npc>.json: beliefs y
+        functions por firma, actions con sus plans (+!nombre(...)) y, en la raíz, las
+        intenciones guardadas por save_new_intention ({"plan": ...}).
+        """
+        voc = cls(actions={name: None for name in builtins})
+        for sig in data.get("beliefs", {}):
+            parsed = _signature(sig)
+            if parsed:
+                _add(voc.beliefs, *parsed)
+        for sig in data.get("functions", {}):
+            parsed = _signature(sig)
+            if parsed:
+                _add(voc.functions, *parsed)
+        plans = [p for meta in data.get("actions", {}).values() for p in meta.get("plans", [])]
+        plans += [v["plan"] for v in data.values() if isinstance(v, dict) and isinstance(v.get("plan"), str)]
+        for plan in plans:
+            for m in _TRIGGER.finditer(plan):
+                args = (m.group(3) or "").strip()
+                _add(voc.intentions, m.group(1), len(args.split(",")) if args else 0)
+        voc.actions.update(dict(custom_actions))
+        for name, arity in dict(custom_functions).items():
+            _add(voc.functions, name, arity)
+        return voc
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs) -> "Vocabulary":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f), **kwargs)
+
+    def describe(self) -> str:
+        """Resumen compacto para el prompt de reparación."""
+        def sigs(table: Arities) -> str:
+            return ", ".join(f"{n}/{a}" for n in sorted(table) for a in sorted(table[n]))
+        acts = ", ".join(f"{n}/{'*' if a is None else a}" for n, a in sorted(self.actions.items()))
+        return (f"Acciones: {acts}\nFunciones: {sigs(self.functions)}\n"
+                f"Creencias: {sigs(self.beliefs)}\nIntenciones: {sigs(self.intentions)}")
+
+
+# ------------------------------------------------------------------------------
+# Sintaxis: parser de agentspeak; vocabulario: recorrido de su AST
+# ------------------------------------------------------------------------------
+class _AslLog:
+    """Logger para agentspeak.Log: guarda los errores como PlanError en lugar de imprimirlos."""
+
+    def __init__(self) -> None:
+        self.errors: List[PlanError] = []
+
+    def error(self, msg: str, *args: Any, extra: Optional[dict] = None) -> None:
+        loc = (extra or {}).get("loc")
+        line, col, symbol = 0, 0, ""
+        if loc is not None:
+            line, col, symbol = loc.lineno, loc.startcol + 1, loc.line[loc.startcol:loc.endcol]
+        self.errors.append(PlanError("syntax", msg % args if args else msg, line, col, symbol))
+
+    exception = error
+
+    def warning(self, msg: str, *args: Any, extra: Optional[dict] = None) -> None:
+        pass
+
+    info = warning
+
+
+def _asl_parse(src: str) -> Tuple[Any, List[PlanError]]:
+    """(AstAgent, []) si agentspeak acepta el texto; (None, [error]) con el primer error si no."""
+    collector = _AslLog()
+    log = agentspeak.Log(collector, max_errors=1)
+    source = agentspeak.StringSource("<plan>", src)
+    try:
+        ast = agentspeak.parser.parse(source.name, agentspeak.lexer.TokenStream(source, log, 1), log)
+        log.throw()
+    except agentspeak.AggregatedError:
+        return None, collector.errors[:1]
+    return ast, []
+
+
+class _AstChecker:
+    """Comprobaciones de vocabulario (nombres y aridades declarados) sobre el AST de agentspeak."""
+
+    def __init__(self, voc: Vocabulary, allow_negation: bool) -> None:
+        self.voc = voc
+        self.allow_negation = allow_negation
+        self.errors: List[PlanError] = []
+        self.defined: Dict[str, Set[int]] = {}
+        self.goals: List[Tuple[Any, str, int]] = []
+
+    def error(self, code: str, node: Any, message: str, symbol: str) -> None:
+        loc = node.loc
+        line, col = (loc.lineno, loc.startcol + 1) if loc is not None else (0, 0)
+        self.errors.append(PlanError(code, message, line, col, symbol))
+
+    def check(self, agent: Any) -> None:
+        if not agent.plans:
+            self.errors.append(PlanError("empty", "no hay ningún plan"))
+        for plan in agent.plans:
+            self.plan(plan)
+        for node, name, arity in self.goals:
+            known = self.voc.intentions.get(name, set()) | self.defined.get(name, set())
+            if not known:
+                self.error("unknown_intention", node, f"intención desconocida !{name}/{arity}", name)
+            elif arity not in known:
+                self.error("arity", node, f"!{name} espera aridad {sorted(known)}, no {arity}", name)
+
+    def plan(self, plan: Any) -> None:
+        event, head = plan.event, plan.event.head
+        if event.goal_type is agentspeak.GoalType.achievement:
+            self.defined.setdefault(head.functor, set()).add(len(head.terms))
+            self.args(head)
+        elif event.goal_type is agentspeak.GoalType.belief:
+            self.belief(head)
+        else:
+            self.args(head)
+        if plan.context is not None:
+            self.query(plan.context)
+        if plan.body is not None:
+            self.body(plan.body)
+
+    # ---- cuerpo ----
+    def body(self, body: Any) -> None:
+        FT = agentspeak.FormulaType
+        for f in body.formulas:
+            if isinstance(f, agentspeak.parser.AstIfThenElse):
+                self.query(f.condition)
+                self.body(f.if_body)
+                if f.else_body is not None:
+                    self.body(f.else_body)
+            elif isinstance(f, agentspeak.parser.AstWhile):
+                self.query(f.condition)
+                self.body(f.body)
+            elif isinstance(f, agentspeak.parser.AstFor):
+                self.query(f.generator)
+                self.body(f.body)
+            elif not isinstance(f.term, agentspeak.parser.AstLiteral):
+                self.expr(f.term)
+            elif f.formula_type in (FT.achieve, FT.achieve_later):
+                self.goals.append((f.term, f.term.functor, len(f.term.terms)))
+                self.args(f.term)
+            elif f.formula_type is not FT.term:  # ?, +, -, -+
+                self.belief(f.term)
+            elif f.term.functor.startswith("."):
+                self.call(f.term, action=True)
+            else:
+                self.args(f.term)
+                self.error("unknown_action", f.term, f"acción externa desconocida {f.term.signature()}"
+                           " (las primitivas empiezan por '.')", f.term.functor)
+
+    # ---- consultas (contexto y condiciones) ----
+    def query(self, node: Any) -> None:
+        ops = agentspeak.BinaryOp
+        if isinstance(node, agentspeak.parser.AstUnaryOp) and node.operator is agentspeak.UnaryOp.op_not:
+            if not self.allow_negation:
+                self.error("negation", node, "el contexto solo admite creencias positivas (sin 'not')", "not")
+            self.query(node.operand)
+        elif isinstance(node, agentspeak.parser.AstBinaryOp) and node.operator in (ops.op_and, ops.op_or):
+            self.query(node.left)
+            self.query(node.right)
+        elif isinstance(node, agentspeak.parser.AstLiteral):
+            if node.functor.startswith("."):
+                self.error("function_in_context", node,
+                           f"{node.functor} es una función: solo en el cuerpo del plan", node.functor)
+                self.call(node)
+            else:
+                self.belief(node)
+        else:
+            self.expr(node)
+
+    # ---- términos ----
+    def expr(self, node: Any) -> None:
+        P = agentspeak.parser
+        if isinstance(node, P.AstLiteral):
+            if node.functor.startswith("."):
+                self.call(node)
+            else:
+                self.args(node)
+        elif isinstance(node, P.AstBinaryOp):
+            self.expr(node.left)
+            self.expr(node.right)
+        elif isinstance(node, P.AstUnaryOp):
+            self.expr(node.operand)
+        elif isinstance(node, P.AstList):
+            for term in node.terms:
+                self.expr(term)
+        elif isinstance(node, P.AstLinkedList):
+            self.expr(node.head)
+            self.expr(node.tail)
+
+    def args(self, literal: Any) -> None:
+        for term in list(literal.terms) + list(literal.annotations):
+            self.expr(term)
+
+    def call(self, node: Any, action: bool = False) -> None:
+        self.args(node)
+        name, arity = node.functor, len(node.terms)
+        if action and name in self.voc.actions:
+            expected = self.voc.actions[name]
+            if expected is not None and expected != arity:
+                self.error("arity", node, f"{name} espera {expected} argumentos, no {arity}", name)
+        elif name in self.voc.functions:
+            if arity not in self.voc.functions[name]:
+                self.error("arity", node, f"{name} espera aridad {sorted(self.voc.functions[name])}, no {arity}", name)
+        elif action:
+            self.error("unknown_action", node, f"acción desconocida {name}/{arity}", name)
+        else:
+            self.error("unknown_function", node, f"función desconocida {name}/{arity}", name)
+
+    def belief(self, node: Any) -> None:
+        self.args(node)
+        name, arity = node.functor.lstrip("~"), len(node.terms)
+        known = self.voc.beliefs.get(name)
+        if not known:
+            self.error("unknown_belief", node, f"creencia no declarada {name}/{arity}", name)
+        elif arity not in known:
+            self.error("arity", node, f"{name} espera aridad {sorted(known)}, no {arity}", name)
+
+
+# ------------------------------------------------------------------------------
+# API
+# ------------------------------------------------------------------------------
+_FENCE = re.compile(r"^```[A-Za-z]*\s*$", re.MULTILINE)
+
+
+def extract_agentspeak(text: str) -> str:
+    """Bloque AgentSpeak de la respuesta del LLM: sin [AGENTSPEAK], ``` ni la parte tras el splitter."""
+    text = (text or "").split(PROMPT_SPLITTER, 1)[0]
+    text = _FENCE.sub("", text)
+    return text.replace("[AGENTSPEAK]", "").strip()
+
+
+class PlanValidator:
+    """
+    Valida planes AgentSpeak antes de cargarlos en el BDI (sintaxis + vocabulario declarado).
+    La sintaxis la decide el parser de agentspeak (el que usa spade_bdi) y el vocabulario se
+    comprueba sobre su AST; con un error de sintaxis solo se informa de ese error.
+    Los resultados se memorizan por hash del texto (LRU de `cache_size` entradas).
+    """
+    def __init__(
+        self,
+        vocabulary: Vocabulary,
+        cache_size: int = 512,
+        allow_negation: bool = False,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.cache_size = cache_size
+        self.allow_negation = allow_negation
+        self._cache: "OrderedDict[str, ValidationResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def validate(self, text: str) -> ValidationResult:
+        key = hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        result = self._validate(extract_agentspeak(text))
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _validate(self, src: str) -> ValidationResult:
+        ast, syntax = _asl_parse(src)
+        if ast is None:
+            return ValidationResult(False, tuple(syntax), (), src)
+        checker = _AstChecker(self.vocabulary, self.allow_negation)
+        checker.check(ast)
+        return self._result(checker.errors, checker.defined, src)
+
+    @staticmethod
+    def _result(errors: List[PlanError], defined: Mapping[str, Set[int]], src: str) -> ValidationResult:
+        errors = tuple(sorted(errors, key=lambda e: (e.line, e.col)))
+        return ValidationResult(not errors, errors, tuple(defined), src)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def repair_prompt(self, plan_text: str, result: ValidationResult) -> str:
+        """Prompt corto para corregir solo los errores detectados (sin volver a mandar el contexto)."""
+        errors = "\n".join(f"- {e}" for e in result.errors)
+        return (
+            "El siguiente plan AgentSpeak tiene errores. Corrígelos sin cambiar su intención.\n"
+            "Usa SOLO este vocabulario (nombre/aridad):\n"
+            f"{self.vocabulary.describe()}\n\n"
+            f"ERRORES:\n{errors}\n\n"
+            f"PLAN:\n{result.source or plan_text}\n\n"
+            f"Responde solo con el plan corregido en el mismo formato:\n[AGENTSPEAK]\n\n{PROMPT_SPLITTER}\n\n"
+            "[intencion_1 : descripción funcional general]"
+        )
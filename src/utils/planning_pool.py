@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import inspect
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+
+class PlanningPool:
+    """
+    Servicio asíncrono de llamadas al LLM compartido por todos los NPCAgent.
+    - Concurrencia acotada: como mucho `max_concurrency` llamadas en curso (las demás esperan turno).
+    - Single-flight: prompts idénticos en curso comparten una sola llamada al LLM.
+    - Timeout y cancelación por petición: quien se cansa deja de esperar, pero la llamada sigue
+      mientras otro la espere; si nadie la espera, se cancela.
+    Acepta LLMs con `async agenerate(prompt)` o, si no, `generate(prompt)` síncrono (en hilos
+    propios: el bucle de eventos no se bloquea). Un hilo ocupado no se puede interrumpir: su
+    plaza solo se libera cuando el LLM responde.
+    """
+    _shared: "weakref.WeakKeyDictionary[Any, PlanningPool]" = weakref.WeakKeyDictionary()
+    _by_id: Dict[int, Tuple[Any, "PlanningPool"]] = {}  # LLMs sin hash o sin weakref
+
+    def __init__(self, llm: Any, max_concurrency: int = 4, timeout: Optional[float] = 60.0) -> None:
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency debe ser > 0")
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._agenerate = getattr(llm, "agenerate", None)
+        if not inspect.iscoroutinefunction(self._agenerate):
+            self._agenerate = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.active = 0
+        self.peak_active = 0
+        self.requests = self.llm_calls = self.deduplicated = 0
+        self.timeouts = self.cancelled = self.failed = 0
+
+    @classmethod
+    def for_llm(cls, llm: Any, **kwargs) -> "PlanningPool":
+        """
+        Pool compartido por todos los agentes que usan el mismo objeto LLM. Los LLMs que no
+        admiten hash o weakref (dataclasses mutables, clases con __slots__) se registran por
+        id(); el registro los mantiene vivos para que ese id no se reutilice.
+        """
+        try:
+            pool = cls._shared.get(llm)
+            if pool is None:
+                pool = cls._shared[llm] = cls(llm, **kwargs)
+            return pool
+        except TypeError:
+            pass
+        entry = cls._by_id.get(id(llm))
+        if entry is None:
+            entry = cls._by_id[id(llm)] = (llm, cls(llm, **kwargs))
+        return entry[1]
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+    # ---- API ----
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Texto generado para `prompt`. Lanza asyncio.TimeoutError si vence el timeout
+        (el de la llamada o, si es None, el del pool) y propaga los errores del LLM.
+        """
+        self.requests += 1
+        key = self.key(prompt)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.deduplicated += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), limit)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                self.cancelled += 1
+            raise
+        finally:
+            left = self._waiters.get(key, 1) - 1
+            if left > 0:
+                self._waiters[key] = left
+            else:
+                self._waiters.pop(key, None)
+                if not task.done():
+                    task.cancel()  # nadie espera ya esta respuesta
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests, "llm_calls": self.llm_calls, "deduplicated": self.deduplicated,
+            "timeouts": self.timeouts, "cancelled": self.cancelled, "failed": self.failed,
+            "active": self.active, "peak_active": self.peak_active, "inflight": len(self._inflight),
+        }
+
+    def close(self) -> None:
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---- Internos ----
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+
+    async def _call(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # el semáforo pertenece a un bucle concreto
+            self._loop, self._sem, self.active = loop, asyncio.Semaphore(self.max_concurrency), 0
+        await self._sem.acquire()
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        self.llm_calls += 1
+        if self._agenerate is not None:
+            try:
+                return await self._agenerate(prompt) or ""
+            finally:
+                self._release()
+        # LLM síncrono: la plaza se libera cuando el hilo termina, no cuando se deja de esperar
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="llm")
+        cf = self._executor.submit(self.llm.generate, prompt)
+        sem = self._sem
+        cf.add_done_callback(lambda _: self._release_threadsafe(loop, sem))
+        return await asyncio.wrap_future(cf) or ""
+
+    def _release(self, sem: Optional[asyncio.Semaphore] = None) -> None:
+        sem = sem or self._sem
+        if sem is self._sem:
+            self.active -= 1
+        sem.release()
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop, sem: asyncio.Semaphore) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release, sem)
+        except RuntimeError:  # bucle ya cerrado
+            pass
@@ -10,7 +10,7 @@ def run_agent_plan() -> bool:
             # Plan AgentSpeak de ejemplo (válido a nivel sintáctico para biblioteca)
             return (
                 "+!ir_a_panaderia : true <-\n"
-                "    .move((55,55));\n"
+                "    .move([55,55]);\n"
                 "    .update_inventory(harina, 1, add).\n"
             )
 
@@ -29,3 +29,185 @@ def run_agent_plan() -> bool:
     assert isinstance(plan_text, str)
     assert len(plan_text.strip()) > 0, "El LLM dummy debería devolver un plan no vacío"
     return True
+
+
+def run_agent_plan_memo() -> bool:
+    """
+    El mismo estado (salvo espacios) no vuelve a llamar al LLM; uno distinto sí.
+    El prompt estático se construye una sola vez.
+    """
+    from src.agents.npc_agent import NPCAgent
+
+    class CountingLLM:
+        def __init__(self):
+            self.calls = 0
+
+        def generate(self, prompt: str) -> str:
+            self.calls += 1
+            return "+!esperar : true <-\n    .print(\"espero\").\n"
+
+    llm = CountingLLM()
+    agent = NPCAgent(
+        jid="eldric@localhost",
+        npc_id="npc_eldric",
+        password="secret",
+        npc_name="Eldric",
+        data_root="data",
+        llm=llm,
+        game_io=None,
+    )
+    a = agent.get_plan("NPC en (54,54). Panadería en recta [50,50,60,60].")
+    b = agent.get_plan("NPC en (54,54).   Panadería en recta [50,50,60,60].\n")
+    c = agent.get_plan("NPC en (10,10).")
+    assert a == b and c and llm.calls == 2
+    stats = agent.plan_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["prompt_builds"] == 1
+    return True
+
+
+def run_agent_plan_async() -> bool:
+    """
+    Dos agentes con el mismo LLM comparten PlanningPool (creado al primer get_plan_async,
+    aunque el LLM no admita hash): el mismo prompt concurrente se resuelve con una sola
+    llamada y get_plan_async no bloquea el bucle.
+    """
+    import asyncio
+    import time
+    from dataclasses import dataclass
+
+    from src.agents.npc_agent import NPCAgent
+
+    @dataclass
+    class SlowLLM:  # dataclass mutable: sin __hash__
+        calls: int = 0
+
+        def generate(self, prompt: str) -> str:
+            self.calls += 1
+            time.sleep(0.05)
+            return "+!esperar : true <-\n    .print(\"espero\").\n"
+
+    llm = SlowLLM()
+    agents = [
+        NPCAgent(jid=f"eldric{i}@localhost", npc_id="npc_eldric", password="secret",
+                 npc_name="Eldric", data_root="data", llm=llm, game_io=None)
+        for i in range(2)
+    ]
+    assert agents[0].planner is None
+
+    async def main():
+        env = "NPC en (3,3). Mercado en recta [0,0,8,8]."
+        return await asyncio.gather(*(a.get_plan_async(env, use_memo=False) for a in agents))
+
+    plans = asyncio.run(main())
+    assert agents[0].planner is agents[1].planner
+    assert plans[0] == plans[1] and plans[0] and llm.calls == 1
+    return True
+
+
+def run_agent_plan_batched() -> bool:
+    """
+    Con batch_window, varios NPCs que piden plan a la vez comparten una sola llamada al LLM
+    y cada uno recibe su sección.
+    """
+    import asyncio
+    import re
+
+    from src.agents.npc_agent import NPCAgent
+
+    class BatchLLM:
+        def __init__(self):
+            self.calls = 0
+
+        async def agenerate(self, prompt: str) -> str:
+            self.calls += 1
+            return "\n".join(f"### NPC {n}\n+!plan_{n} : true <-\n    .print({n})."
+                             for n in re.findall(r"^### NPC (\d+)", prompt, re.M))
+
+    llm = BatchLLM()
+    agents = [
+        NPCAgent(jid=f"eldric{i}@localhost", npc_id=f"npc_eldric_{i}", password="secret",
+                 npc_name="Eldric", data_root="data", llm=llm, game_io=None, batch_window=0.02)
+        for i in range(5)
+    ]
+
+    async def main():
+        return await asyncio.gather(*(a.get_plan_async(f"NPC en ({i},{i}).", use_memo=False)
+                                      for i, a in enumerate(agents)))
+
+    plans = asyncio.run(main())
+    assert llm.calls == 1
+    assert plans == [f"+!plan_{i} : true <-\n    .print({i})." for i in range(1, 6)]
+    return True
+
+
+def run_agent_plan_repair() -> bool:
+    """
+    Un plan con una primitiva inexistente no se devuelve: se pide una reparación con los
+    errores y, si tampoco es válida, get_plan devuelve "".
+    """
+    from src.agents.npc_agent import NPCAgent
+
+    class ScriptedLLM:
+        def __init__(self, replies):
+            self.replies = list(replies)
+            self.prompts = []
+
+        def generate(self, prompt: str) -> str:
+            self.prompts.append(prompt)
+            return self.replies.pop(0)
+
+    bad = "+!volar : true <-\n    .fly([3,3])."
+    good = "+!ir : true <-\n    .move([3,3])."
+    llm = ScriptedLLM([bad, good])
+    agent = NPCAgent(jid="eldric@localhost", npc_id="npc_eldric", password="secret",
+                     npc_name="Eldric", data_root="data", llm=llm, game_io=None)
+    assert agent.get_plan("NPC en (1,1).", use_memo=False) == good
+    assert len(llm.prompts) == 2 and ".fly/1" in llm.prompts[1]
+
+    llm.replies = [bad, bad]
+    assert agent.get_plan("NPC en (2,2).", use_memo=False) == ""
+    assert not agent.validate_plan(bad).ok
+    return True
+
+
+def run_agent_plan_library() -> bool:
+    """
+    Con plan_reuse_threshold, una intención guardada con save_new_intention se reutiliza para
+    una situación parecida sin llamar al LLM; una situación distinta, o una intención cuyo plan
+    no pasa el validador, sí llama. Trabaja sobre una copia temporal de data/.
+    """
+    import shutil
+    import tempfile
+    from pathlib import Path
+
+    from src.agents.npc_agent import NPCAgent
+
+    class CountingLLM:
+        def __init__(self):
+            self.calls = 0
+
+        def generate(self, prompt: str) -> str:
+            self.calls += 1
+            return "+!esperar : true <-\n    .print(\"espero\").\n"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = Path(tmp) / "data"
+        shutil.copytree("data", data_root)
+        llm = CountingLLM()
+        agent = NPCAgent(jid="eldric@localhost", npc_id="npc_eldric", password="secret",
+                         npc_name="Eldric", data_root=str(data_root), llm=llm, game_io=None,
+                         plan_reuse_threshold=0.5)
+        plan = "+!vender_espada : has(espada, 1) <-\n    !move_to([12,4]);\n    .drop(espada, [12,4])."
+        agent.save_new_intention("vender_espada", "+!vender_espada : has(espada, 1)",
+                                 "Vender una espada al herrero en la forja", plan)
+        assert agent.get_plan("Tiene una espada y está en la forja del herrero.") == plan
+        assert llm.calls == 0
+        agent.get_plan("Un dragón sobrevuela el castillo al anochecer.")
+        assert llm.calls == 1
+        agent.save_new_intention("volar_dragon", "+!volar_dragon : true",
+                                 "Volar a lomos del dragón sobre el castillo", "+!volar_dragon : true <- .volar.")
+        agent.get_plan("Volar a lomos del dragón sobre el castillo.")
+        assert llm.calls == 2
+        stats = agent.plan_cache_stats()
+        assert stats["library_hits"] >= 2 and stats["library_lookups"] >= 3
+    return True
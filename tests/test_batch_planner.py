@@ -0,0 +1,129 @@
+import asyncio
+import re
+
+from src.utils.batch_planner import BatchPlanner, build_batch_prompt, split_batch_response
+from src.utils.planning_pool import PlanningPool
+
+SHARED = "REGLAS COMUNES"
+
+
+class BatchLLM:
+    """Responde una sección por "### NPC n" del prompt; `broken` = {n: None|texto} para fallarlas."""
+    def __init__(self, broken=None):
+        self.prompts = []
+        self.broken = broken or {}
+
+    async def agenerate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.001)
+        if "### NPC" not in prompt:  # prompt individual (fallback)
+            return f"+!solo : true <- .print(\"{prompt}\")."
+        out = []
+        for n, who in re.findall(r"^### NPC (\d+)\n(\S+)", prompt, re.M):
+            body = self.broken.get(int(n), f"+!plan_{who} : true <- .print({who}).")
+            if body is not None:
+                out.append(f"### NPC {n}\n[AGENTSPEAK]\n{body}")
+        return "\n\n".join(out)
+
+
+def _run(batcher, requests):
+    async def main():
+        return await asyncio.gather(*(
+            batcher.submit(shared, section, lambda s=section: batcher.pool.generate(s))
+            for shared, section in requests))
+    return asyncio.run(main())
+
+
+def test_split_batch_response():
+    text = "ruido\n### NPC 2\nB\n### NPC 1 (eldric)\nA\n### NPC 3\n\n### NPC 9\nX"
+    assert split_batch_response(text, 3) == ["A", "B", None]
+    prompt = build_batch_prompt(SHARED, ["uno", "dos"])
+    assert prompt.startswith(SHARED) and prompt.count(SHARED) == 1 and "### NPC 2\ndos" in prompt
+
+
+def test_ten_npcs_one_llm_call():
+    llm = BatchLLM()
+    batcher = BatchPlanner(PlanningPool(llm), window=0.01, max_batch=16)
+    out = _run(batcher, [(SHARED, f"npc_{i}") for i in range(10)])
+    assert len(llm.prompts) == 1 and llm.prompts[0].count(SHARED) == 1
+    assert out == [f"[AGENTSPEAK]\n+!plan_npc_{i} : true <- .print(npc_{i})." for i in range(10)]
+    assert batcher.batches == 1 and batcher.batched == 10 and batcher.fallbacks == 0
+
+
+def test_max_batch_and_shared_context_grouping():
+    llm = BatchLLM()
+    batcher = BatchPlanner(PlanningPool(llm), window=0.01, max_batch=4)
+    reqs = [(SHARED, f"a{i}") for i in range(6)] + [("OTRAS REGLAS", f"b{i}") for i in range(2)]
+    out = _run(batcher, reqs)
+    assert all(o.startswith("[AGENTSPEAK]") for o in out)
+    assert batcher.batches == 3 and len(llm.prompts) == 3  # 4 + 2 (SHARED) y 2 (OTRAS)
+
+
+def test_missing_and_malformed_sections_fall_back():
+    llm = BatchLLM(broken={2: None, 3: "lo siento, no puedo"})
+    batcher = BatchPlanner(PlanningPool(llm), window=0.01)
+    out = _run(batcher, [(SHARED, f"npc_{i}") for i in range(4)])
+    assert out[1] == '+!solo : true <- .print("npc_1").' and out[2].startswith("+!solo")
+    assert out[0].endswith("print(npc_0).") and out[3].endswith("print(npc_3).")
+    assert batcher.missing == 1 and batcher.malformed == 1 and batcher.fallbacks == 2
+    assert len(llm.prompts) == 3
+
+
+def test_failed_batch_falls_back_for_everyone():
+    class Flaky(BatchLLM):
+        async def agenerate(self, prompt):
+            if "### NPC" in prompt:
+                raise RuntimeError("respuesta cortada")
+            return await super().agenerate(prompt)
+
+    batcher = BatchPlanner(PlanningPool(Flaky()), window=0.01)
+    out = _run(batcher, [(SHARED, "x"), (SHARED, "y")])
+    assert [o.startswith("+!solo") for o in out] == [True, True]
+    assert batcher.batch_errors == 1 and batcher.fallbacks == 2 and batcher.missing == 0
+
+
+def test_lone_request_uses_individual_prompt():
+    llm = BatchLLM()
+    batcher = BatchPlanner(PlanningPool(llm), window=0.005)
+    assert _run(batcher, [(SHARED, "solo")]) == ['+!solo : true <- .print("solo").']
+    assert batcher.singles == 1 and batcher.batches == 0
+
+
+def test_per_request_validator_rejects_section():
+    llm = BatchLLM()
+    batcher = BatchPlanner(PlanningPool(llm), window=0.01)
+
+    async def main():
+        strict = lambda text: "npc_1" not in text  # el validador del NPC 2 rechaza su sección
+        return await asyncio.gather(*(
+            batcher.submit(SHARED, s, lambda s=s: batcher.pool.generate(s), validate=strict)
+            for s in ("npc_0", "npc_1")))
+
+    out = asyncio.run(main())
+    assert out[0].endswith("print(npc_0).") and out[1] == '+!solo : true <- .print("npc_1").'
+    assert batcher.malformed == 1 and batcher.fallbacks == 1
+
+
+def test_for_pool_shares_by_configuration():
+    pool = PlanningPool(BatchLLM())
+    assert BatchPlanner.for_pool(pool, window=0.02) is BatchPlanner.for_pool(pool, window=0.02)
+    other = BatchPlanner.for_pool(pool, window=0.5)
+    assert other is not BatchPlanner.for_pool(pool, window=0.02) and other.window == 0.5
+
+
+def test_cancelled_batch_cancels_pending_requests():
+    class Hanging(BatchLLM):
+        async def agenerate(self, prompt):
+            await asyncio.sleep(10)
+
+    pool = PlanningPool(Hanging())
+    batcher = BatchPlanner(pool, window=0.001)
+
+    async def main():
+        reqs = [asyncio.ensure_future(batcher.submit(SHARED, s, lambda s=s: pool.generate(s))) for s in "xy"]
+        await asyncio.sleep(0.05)
+        pool.close()
+        return await asyncio.wait_for(asyncio.gather(*reqs, return_exceptions=True), 1.0)
+
+    out = asyncio.run(main())
+    assert all(isinstance(o, asyncio.CancelledError) for o in out)
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from src.game.messaging.commands import CommandRing, MoveCommand, SayCommand
+from src.game.pathfinding import WalkGrid
+from src.game.simulation import WorldSim
+
+
+def test_anillo_spsc_acotado_y_en_orden():
+    ring = CommandRing(capacity=4)
+    assert all(ring.try_push(SayCommand("npc", str(i))) for i in range(4))
+    assert not ring.try_push(SayCommand("npc", "lleno")) and ring.rejected == 1
+    assert [c.text for c in ring.drain(max_items=3)] == ["0", "1", "2"]
+    assert ring.try_push(SayCommand("npc", "4"))
+    assert [c.text for c in ring.drain()] == ["3", "4"] and len(ring) == 0
+
+
+def test_anillo_productor_y_consumidor_en_hilos_distintos():
+    ring = CommandRing(capacity=8)
+    total, got = 5000, []
+
+    def produce():
+        i = 0
+        while i < total:
+            if ring.try_push(SayCommand("npc", str(i))):
+                i += 1
+            else:
+                time.sleep(0)
+
+    t = threading.Thread(target=produce)
+    t.start()
+    while len(got) < total:
+        got.extend(int(c.text) for c in ring.drain())
+        time.sleep(0)
+    t.join()
+    assert got == list(range(total))
+
+
+def test_comandos_se_aplican_en_el_tick():
+    sim = WorldSim(areas=())
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (12, 10))
+    sim.add_npc("c", (90, 90))
+    bridge = sim.make_bridge("a")
+    assert bridge.move_to_cell(20, 10)
+    assert not sim.step_adapters["a"].has_steps()  # aún en el anillo: nada tocado fuera del tick
+    assert bridge.say("hola")
+    sim.tick()
+    assert sim.world.is_moving("a") and sim.step_adapters["a"].current_route == bridge.route_id
+    ev = sim.bus.try_get_event("b")
+    assert ev.kind == "npc_interaction" and ev.payload["text"] == "hola"
+    assert sim.bus.try_get_event("a") is not None
+    assert sim.bus.try_get_event("c") is None  # fuera del FOV
+    assert bridge.cancel_move()
+    sim.tick()
+    assert not sim.step_adapters["a"].has_steps()
+
+
+def test_move_rechazado_si_el_anillo_esta_lleno():
+    sim = WorldSim(areas=(), command_capacity=1)
+    sim.add_npc("a", (10, 10))
+    bridge = sim.make_bridge("a")
+    assert bridge.move_to_cell(20, 10)
+    assert not bridge.move_to_cell(30, 10)
+    assert isinstance(sim.commands["a"].drain()[0], MoveCommand)
+
+
+def _run_until_idle(sim, npc_id, max_ticks=5000):
+    for _ in range(max_ticks):
+        sim.tick()
+        if not sim.world.is_moving(npc_id) and not sim.step_adapters[npc_id].has_steps():
+            return
+    raise AssertionError("el NPC no ha terminado su ruta")
+
+
+def _no_replan(*args):
+    raise AssertionError("el tick no debe replanificar")
+
+
+def _drained_steps(sim, npc_id):
+    sim.drain_commands()
+    steps = []
+    while (step := sim.step_adapters[npc_id].try_pop()) is not None:
+        steps.append(step)
+    return steps
+
+
+def test_move_planificado_desde_una_celda_ya_abandonada_se_engancha():
+    sim = WorldSim(areas=())
+    sim.add_npc("a", (10, 10))
+    bridge = sim.make_bridge("a")
+    assert bridge.move_to_cell(20, 20)
+    sim.plan_route = sim.pathfinder.plan_route = _no_replan
+    sim.world.step("a", 1, 0)  # el NPC avanza antes de que la simulación drene el comando
+    _run_until_idle(sim, "a")
+    assert sim.world.cell("a") == (20, 20)
+    assert sim.move_rebases == 1 and sim.moves_dropped == 0
+
+
+def test_rebase_salta_lo_andado_o_vuelve_con_un_astar_acotado():
+    grid = WalkGrid(40, 40)
+    grid.set_rect(15, 0, 15, 39, False)
+    grid.set_rect(15, 10, 15, 10, True)  # único hueco del muro
+    sim = WorldSim(areas=(), walk_grid=grid)
+    sim.add_npc("a", (10, 10))
+    bridge = sim.make_bridge("a")
+
+    assert bridge.move_to_cell(20, 10)
+    sim.world.step("a", 1, 0)  # sobre la ruta: se salta el prefijo andado
+    assert _drained_steps(sim, "a") == [(1, 0)] * 9
+
+    assert bridge.move_to_cell(11, 20)
+    sim.world.step("a", 1, 0)  # fuera de la ruta: A* acotado de vuelta a su origen
+    steps = _drained_steps(sim, "a")
+    x, y = sim.world.cell("a")
+    for dx, dy in steps:
+        x, y = x + dx, y + dy
+        assert grid.is_walkable(x, y)
+    assert (x, y) == (11, 20)
+    assert sim.move_rebases == 2 and sim.moves_dropped == 0
+
+
+def test_move_sin_enganche_se_descarta_y_pide_replan_al_agente():
+    grid = WalkGrid(40, 40)
+    sim = WorldSim(areas=(), walk_grid=grid)
+    sim.add_npc("a", (10, 10))
+    bridge = sim.make_bridge("a")
+    assert bridge.move_to_cell(20, 20)
+    sim.world.step("a", 1, 0)  # fuera de la ruta, que empieza hacia abajo
+    grid.set_rect(10, 10, 10, 10, False)  # el origen de la ruta deja de ser transitable
+    sim.drain_commands()
+    assert sim.moves_dropped == 1 and not sim.step_adapters["a"].has_steps()
+    events = []
+    while (ev := sim.bus.try_get_event("a")) is not None:
+        events.append(ev)
+    replan = [ev for ev in events if ev.kind == "move_replan"]
+    assert replan and replan[0].payload == {"npc_id": "a", "cell": [11, 10], "goal": [20, 20]}
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+from src.game.messaging.messages import WorldEvent
+from src.game.messaging.world_bus import WorldBus
+
+
+def _ev(i, priority=0):
+    return WorldEvent(version="1.1", t_sim=0.0, seq=i, event_id=f"e{i}", kind="npc_interaction", payload={},
+                      priority=priority)
+
+
+def _bus(*npcs):
+    bus = WorldBus()
+    for npc in npcs:
+        bus.register_npc(npc, lambda: None)
+    return bus
+
+
+def test_orden_por_prioridad_y_llegada():
+    bus = _bus("a")
+    for i, p in enumerate([0, 2, 0, 1]):
+        bus.publish_event("a", _ev(i, p))
+    assert [bus.try_get_event("a").seq for _ in range(4)] == [1, 3, 0, 2]
+    assert bus.try_get_event("a", timeout=0.01) is None
+
+
+def test_next_event_despierta_desde_otro_hilo():
+    bus = _bus("a")
+
+    async def main():
+        threading.Timer(0.05, lambda: bus.publish_event("a", _ev(7))).start()
+        t0 = time.perf_counter()
+        ev = await bus.next_event("a", timeout=5)
+        return ev, time.perf_counter() - t0
+
+    ev, waited = asyncio.run(main())
+    assert ev.seq == 7 and waited < 2
+
+
+def test_try_get_event_sin_timeout_espera_hasta_que_llega_o_se_cierra():
+    bus = _bus("a")
+    threading.Timer(0.05, lambda: bus.publish_event("a", _ev(3))).start()
+    assert bus.try_get_event("a", timeout=None).seq == 3
+    threading.Timer(0.05, lambda: bus.unregister_npc("a")).start()
+    assert bus.try_get_event("a", timeout=None) is None
+
+
+def test_next_event_timeout_y_muchos_agentes_esperando():
+    npcs = [f"npc{i}" for i in range(500)]
+    bus = _bus(*npcs)
+
+    async def main():
+        assert await bus.next_event("npc0", timeout=0.01) is None
+        waits = [asyncio.ensure_future(bus.next_event(n, timeout=5)) for n in npcs]
+        await asyncio.sleep(0.01)
+        threading.Thread(target=lambda: [bus.publish_event(n, _ev(i)) for i, n in enumerate(npcs)]).start()
+        return await asyncio.gather(*waits)
+
+    got = asyncio.run(main())
+    assert [ev.seq for ev in got] == list(range(500))
+
+
+def test_iteracion_asincrona_termina_al_darse_de_baja():
+    bus = _bus("a")
+
+    async def main():
+        seen = []
+
+        def producer():
+            for i in range(3):
+                bus.publish_event("a", _ev(i))
+                time.sleep(0.01)
+            bus.unregister_npc("a")
+
+        threading.Thread(target=producer).start()
+        async for ev in bus.events("a"):
+            seen.append(ev.seq)
+        return seen
+
+    assert asyncio.run(main()) == [0, 1, 2]
+
+
+def _kind(i, kind, priority=0, **payload):
+    return WorldEvent(version="1.1", t_sim=0.0, seq=i, event_id=f"e{i}", kind=kind, payload=payload, priority=priority)
+
+
+def test_fusion_time_tick_y_zone_alert():
+    bus = _bus("a")
+    for i in range(1000):
+        bus.publish_event("a", _kind(i, "time_tick"))
+    bus.publish_event("a", _kind(1000, "zone_alert", priority=2, zone="plaza"))
+    bus.publish_event("a", _kind(1001, "zone_alert", zone="plaza"))
+    bus.publish_event("a", _kind(1002, "zone_alert", zone="puerto"))
+    bus.publish_event("a", _kind(1003, "npc_interaction"))
+    assert bus.event_stats("a") == {"queued": 4, "dropped": 0, "coalesced": 1000}
+    got = [bus.try_get_event("a") for _ in range(4)]
+    # plaza fusionado: el más reciente, con la prioridad más alta de los dos
+    assert [(e.seq, e.priority) for e in got] == [(1001, 2), (999, 0), (1002, 0), (1003, 0)]
+
+
+def test_cola_acotada_drop_oldest():
+    bus = WorldBus(max_events=3)
+    bus.register_npc("a", lambda: None)
+    for i in range(5):
+        bus.publish_event("a", _kind(i, "npc_interaction", priority=1 if i == 0 else 0))
+    assert bus.event_stats("a")["dropped"] == 2
+    assert [bus.try_get_event("a").seq for _ in range(3)] == [2, 3, 4]
+
+
+def test_cola_acotada_drop_lowest():
+    bus = WorldBus(max_events=3, drop_policy="drop_lowest")
+    bus.register_npc("a", lambda: None)
+    bus.publish_event("a", _kind(0, "npc_interaction", priority=2))
+    bus.publish_event("a", _kind(1, "npc_interaction", priority=0))
+    bus.publish_event("a", _kind(2, "npc_interaction", priority=1))
+    bus.publish_event("a", _kind(3, "npc_interaction", priority=1))  # sale el 1 (prioridad 0)
+    bus.publish_event("a", _kind(4, "npc_interaction", priority=0))  # el nuevo es el menor: se descarta
+    assert bus.event_stats() == {"queued": 3, "dropped": 2, "coalesced": 0}
+    assert [bus.try_get_event("a").seq for _ in range(3)] == [0, 2, 3]
@@ -0,0 +1,59 @@
+from src.game.pathfinding import WalkGrid, astar
+from src.game.flow_field import FlowFieldService
+from src.game.simulation import WorldSim
+
+BAKERY = (50, 50, 60, 60)
+
+
+def _walk(route, start):
+    x, y = start
+    for dx, dy, n in route:
+        x, y = x + dx * n, y + dy * n
+    return x, y
+
+
+def test_campo_compartido_por_varios_npcs():
+    grid = WalkGrid(100, 100)
+    grid.set_rect(40, 0, 40, 80, False)
+    flows = FlowFieldService(grid)
+    flows.register_area("Bakery", BAKERY)
+    starts = [(0, 0), (10, 90), (30, 20), (99, 99)]
+    for start in starts:
+        route = list(flows.plan_route(start, (55, 57)))
+        assert _walk(route, start) == (55, 57)
+        # El campo da rutas mínimas hasta el área
+        assert sum(n for _, _, n in route) == len(astar(grid, start, (55, 57))) - 1
+        # Tramos de longitud máxima: nunca dos seguidos en la misma dirección
+        assert all(a[:2] != b[:2] for a, b in zip(route, route[1:]))
+    assert flows.misses == 1 and flows.hits >= len(starts) - 1
+
+
+def test_campo_se_invalida_al_cambiar_transitabilidad():
+    grid = WalkGrid(100, 100)
+    flows = FlowFieldService(grid)
+    flows.register_area("Bakery", BAKERY)
+    before = flows.field("Bakery")
+    assert flows.field("Bakery") is before
+    grid.set_rect(0, 45, 99, 45, False)  # muro que aísla la mitad inferior
+    assert flows.field("Bakery") is not before
+    assert flows.plan_route((5, 5), (55, 55)) is None
+    assert flows.plan_route((5, 5), (5, 10)) is None  # fuera de áreas: lo resuelve el pathfinder
+
+
+def test_meta_inalcanzable_dentro_del_area_cae_al_pathfinder():
+    sim = WorldSim(areas=())
+    sim.add_area("Bakery", BAKERY)
+    for cell in [(51, 54), (51, 55), (51, 56), (50, 54), (50, 56)]:
+        sim.walk_grid.set_rect(*cell, *cell, False)  # (50,55) solo se alcanza desde (49,55)
+    assert sim.flow_fields.plan_route((0, 0), (50, 55)) is None
+    assert _walk(sim.plan_route((0, 0), (50, 55)), (0, 0)) == (50, 55)
+
+
+def test_campo_acotado_con_margen():
+    grid = WalkGrid(1000, 1000)
+    flows = FlowFieldService(grid, margin=20)
+    flows.register_area("Bakery", BAKERY)
+    assert flows.field("Bakery").dist.shape == (51, 51)  # celdas 30..80: el área ± 20
+    route = list(flows.plan_route((75, 40), (55, 57)))
+    assert _walk(route, (75, 40)) == (55, 57)
+    assert flows.plan_route((500, 500), (55, 57)) is None  # fuera de la ventana: pathfinder
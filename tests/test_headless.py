@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+from src.game.adapters.game_io_bridge import GameIOBridge
+from src.game.headless import bootstrap_headless
+
+
+def test_headless_no_importa_arcade():
+    code = "import sys, src.game.headless; sys.exit('arcade' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_headless_mueve_npc_y_sirve_snapshots():
+    runner, sim, step_adapter, bus = bootstrap_headless(npc_id="npc_eldric", extra_npc_ids=("npc_ervin",))
+    bridge = GameIOBridge(npc_id="npc_eldric", world_bus=bus, step_adapter=step_adapter,
+                          pathfinder=sim.pathfinder, world=sim.world)
+    assert bridge.move_to_cell(56, 57)
+    assert runner.run_until(lambda: sim.world.cell("npc_eldric") == (56, 57) and not sim.world.is_moving("npc_eldric"),
+                            max_ticks=20_000)
+    snap = bus.request_snapshot("npc_eldric")
+    assert snap.cell == (56, 57)
+    assert snap.t_sim == sim.t_sim > 0
+    assert {a["name"] for a in snap.areas} == {"Bakery"}
+    assert bus.request_snapshot("npc_ervin").nearby == []  # lejos: fuera del FOV
+
+
+def test_headless_run_for_tiempo_simulado():
+    runner, sim, _, _ = bootstrap_headless()
+    assert runner.run_for(2.0) == 120
+    assert abs(sim.t_sim - 2.0) < 1e-9
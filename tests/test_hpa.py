@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from src.game.pathfinding import WalkGrid, astar
+from src.game.hpa import HierarchicalPathFinder
+from src.game.adapters.npc_step_adapter import NpcStepAdapter
+
+
+def _random_grid(n: int = 96, seed: int = 3) -> WalkGrid:
+    rng = np.random.default_rng(seed)
+    cells = rng.random((n, n)) > 0.2
+    cells[0, 0] = cells[n - 1, n - 1] = True
+    return WalkGrid(n, n, cells)
+
+
+def _valid(grid, path, start, goal):
+    return (path[0] == start and path[-1] == goal
+            and all(grid.is_walkable(x, y) for x, y in path[1:])
+            and all(abs(x1 - x0) + abs(y1 - y0) == 1 for (x0, y0), (x1, y1) in zip(path, path[1:])))
+
+
+def test_hpa_ruta_valida_y_cercana_a_la_optima():
+    grid = _random_grid()
+    hpa = HierarchicalPathFinder(grid, cluster_size=16)
+    flat = astar(grid, (0, 0), (95, 95))
+    path = hpa.find_path((0, 0), (95, 95))
+    assert (flat is None) == (path is None)
+    if path is not None:
+        assert _valid(grid, path, (0, 0), (95, 95))
+        assert len(path) <= 1.3 * len(flat)
+
+
+def test_hpa_actualizacion_incremental():
+    grid = WalkGrid(64, 64)
+    hpa = HierarchicalPathFinder(grid, cluster_size=16)
+    assert hpa.find_path((5, 5), (60, 5)) is not None
+    grid.set_rect(32, 0, 32, 62, False)  # muro con hueco arriba del todo
+    path = hpa.find_path((5, 5), (60, 5))
+    assert _valid(grid, path, (5, 5), (60, 5)) and (32, 63) in path
+    grid.set_walkable(32, 63, False)
+    assert hpa.find_path((5, 5), (60, 5)) is None
+
+
+def test_ruta_perezosa_en_step_adapter():
+    grid = WalkGrid(64, 64)
+    hpa = HierarchicalPathFinder(grid, cluster_size=8)
+    steps = NpcStepAdapter()
+    steps.push_steps(hpa.plan_route((0, 0), (40, 30)))
+    x, y, n = 0, 0, 0
+    while steps.has_steps():
+        step = steps.try_pop()
+        if step is None:
+            break
+        x, y, n = x + step[0], y + step[1], n + 1
+    assert (x, y) == (40, 30) and n == 70
+
+
+def test_precompute_calcula_todos_los_clusters():
+    grid = _random_grid(64)
+    hpa = HierarchicalPathFinder(grid, cluster_size=16)
+    assert not hpa.ready.is_set()
+    hpa.precompute_async().join(10)
+    assert hpa.ready.is_set() and len(hpa._intra) == hpa.ncx * hpa.ncy
+
+
+def test_worldsim_elige_hpa_en_mundos_grandes():
+    from src.game.pathfinding import PathFinder
+    from src.game.simulation import WorldSim
+    assert isinstance(WorldSim(areas=()).pathfinder, PathFinder)
+    sim = WorldSim(areas=(), walk_grid=WalkGrid(64, 64), hpa_min_cells=64 * 64)
+    assert isinstance(sim.pathfinder, HierarchicalPathFinder)
+    assert sim.pathfinder.ready.wait(10)
+    sim.add_npc("a", (1, 1))
+    assert sim.make_bridge("a").pathfinder is sim.pathfinder
+
+
+@pytest.mark.parametrize("cluster_size", [12, 16, 70])
+def test_distancias_intra_cluster_coinciden_con_bfs(cluster_size):
+    grid = _random_grid(80, seed=5)
+    hpa = HierarchicalPathFinder(grid, cluster_size=cluster_size)
+    hpa.precompute()
+    for c in hpa._intra:
+        nodes = hpa._cluster_nodes(c)
+        for n in nodes:
+            expected = {m: d for m, d in hpa._bfs(n, c, nodes).items() if m != n}
+            assert dict(hpa._intra[c][n]) == expected
@@ -23,7 +23,8 @@ def run_integration() -> bool:
         window, view, step_adapter, bus = bootstrap_world(npc_id="npc_eldric")
 
         # 2) Bridge + Agente
-        bridge = GameIOBridge(npc_id="npc_eldric", world_bus=bus, step_adapter=step_adapter)
+        bridge = GameIOBridge(npc_id="npc_eldric", world_bus=bus, step_adapter=step_adapter,
+                              pathfinder=view.sim.pathfinder)
         agent = NPCAgent(
             jid="eldric@localhost",
             npc_id="npc_eldric",
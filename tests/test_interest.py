@@ -0,0 +1,60 @@
+from src.game.messaging.interest import InterestIndex
+from src.game.messaging.messages import WorldEvent
+from src.game.messaging.world_bus import WorldBus
+from src.game.simulation import WorldSim
+
+
+def _ev(kind="zone_alert"):
+    return WorldEvent(version="1.1", t_sim=0.0, seq=0, event_id="e", kind=kind, payload={})
+
+
+def test_indice_de_interes_rects_y_circulos():
+    idx = InterestIndex(bucket_size=8)
+    idx.set_rect("plaza", (10, 10, 20, 20))
+    idx.set_circle("npc", (40, 40), 5)
+    assert idx.query((15, 15, 15, 15)) == {"plaza"}
+    assert idx.query((44, 43, 50, 50)) == {"npc"}
+    assert idx.query((45, 45, 50, 50)) == set()  # esquina fuera del círculo
+    idx.set_circle("npc", (100, 100), 5)
+    assert idx.query((40, 40, 40, 40)) == set() and idx.query((0, 0, 200, 200)) == {"plaza", "npc"}
+    idx.remove("plaza")
+    assert len(idx) == 1
+
+
+def test_bus_topic_y_region_comparten_el_evento():
+    bus = WorldBus()
+    for npc in ("a", "b", "c"):
+        bus.register_npc(npc, lambda: None)
+    bus.subscribe_topic("a", "town")
+    bus.subscribe_topic("b", "town")
+    bus.subscribe_region("b", (0, 0, 10, 10))
+    bus.subscribe_radius("c", (50, 50), 3)
+    ev = _ev()
+    assert bus.publish(ev, topics=("town",), rect=(5, 5, 6, 6)) == 2  # b solo una vez
+    got = [bus.try_get_event(n) for n in ("a", "b", "c")]
+    assert got[0] is ev and got[1] is ev and got[2] is None
+    assert bus.try_get_event("b") is None
+    assert bus.publish_region((52, 50, 52, 50), ev) == 1
+    bus.unregister_npc("c")
+    assert bus.publish_region((52, 50, 52, 50), ev) == 0
+
+
+def test_sim_fov_sigue_al_npc_y_eventos_de_area():
+    sim = WorldSim()
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (30, 30))
+    bridge = sim.make_bridge("b")
+    bridge.subscribe_area("Bakery")
+    rect = next(a["rect"] for a in sim.areas if a["name"] == "Bakery")
+    sim.add_npc("inside", (rect[0] + 1, rect[1] + 1))
+    assert sim.publish_area_event("Bakery", "zone_alert", {"msg": "fuego"}, priority=2) == 2
+    assert bridge.try_get_event().payload == {"msg": "fuego", "area": "Bakery"}
+    assert sim.bus.try_get_event("a") is None
+
+    sim.step_adapters["a"].push_route([(1, 0, 18), (0, 1, 20)])
+    for _ in range(600):
+        sim.tick()
+    assert sim.world.cell("a") == (28, 30)
+    sim.make_bridge("b").say("hola")
+    sim.tick()
+    assert sim.bus.try_get_event("a").payload["text"] == "hola"
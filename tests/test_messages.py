@@ -0,0 +1,46 @@
+from src.game.messaging.messages import (
+    WorldEvent, WorldSnapshot, area_record, from_json, nearby_entity, to_json,
+)
+
+
+def _snapshot():
+    return WorldSnapshot(
+        "1.1", 1.5, 3, "npc_a", (2, 3),
+        [nearby_entity("npc", "npc_b", (4, 5)), nearby_entity("object", "apple", (1, 1), {"color": "red"})],
+        [area_record("Plaza", (0, 0, 9, 9), True)],
+    )
+
+
+def test_records_dict_style_access():
+    e = nearby_entity("npc", "npc_b", [4, 5])
+    assert e["id"] == "npc_b" and e["cell"] == (4, 5) and e.get("meta") is None
+    assert e[0] == "npc" and e.get("meta", {}) == {}
+    assert e.to_dict() == {"kind": "npc", "id": "npc_b", "cell": (4, 5)}
+    for key in ("missing", "count", "index", "_fields", "to_dict"):
+        try:
+            e[key]
+            assert False, "KeyError esperado"
+        except KeyError:
+            pass
+        assert e.get(key) is None and e.get(key, 0) == 0
+
+
+def test_messages_have_no_instance_dict():
+    snap = _snapshot()
+    ev = WorldEvent("1.1", 0.0, 1, "e1", "world_change", {"action": "say"})
+    for obj in (snap, ev, snap.nearby[0], snap.areas[0]):
+        assert not hasattr(obj, "__dict__")
+
+
+def test_names_are_interned():
+    a = nearby_entity("".join(["n", "pc"]), "".join(["npc_", "b"]), (0, 0))
+    b = nearby_entity("npc", "npc_b", (1, 1))
+    assert a.kind is b.kind and a.id is b.id
+    assert area_record("".join(["Pla", "za"]), (0, 0, 1, 1)).name is area_record("Plaza", (0, 0, 1, 1)).name
+
+
+def test_json_round_trip():
+    snap = _snapshot()
+    back = from_json(to_json(snap))
+    assert back == snap
+    assert back.nearby[1]["meta"] == {"color": "red"} and back.areas[0].walkable is True
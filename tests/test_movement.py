@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.game.config import STEP_TIME
+from src.game.movement import integrate_moves, integrate_rows
+from src.game.world_state import WorldState
+
+
+def _world(n: int) -> WorldState:
+    world = WorldState(capacity=n)
+    for i in range(n):
+        world.add(f"npc_{i}", (i, i))
+        world.step(f"npc_{i}", (1, -1, 0, 0)[i % 4], (0, 0, 1, -1)[i % 4])
+    return world
+
+
+def test_lote_igual_que_fila_a_fila():
+    batched, single = _world(50), _world(50)
+    for _ in range(12):
+        integrate_moves(batched, 1 / 60)
+        for row in range(single.count):
+            integrate_rows(single, np.array([row]), 1 / 60)
+    assert np.array_equal(batched.pos_px[:50], single.pos_px[:50])
+    assert np.array_equal(batched.moving[:50], single.moving[:50])
+
+
+def test_independiente_del_framerate():
+    a, b = _world(3), _world(3)
+    for _ in range(4):
+        integrate_moves(a, STEP_TIME / 8)
+    integrate_moves(b, STEP_TIME / 4)
+    integrate_moves(b, STEP_TIME / 4)
+    assert np.allclose(a.pos_px[:3], b.pos_px[:3])
+    integrate_moves(a, STEP_TIME)
+    assert not a.moving[:3].any()
+    assert np.array_equal(a.pos_px[:3], a.target_px[:3])
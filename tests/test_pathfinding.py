@@ -0,0 +1,29 @@
+from src.game.pathfinding import WalkGrid, PathFinder, astar, path_to_steps
+
+
+def test_astar_rodea_muro():
+    grid = WalkGrid(20, 20)
+    grid.set_rect(10, 0, 10, 18, False)  # muro vertical con hueco en y=19
+    path = astar(grid, (5, 5), (15, 5))
+    assert path[0] == (5, 5) and path[-1] == (15, 5)
+    assert all(grid.is_walkable(x, y) for x, y in path)
+    assert len(path) - 1 == 5 + 14 + 5 + 14  # ir hasta y=19, cruzar y volver
+    assert all(abs(dx) + abs(dy) == 1 for dx, dy in path_to_steps(path))
+
+
+def test_astar_sin_ruta():
+    grid = WalkGrid(10, 10)
+    grid.set_rect(5, 0, 5, 9, False)
+    assert astar(grid, (0, 0), (9, 9)) is None
+    assert astar(grid, (0, 0), (5, 5)) is None
+
+
+def test_cache_lru_se_invalida_al_cambiar_rejilla():
+    grid = WalkGrid(30, 30)
+    pf = PathFinder(grid, cache_size=2)
+    first = pf.find_path((0, 0), (20, 0))
+    assert pf.find_path((0, 0), (20, 0)) == first and pf.hits == 1
+    grid.set_rect(10, 0, 10, 28, False)
+    rerouted = pf.find_path((0, 0), (20, 0))
+    assert pf.misses == 2 and len(rerouted) > len(first)
+    assert (10, 0) not in rerouted
@@ -0,0 +1,57 @@
+import time
+
+from src.utils.plan_cache import PromptCache, ResponseMemo, normalize_env
+
+
+def test_prompt_cache_rebuilds_only_when_sources_change(tmp_path):
+    src = tmp_path / "intenciones.json"
+    src.write_text("{}", encoding="utf-8")
+    calls = []
+
+    def build():
+        calls.append(1)
+        return "PRE[" + src.read_text(encoding="utf-8"), "]POST"
+
+    cache = PromptCache(build, sources=[src])
+    assert cache.render("estado") == "PRE[{}estado]POST"
+    fp = cache.fingerprint
+    cache.render("otro estado")
+    assert len(calls) == 1 and cache.hits == 1
+
+    src.write_text('{"actions": {"x": 1}}', encoding="utf-8")
+    assert cache.render("e").startswith('PRE[{"actions"')
+    assert len(calls) == 2 and cache.fingerprint != fp
+    cache.invalidate()
+    cache.parts()
+    assert cache.builds == 3
+
+
+def test_memo_key_normalizes_env_and_separates_context():
+    assert normalize_env("  NPC en (1,2)\n\t Panadería ") == "npc en (1,2) panadería"
+    k = ResponseMemo.make_key("NPC en (1,2)", "ctx")
+    assert k == ResponseMemo.make_key("npc   en (1,2)\n", "ctx")
+    assert k != ResponseMemo.make_key("NPC en (1,2)", "otro")
+
+
+def test_memo_lru_and_ttl():
+    memo = ResponseMemo(maxsize=2, ttl=None)
+    memo.put("a", "A")
+    memo.put("b", "B")
+    assert memo.get("a") == "A"          # a pasa a ser la más reciente
+    memo.put("c", "C")                   # expulsa b
+    assert memo.get("b") is None and memo.get("c") == "C"
+    assert memo.stats()["evictions"] == 1 and memo.hits == 2 and memo.misses == 1
+
+    memo = ResponseMemo(ttl=0.01)
+    memo.put("a", "A")
+    time.sleep(0.02)
+    assert memo.get("a") is None and memo.expired == 1
+
+
+def test_memo_persists_to_disk(tmp_path):
+    path = tmp_path / "memo" / "eldric.json"
+    memo = ResponseMemo(path=path)
+    memo.put("k", "+!plan : true <- .print(1).")
+    again = ResponseMemo(path=path)
+    assert again.get("k") == "+!plan : true <- .print(1)." and len(again) == 1
+    assert not ResponseMemo(path=path, ttl=-1.0)._data  # caducadas al cargar
@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.utils.plan_index import PlanIndex
+
+LIBRARY = {
+    "comprar_harina": ("+!comprar_harina : at(panaderia) & has(dinero, C)",
+                       "Ir a la panadería y comprar harina para el pan"),
+    "vender_espada": ("+!vender_espada : has(espada, 1)", "Vender una espada al herrero en la forja"),
+    "buscar_manzana": ("+!buscar_manzana : true", "Buscar manzanas en el huerto"),
+}
+
+
+def _index(path=None):
+    ix = PlanIndex(path)
+    for name, (trigger, desc) in LIBRARY.items():
+        ix.add(name, trigger, desc, f"{trigger} <- .print({name}).")
+    return ix
+
+
+def test_top_k_ranks_matching_intention_first():
+    ix = _index()
+    top = ix.search("Tiene una espada y está en la forja del herrero", k=3)
+    assert [n for n, _ in top][0] == "vender_espada" and len(top) == 3
+    assert top[0][1] > 0.5 > top[1][1]
+    assert ix.search("NPC en (54,54), cerca de la panaderia; le falta harina", k=1)[0][0] == "comprar_harina"
+
+
+def test_best_applies_threshold_and_counts_hit_rate():
+    ix = _index()
+    match = ix.best("vender la espada en la forja", threshold=0.5)
+    assert match is not None and match.name == "vender_espada" and match.plan.endswith(".print(vender_espada).")
+    assert ix.best("un dragón ataca el castillo", threshold=0.5) is None
+    assert ix.stats() == {"size": 3, "lookups": 2, "hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert PlanIndex().best("lo que sea", threshold=0.0) is None
+
+
+def test_add_is_incremental_and_replaces_by_name():
+    ix = _index()
+    before = ix._tf.copy()
+    ix.add("buscar_manzana", "+!buscar_manzana : true", "Recoger peras del peral", "+!buscar_manzana : true <- .search(pera).")
+    assert len(ix) == 3
+    assert np.array_equal(ix._tf[:2], before[:2]) and not np.array_equal(ix._tf[2], before[2])
+    assert ix.search("recoger peras", k=1)[0][0] == "buscar_manzana"
+
+
+def test_persists_and_syncs_from_intentions_json(tmp_path):
+    path = tmp_path / "Eldric_index.npz"
+    _index(path)
+    again = PlanIndex(path)
+    assert len(again) == 3 and again.search("forja herrero espada", k=1)[0][0] == "vender_espada"
+
+    data = {"beliefs": {}, "actions": {},
+            "saludar": {"trigger": "+!saludar : meet(N, amigo)", "description": "Saludar a un amigo", "plan": "p"},
+            "vender_espada": {"trigger": "", "description": "", "plan": "otro"}}
+    assert again.sync(data) == 4  # saludar nueva, vender_espada cambiada, otras dos quitadas
+    assert "saludar" in again and "comprar_harina" not in again
+    assert again.best("Saludar a un amigo", 0.5).name == "saludar"
+    reloaded = PlanIndex(path)
+    assert len(reloaded) == 2 and reloaded.best("saludar amigo", 0.1).plan == "p"
+    assert reloaded.sync(data) == 0
+    assert reloaded.best("vender espada", 0.1).plan == "otro"
+    assert PlanIndex(path, dim=1 << 10).search("saludar") == []  # otro esquema: no se carga
@@ -0,0 +1,119 @@
+from src.utils.plan_validator import PlanValidator, Vocabulary, extract_agentspeak
+
+PRIMITIVAS = "data/primitives_base/primitivas.json"
+ACTIONS = {".search": 1, ".move": 1, ".catch": 1, ".drop": 2, ".update_inventory": 3}
+FUNCTIONS = {".accessible": 1, ".object_at": 0}
+
+
+# Sintaxis contrastada con agentspeak 0.2.2 (la que usa spade_bdi): True = la acepta
+SYNTAX_CASES = [
+    ("+!a : true <- .move([3,3]).", True),
+    ("+!a : true <- if (has(pan, N) & N > 0) { .print(N) } else { .print(0) }.", True),
+    ("+!a : true <- while (has(pan, N) & N > 0) { .update_inventory(pan, 1, \"subtract\"); }; .print(fin).", True),
+    ("+!a : true <- for (has(X, N)) { .print(X) }.", True),
+    ("+!a <- if (at(X)) { .print(X) } .print(fin).", True),
+    ("+!a <- if (at(X)) { } .print(fin).", True),
+    ("+!a <- X = [H | T]; X = (1 + 2) * 3; ?has(X, N).", True),
+    ("+!a(X) : at(X) & not has(X, 1) <- -+at([1,2]).", True),
+    ("+!a[source(self)] <- .print(1).", True),
+    ("+~at(X) <- .print(X).", True),
+    ("+!a : true <- .move((3,3)).", False),
+    ("+!a : true <- .print().", False),
+    ("+!a : true <- .print(1);.", False),
+    ("+!a <- X = [1, 2 | T].", False),
+    ("+!a <- if (at(X)) .print(X).", False),
+    ("+!a <- if (at(X)) { .print(X) } else if (at(Y)) { .print(Y) }.", False),
+    ("+!a <- .print(1)", False),
+    ("+!a <- .print(1) .print(2).", False),
+    ("+!a <- !while(1).", False),
+]
+
+
+def _validator(**kwargs):
+    voc = Vocabulary.from_file(PRIMITIVAS, custom_actions=ACTIONS, custom_functions=FUNCTIONS)
+    return PlanValidator(voc, **kwargs)
+
+
+def _codes(result):
+    return [e.code for e in result.errors]
+
+
+def test_vocabulary_from_primitivas_json():
+    voc = Vocabulary.from_file(PRIMITIVAS, custom_actions=ACTIONS, custom_functions=FUNCTIONS)
+    assert voc.beliefs["has"] == {2} and voc.beliefs["at"] == {1}
+    assert voc.functions[".object_at"] == {0} and voc.actions[".drop"] == 2
+    assert set(voc.intentions) == {"move_to", "catch_object", "drop_object", "search_object"}
+    assert voc.actions[".print"] is None  # builtin, aridad libre
+
+
+def test_base_plans_are_valid():
+    with open("data/primitives_base/primitivas.asl", encoding="utf-8") as f:
+        result = _validator().validate(f.read())
+    assert result.ok, result.errors
+    assert result.intentions == ("move_to", "catch_object", "drop_object", "search_object")
+
+
+def test_llm_response_format_is_extracted():
+    text = ("[AGENTSPEAK]\n```\n+!ir_a(Site) : accessible(Site) <-\n    !move_to(Site).\n```\n\n"
+            "# _ _ _ #\n\n[ir_a : va a un sitio]")
+    assert extract_agentspeak(text).startswith("+!ir_a(Site)")
+    assert _validator().validate(text).ok
+
+
+def _syntax_ok(validator, text):
+    return "syntax" not in _codes(validator.validate(text))
+
+
+def test_agentspeak_parser_agrees_with_cases():
+    v = _validator(allow_negation=True)
+    assert [text for text, ok in SYNTAX_CASES if _syntax_ok(v, text) != ok] == []
+    error = v.validate("+!a : true <- .move((3,3)).").errors[0]
+    assert (error.line, error.col, error.symbol) == (1, 23, ",")
+
+
+def test_vocabulary_checked_inside_control_blocks():
+    text = ("+!a : true <- if (at(X)) { .fly(X) } else { while (hungry) { !volar } }; "
+            "for (has(O, N)) { .drop(O, [1,2]) }.")
+    result = _validator().validate(text)
+    assert _codes(result) == ["unknown_action", "unknown_belief", "unknown_intention"]
+
+
+def test_vocabulary_errors_are_located():
+    text = ("+!ir(Site) : at(Here) & hungry <-\n"
+            "    .fly(Site);\n"
+            "    .move(Site, 3);\n"
+            "    !volar(Site);\n"
+            "    dance;\n"
+            "    +at(Site, 2).")
+    result = _validator().validate(text)
+    assert not result.ok
+    assert _codes(result) == ["unknown_belief", "unknown_action", "arity", "unknown_intention",
+                              "unknown_action", "arity"]
+    assert [(e.line, e.symbol) for e in result.errors][:2] == [(1, "hungry"), (2, ".fly")]
+
+
+def test_prompt_rules_negation_and_functions_in_context():
+    result = _validator().validate("+!x : not at(home) & .accessible(home) <- .print(1).")
+    assert _codes(result) == ["negation", "function_in_context"]
+    assert _validator(allow_negation=True).validate("+!x : not at(home) <- .print(1).").ok
+
+
+def test_syntax_error_is_reported_alone():
+    text = "+!otro : true <- .fly(1).\n+!roto : true <- .move((1,2) ."
+    result = _validator().validate(text)
+    assert _codes(result) == ["syntax"] and result.errors[0].line == 2
+    assert _codes(_validator().validate("")) == ["empty"]
+
+
+def test_plans_can_call_intentions_defined_in_same_text():
+    text = "+!a(X) : true <- !b(X, 1).\n+!b(X, N) : has(X, N) <- N2 = N * 2; .print(X, N2)."
+    assert _validator().validate(text).ok
+
+
+def test_results_cached_by_hash_and_repair_prompt_lists_errors():
+    v = _validator()
+    text = "+!x : true <- .fly(1)."
+    first = v.validate(text)
+    assert v.validate(text) is first and v.stats() == {"size": 1, "hits": 1, "misses": 1}
+    prompt = v.repair_prompt(text, first)
+    assert "acción desconocida .fly/1" in prompt and ".move/1" in prompt and text in prompt
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from src.utils.planning_pool import PlanningPool
+
+
+class SlowLLM:
+    """LLM falso síncrono con latencia inyectada; cuenta llamadas y concurrencia."""
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        return f"plan:{prompt}"
+
+
+class AsyncLLM:
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+        self.finished = 0
+
+    async def agenerate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        self.finished += 1
+        return f"async:{prompt}"
+
+
+def test_identical_prompts_share_one_call():
+    llm = SlowLLM()
+    pool = PlanningPool(llm, max_concurrency=4)
+
+    async def main():
+        return await asyncio.gather(*(pool.generate("mismo") for _ in range(10)))
+
+    out = asyncio.run(main())
+    assert out == ["plan:mismo"] * 10
+    assert llm.calls == 1 and pool.deduplicated == 9 and pool.stats()["inflight"] == 0
+    pool.close()
+
+
+def test_concurrency_is_bounded_and_loop_not_blocked():
+    llm = SlowLLM(latency=0.05)
+    pool = PlanningPool(llm, max_concurrency=2)
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        hb = asyncio.ensure_future(heartbeat())
+        out = await asyncio.gather(*(pool.generate(f"p{i}") for i in range(6)))
+        await hb
+        return out
+
+    t0 = time.perf_counter()
+    out = asyncio.run(main())
+    elapsed = time.perf_counter() - t0
+    assert out == [f"plan:p{i}" for i in range(6)]
+    assert llm.peak == 2 and pool.peak_active == 2
+    assert elapsed >= 0.15  # 6 llamadas de 50 ms, de 2 en 2
+    assert len(ticks) == 10 and max(b - a for a, b in zip(ticks, ticks[1:])) < 0.045
+    pool.close()
+
+
+def test_timeout_cancels_call_nobody_waits_for():
+    llm = AsyncLLM(latency=0.2)
+    pool = PlanningPool(llm, timeout=0.02)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.generate("lento")
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert pool.timeouts == 1 and llm.calls == 1 and llm.finished == 0
+    assert pool.stats()["inflight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    llm = AsyncLLM(latency=0.05)
+    pool = PlanningPool(llm)
+
+    async def main():
+        a = asyncio.ensure_future(pool.generate("x"))
+        b = asyncio.ensure_future(pool.generate("x"))
+        await asyncio.sleep(0.01)
+        a.cancel()
+        return await b, a
+
+    got, a = asyncio.run(main())
+    assert got == "async:x" and a.cancelled()
+    assert llm.calls == 1 and llm.finished == 1 and pool.cancelled == 1
+
+
+def test_llm_errors_propagate_and_are_counted():
+    class Broken:
+        def generate(self, prompt):
+            raise RuntimeError("sin cuota")
+
+    pool = PlanningPool(Broken())
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.generate("x"))
+    assert pool.failed == 1
+    pool.close()
+
+
+def test_shared_pool_per_llm_object():
+    llm = SlowLLM()
+    assert PlanningPool.for_llm(llm) is PlanningPool.for_llm(llm)
+    assert PlanningPool.for_llm(SlowLLM()) is not PlanningPool.for_llm(llm)
+
+
+def test_shared_pool_for_unhashable_and_slots_llms():
+    @dataclass
+    class DataLLM:  # eq=True sin frozen: __hash__ = None
+        model: str = "x"
+
+        def generate(self, prompt: str) -> str:
+            return prompt
+
+    class SlotsLLM:  # sin __weakref__
+        __slots__ = ("model",)
+
+        def generate(self, prompt: str) -> str:
+            return prompt
+
+    for llm in (DataLLM(), SlotsLLM()):
+        pool = PlanningPool.for_llm(llm)
+        assert pool.llm is llm
+        assert PlanningPool.for_llm(llm) is pool
+    assert PlanningPool.for_llm(DataLLM()) is not PlanningPool.for_llm(DataLLM())
+    pool = PlanningPool.for_llm(SlotsLLM())
+    assert asyncio.run(pool.generate("hola")) == "hola"
+    pool.close()
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+from src.game.areas import AreaRenderer, area_shapes
+from src.game.config import TILE
+from src.game.grid import GridRenderer, grid_lines
+from src.game.simulation import WorldSim
+
+
+class Recorder:
+    """Sustituto sin GL de ShapeElementList: guarda lo que se construyó y cuenta los draw()."""
+    def __init__(self, items):
+        self.items = list(items)
+        self.draws = 0
+
+    def draw(self):
+        self.draws += 1
+
+
+def _segments(points):
+    return list(zip(points[::2], points[1::2]))
+
+
+def _covered(line, cached):
+    """La línea cabe en alguna línea de la caché: misma recta y tramo que la contiene."""
+    (ax, ay), (bx, by) = line
+    for (cx, cy), (dx, dy) in cached:
+        if ax == bx == cx == dx and cy <= ay and by <= dy:
+            return True
+        if ay == by == cy == dy and cx <= ax and bx <= dx:
+            return True
+    return False
+
+
+def _uncached_areas(sim):
+    return area_shapes((a["rect"], a["label"]) for a in sim.areas)
+
+
+def test_rejilla_cacheada_cubre_lo_que_dibuja_sin_cache():
+    built = []
+
+    def build(points):
+        built.append(Recorder(points))
+        return built[-1]
+
+    grid = GridRenderer(margin_cells=4, build=build)
+    w, h = 20 * TILE, 15 * TILE
+    for x, y in [(0, 0), (TILE, 0), (3 * TILE, 2 * TILE), (10 * TILE, 0), (10 * TILE, 40 * TILE)]:
+        camera = SimpleNamespace(position=(x, y))
+        grid.draw_visible(camera, w, h)
+        cached = _segments(built[-1].items)
+        uncached = _segments(grid_lines(*GridRenderer.visible_range(camera, w, h)))
+        assert all(_covered(line, cached) for line in uncached)
+    # Solo se reconstruye al salir del margen (a la derecha y luego arriba); un draw por frame
+    assert len(built) == 3
+    assert sum(r.draws for r in built) == 5
+
+
+def test_areas_cacheadas_se_reconstruyen_al_cambiar_las_areas():
+    sim = WorldSim(areas=())
+    built = []
+
+    def build(shapes):
+        built.append(Recorder(shapes))
+        return built[-1], []
+
+    renderer = AreaRenderer(build=build)
+
+    def frame():
+        renderer.draw(sim.areas, sim.areas_version)
+        assert built[-1].items == _uncached_areas(sim)
+
+    frame()
+    frame()
+    assert len(built) == 1 and built[0].draws == 2
+    sim.add_area("Bakery", (50, 50, 60, 60), "PANADERÍA")
+    frame()
+    frame()
+    assert len(built) == 2 and built[-1].items[0] == (50 * TILE, 50 * TILE, 11 * TILE, 11 * TILE, "PANADERÍA")
+    sim.add_area("Forge", (5, 5, 9, 9))
+    frame()
+    sim.remove_area("Bakery")
+    frame()
+    assert len(built) == 4 and [s[-1] for s in built[-1].items] == ["FORGE"]
@@ -0,0 +1,105 @@
+import multiprocessing as mp
+import threading
+
+import numpy as np
+import pytest
+
+from src.game.shared_positions import SharedPositionTable
+from src.game.simulation import WorldSim
+
+
+def _reader(name, results):
+    table = SharedPositionTable.attach(name)
+    try:
+        tick, ids, cells, moving = table.read()
+        results.put((tick, ids, cells.tolist(), moving.tolist()))
+    finally:
+        table.close()
+
+
+def test_tabla_refleja_el_mundo_tras_cada_tick():
+    sim = WorldSim(areas=())
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (20, 5))
+    table = sim.share_positions(capacity=8)
+    try:
+        reader = SharedPositionTable.attach(table.name)
+        assert reader.read()[1] == ["a", "b"]
+        sim.step_adapters["b"].push_step(1, 0)
+        sim.tick()
+        tick, ids, cells, moving = reader.read()
+        assert tick == 1 and ids == ["a", "b"]
+        assert cells.tolist() == [[10, 10], [21, 5]] and moving.tolist() == [False, True]
+        sim.remove_npc("a")
+        sim.tick()
+        assert reader.read()[1] == ["b"]
+        cx, cy, mv = reader.views()
+        assert (cx[0], cy[0]) == (21, 5)
+        reader.close()
+    finally:
+        table.close()
+
+
+def test_id_demasiado_largo_se_rechaza_sin_dejar_la_tabla_a_medias():
+    sim = WorldSim(areas=())
+    sim.add_npc("a", (10, 10))
+    table = SharedPositionTable.create(capacity=4)
+    try:
+        table.publish(sim.world, 0)
+        sim.add_npc("ñ" * 17, (3, 3))  # 34 bytes en UTF-8
+        with pytest.raises(ValueError, match="34 bytes"):
+            table.publish(sim.world, 1)
+        tick, ids, cells, _ = table.read(max_retries=1)  # seqlock cerrado: se lee a la primera
+        assert tick == 0 and ids == ["a"] and cells.tolist() == [[10, 10]]
+    finally:
+        table.close()
+
+
+def test_lectura_consistente_con_escritor_concurrente():
+    # El escritor mantiene cell_y == cell_x; un lector nunca debe ver una mezcla
+    class _World:
+        ids = [f"n{i}" for i in range(256)]
+        count = 256
+        cell_x = np.zeros(256, dtype=np.int32)
+        cell_y = np.zeros(256, dtype=np.int32)
+        moving = np.zeros(256, dtype=bool)
+
+    table = SharedPositionTable.create(capacity=256)
+    stop = threading.Event()
+
+    def write():
+        w, t = _World(), 0
+        while not stop.is_set():
+            t += 1
+            w.cell_x[:] = t
+            w.cell_y[:] = t
+            table.publish(w, t)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        reader = SharedPositionTable.attach(table.name)
+        for _ in range(300):
+            tick, _, cells, _ = reader.read()
+            assert (cells == tick).all()
+        reader.close()
+    finally:
+        stop.set()
+        writer.join()
+        table.close()
+
+
+def test_lector_en_otro_proceso():
+    sim = WorldSim(areas=())
+    sim.add_npc("npc_eldric", (3, 4))
+    table = sim.share_positions(capacity=4)
+    try:
+        ctx = mp.get_context("spawn")
+        results = ctx.Queue()
+        p = ctx.Process(target=_reader, args=(table.name, results))
+        p.start()
+        assert results.get(timeout=60) == (0, ["npc_eldric"], [[3, 4]], [False])
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    finally:
+        table.close()
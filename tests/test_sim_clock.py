@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.game.sim_clock import SimClock
+from src.game.simulation import WorldSim
+
+
+def test_sim_clock_acumula_ticks_y_alpha():
+    clock = SimClock(tick_rate=50.0)
+    assert clock.advance(0.04) == 2
+    assert clock.advance(0.01) == 0
+    assert abs(clock.alpha - 0.5) < 1e-9
+    assert clock.advance(0.01) == 1
+    clock.tick += 3
+    assert abs(clock.t_sim - 0.06) < 1e-12
+
+
+def test_sim_clock_limita_ticks_por_frame():
+    clock = SimClock(tick_rate=60.0, max_ticks_per_frame=4)
+    assert clock.advance(10.0) == 4
+
+
+def _run(frame_dts):
+    sim = WorldSim(areas=())
+    steps = sim.add_npc("npc", (10, 10))
+    steps.push_steps([(1, 0)] * 5 + [(0, 1)] * 5)
+    for dt in frame_dts:
+        sim.advance(dt)
+    return sim.ticks, sim.world.pos_px[:1].copy(), sim.world.cell("npc")
+
+
+def test_simulacion_reproducible_con_distinto_dt_de_render():
+    # Mismo tiempo total repartido en frames distintos: mismos ticks, mismas posiciones
+    a = _run([1 / 60] * 90)
+    b = _run([1 / 30] * 45)
+    rng = np.random.default_rng(0)
+    jitter = rng.uniform(0.005, 0.03, size=400)
+    jitter = jitter[np.cumsum(jitter) <= 1.5]
+    c = _run(list(jitter) + [1.5 - float(jitter.sum())])
+    assert a[0] == b[0] == c[0] == 90
+    assert np.array_equal(a[1], b[1]) and np.array_equal(a[1], c[1])
+    assert a[2] == b[2] == c[2]
@@ -0,0 +1,61 @@
+import threading
+
+from src.game.simulation import WorldSim
+
+
+def _sim():
+    sim = WorldSim(areas=())
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (13, 10))
+    sim.add_npc("far", (80, 80))
+    return sim
+
+
+def test_snapshot_cacheado_si_nada_cambia():
+    sim = _sim()
+    s1 = sim.bus.request_snapshot("a")
+    for _ in range(50):
+        sim.tick()
+    s2 = sim.bus.request_snapshot("a")
+    assert s2 is s1 and sim.bus.snapshot_hits == 1 and sim.bus.snapshot_misses == 1
+
+
+def test_snapshot_sucio_por_celda_fov_y_areas():
+    sim = _sim()
+    a0, far0 = sim.bus.request_snapshot("a"), sim.bus.request_snapshot("far")
+    sim.step_adapters["b"].push_step(1, 0)  # b sigue dentro del FOV de a
+    sim.tick()
+    a1 = sim.bus.request_snapshot("a")
+    assert a1 is not a0 and a1.seq > a0.seq
+    assert a1.nearby[0]["cell"] == (14, 10)
+    assert sim.bus.request_snapshot("far") is far0  # lejos: no se ha ensuciado
+
+    sim.step_adapters["a"].push_step(0, 1)
+    sim.tick()
+    a2 = sim.bus.request_snapshot("a")
+    assert a2.cell == (10, 11) and a2.seq > a1.seq
+
+    sim.add_area("Forge", (70, 70, 75, 75))
+    far1 = sim.bus.request_snapshot("far")
+    assert far1.seq > far0.seq and [x["name"] for x in far1.areas] == ["Forge"]
+
+
+def test_seq_monotono_por_npc():
+    sim = _sim()
+    seqs = []
+    sim.step_adapters["a"].push_route([(1, 0, 20)])
+    for _ in range(400):
+        sim.tick()
+        seqs.append(sim.bus.request_snapshot("a").seq)
+    assert seqs == sorted(seqs) and len(set(seqs)) > 10
+
+
+def test_contadores_de_snapshot_exactos_con_varios_hilos():
+    sim = _sim()
+    threads = [threading.Thread(target=lambda: [sim.bus.request_snapshot("a") for _ in range(2000)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sim.bus.snapshot_hits + sim.bus.snapshot_misses == 8 * 2000
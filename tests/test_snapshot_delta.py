@@ -0,0 +1,69 @@
+import pytest
+
+from src.game.messaging.messages import SnapshotDelta, WorldSnapshot
+from src.game.messaging.protocol import negotiate_version
+from src.game.simulation import WorldSim
+
+
+def _sim():
+    sim = WorldSim()
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (12, 10))
+    sim.add_npc("c", (20, 20))
+    return sim
+
+
+def test_negociacion_de_version():
+    assert negotiate_version(["1.0", "1.1", "2.0"]) == "1.1"
+    assert negotiate_version(["1.0"]) == "1.0"
+    with pytest.raises(ValueError):
+        negotiate_version(["0.9"])
+
+
+def test_delta_solo_lleva_lo_que_cambia():
+    sim = _sim()
+    full = sim.bus.request_snapshot("a")
+    assert isinstance(full, WorldSnapshot) and full.areas and full.areas_ref
+
+    sim.step_adapters["b"].push_step(0, 1)
+    sim.step_adapters["c"].push_route([(-1, 0, 6), (0, -1, 8)])  # c entra en el FOV de a
+    for _ in range(200):
+        sim.tick()
+    delta = sim.bus.request_snapshot("a", since_seq=full.seq, known_areas_ref=full.areas_ref)
+    assert isinstance(delta, SnapshotDelta) and delta.base_seq == full.seq
+    assert delta.cell is None and delta.areas is None
+    assert {e["id"] for e in delta.nearby_upsert} == {"b", "c"} and delta.nearby_removed == []
+
+    # Cliente sin las áreas: viajan en el delta; base desconocido: snapshot completo
+    assert sim.bus.request_snapshot("a", since_seq=full.seq).areas == full.areas
+    assert isinstance(sim.bus.request_snapshot("a", since_seq=-1), WorldSnapshot)
+    # Cliente 1.0: siempre completo
+    assert isinstance(sim.bus.request_snapshot("a", since_seq=full.seq, version="1.0"), WorldSnapshot)
+
+
+def test_bridge_reconstruye_con_deltas():
+    sim = _sim()
+    bridge = sim.make_bridge("a")
+    assert bridge.protocol == "1.1"
+    s0 = bridge.sync_snapshot()
+    sim.step_adapters["b"].push_route([(1, 0, 20)])  # b sale del FOV
+    sim.step_adapters["a"].push_step(0, 1)
+    for _ in range(300):
+        sim.tick()
+    s1 = bridge.sync_snapshot()
+    fresh = sim.bus.request_snapshot("a")
+    assert s1.seq == fresh.seq > s0.seq
+    assert s1.cell == fresh.cell == (10, 11)
+    assert s1.nearby == fresh.nearby and s1.areas == fresh.areas
+    assert bridge.sync_snapshot() == fresh
+
+    # Delta desde un base anterior al último sincronizado: las áreas son las de ese base
+    sim.add_area("Forge", (5, 5, 9, 9))
+    bridge.sync_snapshot()
+    delta = bridge.request_snapshot(since_seq=s1.seq, known_areas_ref=s1.areas_ref)
+    assert isinstance(delta, SnapshotDelta) and delta.areas == sim.bus.request_snapshot("a").areas
+    assert bridge.request_snapshot(since_seq=s1.seq).areas is not None
+
+    old = sim.make_bridge("b")
+    old.protocol = "1.0"
+    assert isinstance(old.request_snapshot(since_seq=0), WorldSnapshot)
@@ -0,0 +1,26 @@
+from src.game.messaging.messages import NearbyEntity
+from src.game.spatial_index import SpatialHash
+
+
+def test_consultas_radio_y_rect():
+    idx = SpatialHash(bucket_size=4)
+    idx.insert("a", (10, 10))
+    idx.insert("b", (13, 10), kind="object", meta={"item": "harina"})
+    idx.insert("c", (30, 30))
+    assert sorted(idx.query_radius((10, 10), 5)) == ["a", "b"]
+    assert idx.query_radius((10, 10), 5, exclude=("a",)) == ["b"]
+    assert idx.query_rect(0, 0, 12, 12) == ["a"]
+    near = idx.nearby((10, 10), 5, exclude=("a",))
+    assert near == [NearbyEntity("object", "b", (13, 10), {"item": "harina"})]
+    assert near[0]["id"] == "b" and near[0].to_dict()["meta"] == {"item": "harina"}
+
+
+def test_mover_y_borrar_actualiza_buckets():
+    idx = SpatialHash(bucket_size=4)
+    idx.insert("a", (0, 0))
+    for x in range(1, 20):
+        idx.move("a", (x, 0))
+    assert idx.query_radius((0, 0), 5) == []
+    assert idx.query_radius((19, 0), 1) == ["a"]
+    idx.remove("a")
+    assert len(idx) == 0 and idx.query_rect(0, 0, 40, 40) == []
@@ -0,0 +1,70 @@
+import pytest
+
+from src.game.adapters.game_io_bridge import GameIOBridge
+from src.game.adapters.npc_step_adapter import NpcStepAdapter
+from src.game.pathfinding import PathFinder, WalkGrid, path_to_segments
+from src.game.simulation import WorldSim
+
+
+def _drain(steps):
+    out = []
+    while steps.has_steps():
+        step = steps.try_pop()
+        if step is None:
+            break
+        out.append(step)
+    return out
+
+
+def test_tramos_comprimidos_y_pasos_sueltos():
+    path = [(0, 0)] + [(x, 0) for x in range(1, 11)] + [(10, y) for y in range(1, 6)]
+    segments = path_to_segments(path)
+    assert segments == [(1, 0, 10), (0, 1, 5)]
+    steps = NpcStepAdapter()
+    steps.push_route(segments)
+    steps.push_step(-1, 0)
+    assert _drain(steps) == [(1, 0)] * 10 + [(0, 1)] * 5 + [(-1, 0)]
+    with pytest.raises(ValueError):
+        steps.push_route([(1, 1, 3)])
+        steps.try_pop()
+
+
+def test_cancelar_y_sustituir_rutas():
+    steps = NpcStepAdapter()
+    a = steps.push_route([(1, 0, 100)])
+    b = steps.push_route([(0, 1, 100)])
+    assert steps.pending_routes() == [a, b] and steps.current_route == a
+    assert steps.try_pop() == (1, 0)
+    assert steps.cancel(a) and steps.current_route == b
+    assert not steps.cancel(a)
+    c = steps.push_route([(-1, 0, 2)], replace=True)
+    assert steps.pending_routes() == [c]
+    assert _drain(steps) == [(-1, 0)] * 2
+    assert not steps.cancel()
+
+
+def test_replan_del_bridge_entra_en_el_siguiente_tick():
+    sim = WorldSim(areas=())
+    steps = sim.add_npc("npc", (10, 10))
+    bridge = GameIOBridge("npc", sim.bus, steps, pathfinder=PathFinder(sim.walk_grid), world=sim.world)
+    assert bridge.move_to_cell(60, 10)
+    assert len(steps.pending_routes()) == 1
+    for _ in range(30):
+        sim.tick()
+    assert bridge.move_to_cell(10, 40)  # sustituye, no se encola detrás
+    assert len(steps.pending_routes()) == 1
+    while steps.has_steps() or sim.world.is_moving("npc"):
+        sim.tick()
+    assert sim.world.cell("npc") == (10, 40)
+    assert bridge.move_to_cell(30, 40) and bridge.cancel_move()
+    assert not steps.has_steps()
+
+
+def test_bridge_exige_pathfinder_y_planifica_sobre_la_rejilla():
+    sim = WorldSim(areas=())
+    steps = sim.add_npc("npc", (10, 10))
+    with pytest.raises(ValueError):
+        GameIOBridge("npc", sim.bus, steps, pathfinder=None)
+    sim.walk_grid.set_rect(0, 20, sim.walk_grid.width - 1, 20, False)  # muro que corta el mapa
+    bridge = GameIOBridge("npc", sim.bus, steps, pathfinder=PathFinder(sim.walk_grid), world=sim.world)
+    assert not bridge.move_to_cell(10, 40)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from src.game.pathfinding import WalkGrid
+from src.game.tilemap import ChunkedTileMap
+
+
+def test_crear_es_disperso_y_no_carga_chunks(tmp_path):
+    tm = ChunkedTileMap.create(tmp_path / "map", 4096, 4096, chunk_size=64)
+    assert tm.loads == 0 and tm.resident_bytes == 0
+    assert (tmp_path / "map" / "blocked.bin").stat().st_blocks * 512 < 1024 * 1024
+    assert tm.is_walkable(4000, 4000) and tm.loads == 1
+
+
+def test_eviccion_por_presupuesto_conserva_los_datos(tmp_path):
+    tm = ChunkedTileMap.create(tmp_path / "map", 256, 256, chunk_size=16, memory_budget=4 * 2 * 16 * 16)
+    tm.set_rect("blocked", 10, 10, 40, 12, 1)
+    tm.set("terrain", 200, 200, 7)
+    tm.touch_around([(128, 128)], 40)
+    assert len(tm._resident) <= 4 and tm.evictions > 0
+    assert not tm.is_walkable(40, 11) and tm.is_walkable(41, 11)
+    tm.flush()
+    again = ChunkedTileMap(tmp_path / "map")
+    assert again.get("terrain", 200, 200) == 7
+    block = again.walkable_window(0, 0, 63, 63)
+    grid = WalkGrid(64, 64)
+    grid.set_cells(0, 0, block)
+    assert not grid.is_walkable(25, 12) and grid.is_walkable(25, 13)
+    assert np.count_nonzero(~grid.cells) == 31 * 3
+
+
+def _sim_on_tilemap(tmp_path, wall, **kwargs):
+    """Mapa guardado en disco con un muro y reabierto (nada paginado) para una WorldSim."""
+    from src.game.simulation import WorldSim
+    tm = ChunkedTileMap.create(tmp_path / "map", 128, 128, chunk_size=16)
+    tm.set_rect("blocked", *wall, 1)
+    tm.flush()
+    tm = ChunkedTileMap(tmp_path / "map")
+    return tm, _sim_from(tm, **kwargs)
+
+
+def _sim_from(tm, **kwargs):
+    from src.game.simulation import WorldSim
+    return WorldSim(areas=(), tilemap=tm, **kwargs)
+
+
+def test_tile_bloqueado_en_un_chunk_cambia_la_ruta(tmp_path):
+    tm, sim = _sim_on_tilemap(tmp_path, (20, 0, 20, 30))
+    sim.add_npc("a", (10, 10))
+    assert not sim.walk_grid.is_walkable(10, 10)  # sin paginar: desconocido, no transitable
+    sim.tick()  # pagina los chunks alrededor del NPC
+    assert not sim.walk_grid.is_walkable(20, 10) and sim.walk_grid.is_walkable(20, 31)
+    path = sim.pathfinder.find_path((10, 10), (30, 10))
+    assert len(path) > 21 and all(sim.walk_grid.is_walkable(x, y) for x, y in path)
+    tm.set("blocked", 12, 10, 1)  # editar el tilemap actualiza la rejilla al momento
+    assert not sim.walk_grid.is_walkable(12, 10)
+
+
+def test_solo_se_planifica_sobre_terreno_paginado(tmp_path):
+    tm, sim = _sim_on_tilemap(tmp_path, (40, 0, 40, 100), tile_page_radius=0)
+    sim.add_npc("a", (10, 10))
+    bridge = sim.make_bridge("a")
+    assert not bridge.move_to_cell(50, 10)  # pagina la región de la ruta: ahí el muro la corta
+    assert tm.is_resident((2, 0)) and not tm.is_resident((2, 7))
+    sim.tile_page_radius = 120
+    assert bridge.move_to_cell(50, 10)  # con más margen se ve el hueco al final del muro
+    tm.set("blocked", 50, 10, 1)  # y si la meta se bloquea después de planificar, se para
+    for _ in range(20000):
+        sim.tick()
+        if not sim.world.is_moving("a") and not sim.step_adapters["a"].has_steps():
+            break
+    assert sim.world.cell("a") in {(49, 10), (51, 10), (50, 9), (50, 11)} and sim.blocked_steps == 1
+    ev = sim.bus.try_get_event("a")
+    while ev is not None and ev.kind != "move_blocked":
+        ev = sim.bus.try_get_event("a")
+    assert ev is not None and ev.payload["cell"] == [50, 10]
+
+
+def test_mundo_grande_sobre_tilemap_no_crece_con_el_mapa(tmp_path):
+    from src.game.hpa import HierarchicalPathFinder
+    tm = ChunkedTileMap.create(tmp_path / "map", 8192, 8192, chunk_size=64)
+    sim = _sim_from(tm)
+    assert isinstance(sim.pathfinder, HierarchicalPathFinder) and not sim.pathfinder._intra
+    sim.add_npc("a", (4000, 4000))
+    sim.tick()
+    assert sim.walk_grid.is_walkable(4000, 4000) and not sim.walk_grid.is_walkable(100, 100)
+    assert tm.loads <= 9
+    assert len(sim.pathfinder._borders) < 1000  # solo fronteras de la región paginada (no ~500k)
+    bridge = sim.make_bridge("a")
+    assert bridge.move_to_cell(4300, 3900)
+    assert tm.loads < 100 and not sim.walk_grid.is_walkable(100, 100)
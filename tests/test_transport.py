@@ -0,0 +1,95 @@
+import multiprocessing as mp
+
+import pytest
+
+from src.game.messaging.codec import CodecError, MsgType, decode, encode
+from src.game.messaging.commands import DropCommand, MoveCommand, SayCommand
+from src.game.messaging.messages import SnapshotDelta, WorldEvent, WorldSnapshot, nearby_entity
+from src.game.messaging.transport import RemoteGameIO, RemoteWorldBus, WorldBusServer
+from src.game.simulation import WorldSim
+
+AUTHKEY = b"tfm-test"
+
+
+def _sim():
+    sim = WorldSim()
+    sim.add_npc("a", (10, 10))
+    sim.add_npc("b", (12, 10))
+    return sim
+
+
+def test_codec_ida_y_vuelta():
+    sim = _sim()
+    snap = sim.bus.request_snapshot("a")
+    assert decode(encode(snap))[1] == snap
+    delta = SnapshotDelta(version="1.1", t_sim=1.5, seq=9, base_seq=3, npc_id="a", cell=(1, 2), areas_ref="x",
+                          areas=None, nearby_upsert=[nearby_entity("npc", "b", (3, 4), {"hp": 3})],
+                          nearby_removed=["c"])
+    assert decode(encode(delta))[1] == delta
+    ev = WorldEvent(version="1.1", t_sim=0.5, seq=4, event_id="e1", kind="zone_alert",
+                    payload={"zone": "plaza", "n": [1, 2.5, None, True]}, priority=2)
+    assert decode(encode(ev)) == (MsgType.EVENT, ev, (1, 1))
+    assert decode(encode(DropCommand("a", "pan", (3, 4))))[1] == DropCommand("a", "pan", (3, 4))
+    move = decode(encode(MoveCommand("a", 7, iter([(1, 0, 5), (0, 1)]), (6, 1), (1, 0))))[1]
+    assert move.route == [(1, 0, 5), (0, 1, 1)] and move.goal == (6, 1) and move.start == (1, 0)
+    assert decode(encode(MoveCommand("a", 8, [], (6, 1))))[1].start is None
+    # Más compacto que el JSON equivalente
+    assert len(encode(snap)) < len(repr(snap))
+    with pytest.raises(CodecError):
+        decode(b"XX" + encode(ev)[2:])
+    with pytest.raises(CodecError):
+        decode(encode(ev, version="2.0"))
+
+
+def test_servidor_y_cliente_en_el_mismo_proceso():
+    sim = _sim()
+    server = WorldBusServer(sim, authkey=AUTHKEY).start()
+    try:
+        remote = RemoteWorldBus(server.address, authkey=AUTHKEY)
+        assert remote.protocol == "1.1"
+        io = RemoteGameIO("a", remote)
+        s0 = io.sync_snapshot()
+        assert s0 == sim.bus.request_snapshot("a")
+        assert io.move_to_cell(15, 10) and io.say("hola")
+        for _ in range(300):
+            sim.tick()
+        assert io.sync_snapshot().cell == (15, 10) == io.current_cell()
+        assert isinstance(io.request_snapshot(since_seq=io.sync_snapshot().seq), SnapshotDelta)
+        assert io.try_get_event().kind == "npc_interaction"
+        assert io.try_get_event() is None
+
+        old = RemoteWorldBus(server.address, authkey=AUTHKEY, versions=("1.0",))
+        assert old.protocol == "1.0"
+        assert isinstance(old.request_snapshot("a", since_seq=s0.seq), WorldSnapshot)
+        with pytest.raises(Exception):
+            remote.request_snapshot("nadie")
+        assert remote.send_command(SayCommand("b", "sigo vivo"))  # la conexión sigue tras el error
+        remote.close()
+        old.close()
+    finally:
+        server.close()
+
+
+def _worker(address, results):
+    remote = RemoteWorldBus(address, authkey=AUTHKEY)
+    io = RemoteGameIO("b", remote)
+    results.put((io.sync_snapshot().cell, io.move_to_cell(12, 14)))
+    remote.close()
+
+
+def test_agente_en_otro_proceso():
+    sim = _sim()
+    server = WorldBusServer(sim, authkey=AUTHKEY).start()
+    try:
+        ctx = mp.get_context("spawn")
+        results = ctx.Queue()
+        p = ctx.Process(target=_worker, args=(server.address, results))
+        p.start()
+        cell, ok = results.get(timeout=60)
+        p.join(timeout=60)
+        assert cell == (12, 10) and ok and p.exitcode == 0
+        for _ in range(300):
+            sim.tick()
+        assert sim.world.cell("b") == (12, 14)
+    finally:
+        server.close()
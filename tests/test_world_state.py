@@ -0,0 +1,26 @@
+from src.game.config import TILE
+from src.game.spatial_index import SpatialHash
+from src.game.world_state import WorldState
+
+
+def test_altas_bajas_mantienen_arrays_compactos():
+    world = WorldState(capacity=2, index=SpatialHash())
+    for i in range(5):
+        world.add(f"npc_{i}", (i, 2 * i))
+    assert world.capacity >= 5 and world.count == 5
+    world.remove("npc_1")
+    assert world.count == 4 and "npc_1" not in world
+    assert world.cell("npc_4") == (4, 8)
+    assert world.cell_x[world.index_of("npc_4")] == 4
+    assert world.index.query_rect(0, 0, 10, 10) and "npc_1" not in world.index
+
+
+def test_step_actualiza_celda_destino_e_indice():
+    world = WorldState(index=SpatialHash())
+    world.add("a", (10, 10))
+    assert not world.step("a", 1, 1)
+    assert world.step("a", 1, 0)
+    row = world.index_of("a")
+    assert world.cell("a") == (11, 10) and world.moving[row]
+    assert tuple(world.target_px[row]) == (11 * TILE + TILE / 2, 10 * TILE + TILE / 2)
+    assert world.index.cell_of("a") == (11, 10)